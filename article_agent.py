@@ -4,26 +4,110 @@
 import os
 import re
 import json
-import requests
+import asyncio
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import openai
 from dotenv import load_dotenv
+from llm_cache import get_response_cache
+from llm_scheduler import get_scheduler
+from openai_clients import get_async_client, get_client
+from article_pipeline import ArticleDraft, ArticlePipeline
+from article_prompt import build_article_input, prompt_cache_key, record_usage
+from asset_manifest import ASSET_FILES, ASSET_LABELS, AssetManifest
+from site_files import atomic_write
 
 # Загружаем переменные окружения
 load_dotenv(override=True)
 
-class ArticleAgent:
+class ArticleStreamAborted(Exception):
+    """Потоковая генерация прервана досрочно (неверное начало или обрезанный ответ)"""
+
+class ArticleStreamGuard:
+    """Инкрементальная проверка потоковой генерации статьи.
+
+    Накапливает чанки в памяти по мере поступления и проверяет ответ на лету:
+    неверное начало документа (не <!DOCTYPE html) и обрезанный ответ
+    обнаруживаются сразу, чтобы запрос можно было отменить.
+    """
+
+    OPENING = '<!DOCTYPE html'
+    REQUIRED_TAGS = ['<html', '<head', '<title', '<body', '</html>']
+
     def __init__(self):
+        self.chunks = []
+        self.opening = ""  # начало ответа без ведущих пробелов
+        self.tail = ""  # хвост предыдущего чанка для тегов на стыке
+        self.found_tags = set()
+        self.completed = False
+        self.abort_reason = None
+        self.usage = None  # usage из финального события (входные и закэшированные токены)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+    def feed(self, delta: str) -> Optional[str]:
+        """Принимает очередной чанк текста, возвращает причину прерывания или None"""
+        self.chunks.append(delta)
+
+        if len(self.opening) < len(self.OPENING):
+            self.opening = (self.opening + delta).lstrip()[:len(self.OPENING)]
+            if self.opening and not self.OPENING.startswith(self.opening):
+                self.abort_reason = "GPT вернул не HTML"
+                return self.abort_reason
+
+        window = self.tail + delta
+        for tag in self.REQUIRED_TAGS:
+            if tag not in self.found_tags and tag in window:
+                self.found_tags.add(tag)
+        self.tail = window[-16:]
+        return None
+
+    def on_event(self, event) -> Optional[str]:
+        """Обрабатывает событие потока Responses API"""
+        event_type = getattr(event, "type", "")
+        if event_type == "response.output_text.delta":
+            return self.feed(event.delta)
+        if event_type == "response.incomplete":
+            details = getattr(getattr(event, "response", None), "incomplete_details", None)
+            self.abort_reason = f"Ответ обрезан ({getattr(details, 'reason', 'incomplete')})"
+        elif event_type in ("response.failed", "error"):
+            error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", None)
+            self.abort_reason = f"Ошибка генерации: {getattr(error, 'message', error)}"
+        elif event_type == "response.completed":
+            self.completed = True
+            self.usage = getattr(getattr(event, "response", None), "usage", None)
+            if "</html>" not in self.found_tags:
+                self.abort_reason = "Ответ обрезан: нет закрывающего </html>"
+        return self.abort_reason
+
+    def finish(self) -> Optional[str]:
+        """Итоговая проверка после окончания потока"""
+        if not self.abort_reason and not self.completed:
+            self.abort_reason = "Поток прервался до завершения ответа"
+        return self.abort_reason
+
+class ArticleAgent:
+    # Оценка размера статьи в токенах для лимита TPM (HTML ~60 КБ)
+    EXPECTED_OUTPUT_TOKENS = 16000
+
+    def __init__(self, client: Optional[openai.OpenAI] = None):
         self.project_root = Path(__file__).parent
         # Читаем API ключ из переменных окружения
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("❌ OPENAI_API_KEY не найден в переменных окружения. Проверьте файл .env")
         
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Общий для процесса клиент с пулом keep-alive соединений (повторы — в планировщике)
+        self.client = client or get_client(self.api_key)
+        self._geo_agent = None  # GEOHybridAgent создается один раз и делит клиента с нами
         self.MODEL = "gpt-5-mini"
+        self.scheduler = get_scheduler(self.MODEL)
+        # Потоковая генерация с ранней отменой (ARTICLE_STREAMING=0 — ждать полный ответ)
+        self.STREAMING = os.getenv("ARTICLE_STREAMING", "1") != "0"
+        self.response_cache = get_response_cache()
 
         # AI-Ассистент: используем gpt-5-mini для генерации статей
         # self.MODEL = "gpt-5"  # для продакшена можно переключить на gpt-5
@@ -31,9 +115,40 @@ class ArticleAgent:
         # Responses API: без ограничений на длину вывода
         # self.max_output_tokens = None  # убираем ограничение
 
+        self._template_mtimes = None
+        self.article_template = self._load_article_template()
+
+    @property
+    def async_client(self):
+        """Асинхронный клиент OpenAI для пакетной генерации (общий пул для текущего event loop)"""
+        return get_async_client(self.api_key)
+
+    @property
+    def geo_agent(self):
+        """GEOHybridAgent на общем клиенте: соединения переиспользуются между статьями"""
+        if self._geo_agent is None:
+            from geo_hybrid_agent import GEOHybridAgent
+            self._geo_agent = GEOHybridAgent(client=self.client)
+        return self._geo_agent
+
+    def _template_source_mtimes(self):
+        """mtime шаблона и ассетов (от них зависят версии в итоговом шаблоне)"""
+        mtimes = []
+        for name in ("AI_ARTICLE_TEMPLATE.html", *ASSET_FILES.values()):
+            p = self.project_root / name
+            mtimes.append(p.stat().st_mtime if p.exists() else None)
+        return tuple(mtimes)
+
+    def refresh_template_if_changed(self) -> bool:
+        """Перечитывает шаблон, только если изменился он сам или один из ассетов"""
+        mtimes = self._template_source_mtimes()
+        if mtimes == self._template_mtimes:
+            return False
         self.article_template = self._load_article_template()
+        return True
 
     def _load_article_template(self):
+        self._template_mtimes = self._template_source_mtimes()
         p = self.project_root / "AI_ARTICLE_TEMPLATE.html"
         if p.exists():
             template = p.read_text(encoding="utf-8")
@@ -53,17 +168,19 @@ class ArticleAgent:
         extra = "AI-ассистент, автоматизация продаж, лидогенерация, чат-бот, GPT, нейросети, CRM, Bitrix24"
         return f"{base}, {extra}"
 
-    def _run_full_geo_optimization(self, article_filename: str):
-        """Запускает полную ГИБРИДНУЮ GEO-оптимизацию с GPT-5."""
+    def _run_full_geo_optimization(self, article_filename: str, draft: Optional[ArticleDraft] = None):
+        """Запускает полную ГИБРИДНУЮ GEO-оптимизацию с GPT-5 (для draft — в памяти, без записи)."""
         try:
-            from geo_hybrid_agent import GEOHybridAgent
             print("🚀 Запускаю ГИБРИДНУЮ GEO-оптимизацию с GPT-5...")
             
-            # Создаем гибридного агента оптимизации
-            hybrid_agent = GEOHybridAgent()
+            # Гибридный агент оптимизации (один на процесс, общий пул соединений)
+            hybrid_agent = self.geo_agent
             
             # Запускаем гибридную оптимизацию (анализ + GPT-5 планирование + применение)
-            result = hybrid_agent.run_hybrid_optimization(article_filename)
+            if draft is not None:
+                result = hybrid_agent.optimize_draft(draft)
+            else:
+                result = hybrid_agent.run_hybrid_optimization(article_filename)
             
             if result.get("success"):
                 print(f"✅ Гибридная GEO-оптимизация с GPT-5 завершена!")
@@ -97,47 +214,64 @@ class ArticleAgent:
         print("📋 Автоматически генерирую: целевая аудитория, имя файла, ключевые слова")
         print("🚀 После создания выполнится ГИБРИДНАЯ GEO-оптимизация с GPT-5")
         
+        # Статья проходит генерацию, GEO-оптимизацию и обновление файлов в памяти
+        # и записывается на диск один раз в конце
+        return ArticlePipeline(self).run(topic)
+
+    def build_batch_request(self, topic: str) -> dict:
+        """Готовит запрос статьи для офлайн-пакета Batch API (тот же промпт, что в create_article)"""
+        target_audience = self._generate_target_audience(topic)
+        filename = self._generate_filename(topic)
+        keywords = self._generate_keywords(topic)
+        msgs = self._build_article_messages(topic, target_audience, keywords)
+        return {
+            "topic": topic,
+            "target_audience": target_audience,
+            "filename": filename,
+            "keywords": keywords,
+            "body": {"model": self.MODEL, "input": msgs,
+                     "prompt_cache_key": prompt_cache_key(self.article_template)},
+        }
+
+    def accept_batch_article(self, topic: str, target_audience: str, article_filename: str,
+                             keywords: str, article_content: Optional[str]) -> dict:
+        """Принимает ответ из результатов Batch API: кэширует и валидирует без записи на диск"""
+        if article_content and self._is_cacheable_article(article_content):
+            msgs = self._build_article_messages(topic, target_audience, keywords)
+            self.response_cache.put(self._article_cache_key(msgs), article_content,
+                                    model=self.MODEL, stage="article", source="batch")
+        return self._finalize_article(topic, article_filename, article_content, write=False)
+
+    async def create_article_by_topic_async(self, topic: str) -> dict:
+        """Асинхронная версия create_article_by_topic для пакетного режима.
+
+        Генерация идет через асинхронный клиент, GEO-оптимизация и обновление
+        файлов выполняются в пуле потоков. Общие файлы (sitemap.xml, llms.txt,
+        index.html) защищены блокировками SiteTransaction, поэтому статьи
+        пакета публикуются параллельно.
+        """
+        print(f"🎯 [batch] Создаю статью по теме: '{topic}'")
+
         target_audience = self._generate_target_audience(topic)
         filename = self._generate_filename(topic)
         keywords = self._generate_keywords(topic)
-        result = self.create_article(topic, target_audience, filename, keywords)
+        result = await self.create_article_async(topic, target_audience, filename, keywords, write=False)
         if result.get("success"):
-            # Сначала полная GEO-оптимизация (все 14 шагов), затем обновление файлов
-            self._run_full_geo_optimization(filename)
-            self._run_automation(filename)
+            pipeline = ArticlePipeline(self)
+            draft = ArticleDraft(self.project_root, filename, result.pop("content"))
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, pipeline.optimize, draft)
+            await loop.run_in_executor(None, pipeline.publish, draft)
+            result["message"] = f"Статья '{topic}' сохранена в {filename}"
         return result
 
     def _update_template_versions(self, template: str) -> str:
-        """Автоматически обновляет версии файлов в шаблоне из index.html"""
+        """Автоматически обновляет версии файлов в шаблоне по манифесту ассетов (хэши содержимого)"""
         try:
-            index_path = self.project_root / "index.html"
-            if not index_path.exists():
-                print("⚠️  index.html не найден, используем базовые версии")
-                return template
-            
-            with open(index_path, 'r', encoding='utf-8') as f:
-                index_content = f.read()
-            
-            # Получаем актуальные версии
-            css_match = re.search(r'href="/assets/css/styles\.css\?v=(\d+)"', index_content)
-            js_match = re.search(r'src="/js/app\.js\?v=(\d+)"', index_content)
-            widget_match = re.search(r'src="/js/sv-video-widget\.js\?v=(\d+)"', index_content)
-            
-            if css_match:
-                css_version = css_match.group(1)
-                template = re.sub(r'href="/assets/css/styles\.css\?v=\d+"', f'href="/assets/css/styles.css?v={css_version}"', template)
-                print(f"🎨 CSS версия обновлена до v{css_version}")
-            
-            if js_match:
-                js_version = js_match.group(1)
-                template = re.sub(r'src="/js/app\.js\?v=\d+"', f'src="/js/app.js?v={js_version}"', template)
-                print(f"⚡ JS версия обновлена до v{js_version}")
-            
-            if widget_match:
-                widget_version = widget_match.group(1)
-                template = re.sub(r'src="/js/sv-video-widget\.js\?v=\d+"', f'src="/js/sv-video-widget.js?v={widget_version}"', template)
-                print(f"🎥 Видео-виджет версия обновлена до v{widget_version}")
-            
+            manifest = AssetManifest(self.project_root).refresh()
+            template, changed = manifest.apply(template)
+            for key in changed:
+                print(f"{ASSET_LABELS[key]} версия обновлена до v{manifest.version(key)}")
             return template
             
         except Exception as e:
@@ -279,220 +413,251 @@ class ArticleAgent:
         
         return validation
 
-    def create_article(self, topic: str, target_audience: str,
-                       article_filename: str, keywords: str = "") -> dict:
-        try:
-            prompt = f"""
-Создай SEO + GEO/LLMO оптимизированную статью для SmartVizitka на тему: "{topic}"
-
-Целевая аудитория: {target_audience}
-Ключевые слова: {keywords or 'автоматизация, AI, нейросети, бизнес, CRM'}
-
-## 🎯 ЦЕЛЕВАЯ АУДИТОРИЯ SMARTVIZITKA:
-
-### **1. Сегменты бизнеса:**
-• Салоны красоты и барбершопы — мастера, студии с 1–10 сотрудников
-• Медицинские и оздоровительные услуги — стоматологии, массажисты, клиники
-• Фитнес и спорт — тренеры, залы, секции
-• Образование и репетиторы — частные школы, курсы, репетиторы
-• Бытовые и сервисные услуги — автомойки, ремонт, клининг, прокат
-• Досуг и развлечения — студии танца, квесты, кружки
-
-### **2. Размер бизнеса:**
-• Индивидуальные предприниматели и малые компании (1–30 сотрудников)
-• Без выделенного IT-отдела, ограниченный бюджет
-
-### **3. Боли и потребности:**
-• Постоянные «пустые окна» и неявки клиентов
-• Хаос в записях (блокнот, Excel, телефонные звонки)
-• Нет прозрачности в финансах и загрузке
-• Нужно больше клиентов, но нет времени и бюджета на маркетинг
-• Желание удерживать существующих клиентов, запускать акции и бонусы
-
-### **4. Ценности и мотивация:**
-• Простота: «чтобы всё работало сразу, без программиста»
-• Доступность: бесплатно/дешево, без подписок
-• Гибкость: записи 24/7, уведомления, аналитика «в одном окне»
-• Рост дохода: больше записей, меньше неявок, возврат клиентов
-
-### **5. Поведенческие особенности:**
-• Активные пользователи WhatsApp, Instagram, Telegram
-• Решают вопросы быстро (без долгого чтения инструкций)
-• Готовы пробовать новое, если «бесплатно и без риска»
-
-**Используй эти данные для создания релевантного контента, который точно попадет в боли и потребности целевой аудитории!**
-
-**🎯 ГЛАВНОЕ ПРАВИЛО: Статья должна быть ПОЛЕЗНОЙ для читателя - давать реальные знания, инструменты и понимание, а не только рассказывать о SmartVizitka. Читатель должен получить практическую ценность от прочтения!**
-
-Используй этот HTML-шаблон и замени все заглушки:
-
-{self.article_template}
-
-**⚠️ КРИТИЧЕСКИ ВАЖНО: В шаблоне есть комментарии-инструкции для каждого раздела. СЛЕДУЙ ИМ СТРОГО!**
-**Каждый раздел должен давать читателю РЕАЛЬНУЮ ПОЛЬЗУ, а не быть рекламой SmartVizitka!**
-
-## 🎯 ОБЯЗАТЕЛЬНЫЕ ТРЕБОВАНИЯ:
-
-### **1. Структура контента:**
-- **4 раздела (H2)** с четкой логикой
-- **FAQ блок** с 6 вопросами и ответами
-- **Каждый раздел** должен следовать структуре: БОЛЬ → РЕШЕНИЕ → РЕЗУЛЬТАТ → ЦЕННОСТЬ (описывать естественно, без явных слов "боль", "решение", "результат")
-
-### **2. Мета-теги (обязательно):**
-- Title: "{topic} - SmartVizitka" (60-70 символов)
-- Description: SEO-описание (150-160 символов)
-- Keywords: ключевые слова через запятую
-- Author: SmartVizitka
-- Robots: index, follow, max-snippet:-1, max-image-preview:large, max-video-preview:-1
-- Canonical: ссылка на статью
-- OpenGraph: title, description, type=article, image, url, locale, site_name, article:published_time, article:modified_time, article:author, article:section, article:tag
-- Twitter: card=summary_large_image, site, creator, title, description, image
-
-### **3. JSON-LD схемы (обязательно):**
-- **Article**: headline, description, image, keywords, author, publisher, datePublished, dateModified, articleSection, articleBody
-- **WebSite**: name, url, description, potentialAction (SearchAction)
-- **BreadcrumbList**: itemListElement с навигацией (Главная → Статьи → [Тема статьи])
-- **FAQPage**: mainEntity с 6 вопросами
-
-### **4. CTA блоки:**
-- **После каждого раздела** (4 CTA)
-- **Главный CTA в конце** статьи
-- **Все ссылки** ведут на главную страницу (/)
-
-### **5. SEO-оптимизация:**
-- Используй ключевые слова в **H1, H2 заголовках**
-- **H1** - только один на странице
-- **H2** - минимум 4, максимум 6
-- **Внутренние ссылки** на главную страницу
-
-### **6. Контент:**
-- **Раздел 1**: Проблемы и боли целевой аудитории (описывать естественно, без явных слов "боль", "решение", "результат")
-- **Раздел 2**: Как AI-технологии решают эти проблемы (описывать процесс и технологии)
-- **Раздел 3**: Конкретные результаты и преимущества (цифры, кейсы, метрики)
-- **Раздел 4**: Практическое применение и внедрение (пошагово, с примерами)
-
-### **7. FAQ вопросы (для LLM поиска):**
-- **Вопрос 1**: Что такое [тема статьи] для бизнеса?
-- **Вопрос 2**: Как работает [тема статьи] в [отрасли]?
-- **Вопрос 3**: Какие преимущества [темы статьи] перед традиционными методами?
-- **Вопрос 4**: Сколько стоит внедрение [темы статьи]?
-- **Вопрос 5**: Как внедрить [тему статьи] в бизнес?
-- **Вопрос 6**: Есть ли поддержка при использовании [темы статьи]?
-
-**ВАЖНО:** FAQ вопросы должны быть конкретными и содержать ключевые слова для лучшего попадания в ответы LLM при поиске информации.
-
-### **8. Качество контента (ОБЯЗАТЕЛЬНО):**
-- **Статья должна быть ИНФОРМАТИВНОЙ** - давать реальные знания, а не только рекламу
-- **Практическая польза** - читатель должен получить конкретные инструменты и понимание
-- **НЕ должно быть прямой рекламы SmartVizitka** - упоминания только в контексте решения проблем
-- **Объективная информация** - честно рассказывать о возможностях и ограничениях
-- **Кейсы и примеры** - реальные истории успеха и применения
-- **Пошаговые инструкции** - конкретные действия, которые можно применить
-- **Экспертное мнение** - глубокое понимание темы, а не поверхностная информация
-
-## ⚠️ ВАЖНО:
-- Верни ПОЛНЫЙ HTML-код от <!DOCTYPE html> до </html>
-- НЕ изменяй структуру шаблона
-- Замени ВСЕ заглушки на реальный контент, включая:
-  * ЗАГОЛОВОК_СТАТЬИ
-  * ОПИСАНИЕ_СТАТЬИ
-  * КЛЮЧЕВЫЕ_СЛОВА_СТАТЬИ
-  * НАЗВАНИЕ_ФАЙЛА
-  * СОДЕРЖИМОЕ_СТАТЬИ_ДЛЯ_JSON_LD
-- Сохрани все CSS классы и атрибуты
-- Видео-виджет уже подключен - НЕ трогай его
-- Все даты используй в формате ISO 8601: 2025-01-01T00:00:00+03:00
-"""
-
-            # Responses API: messages → input
-            msgs = [
-                {"role": "system", "content": "Ты эксперт по созданию SEO + GEO/LLMO оптимизированных HTML-статей. Твоя задача - создавать качественные, валидные HTML-страницы с правильной структурой, мета-тегами и JSON-LD схемами. КРИТИЧЕСКИ ВАЖНО: статьи должны быть ИНФОРМАТИВНЫМИ и давать реальную практическую пользу читателю, а не быть прямой рекламой. Отвечай ТОЛЬКО валидным HTML-кодом, без пояснений."},
-                {"role": "user", "content": prompt},
-            ]
-
-            print(f"🔧 Отправляю запрос к модели {self.MODEL}...")
-            
-            resp = self.client.responses.create(
-                model=self.MODEL,
-                input=msgs,
-                # max_output_tokens убран - без ограничений
-            )
-            
-            print(f"🔧 Получен ответ от API")
-
-            # Проверяем ответ
-            if not hasattr(resp, 'output_text') or not resp.output_text:
-                return {
-                    "success": False,
-                    "error": "GPT не вернул содержимое статьи",
-                    "message": "Ошибка: GPT не сгенерировал содержимое"
-                }
-
-            article_content = resp.output_text
-
-            # Проверяем, что это похоже на HTML
-            if not article_content.strip().startswith('<!DOCTYPE html'):
-                return {
-                    "success": False,
-                    "error": "GPT вернул не HTML",
-                    "message": "Ошибка: GPT вернул не HTML-код"
-                }
-
-            # Валидируем созданную статью
-            print("🔍 Выполняю валидацию созданной статьи...")
-            
-            html_validation = self._validate_html_structure(article_content)
-            json_ld_validation = self._validate_json_ld(article_content)
-            
-            # Выводим результаты валидации
-            print("\n📊 Результаты валидации HTML:")
-            for check in html_validation["checks"].values():
-                print(f"   {check}")
-            
-            if html_validation["warnings"]:
-                print("\n⚠️  Предупреждения HTML:")
-                for warning in html_validation["warnings"]:
-                    print(f"   {warning}")
-            
-            if html_validation["errors"]:
-                print("\n❌ Ошибки HTML:")
-                for error in html_validation["errors"]:
-                    print(f"   {error}")
-            
-            print("\n📊 Результаты валидации JSON-LD:")
-            for check in json_ld_validation["checks"].values():
-                print(f"   {check}")
-            
-            if json_ld_validation["warnings"]:
-                print("\n⚠️  Предупреждения JSON-LD:")
-                for warning in json_ld_validation["warnings"]:
-                    print(f"   {warning}")
-            
-            if json_ld_validation["errors"]:
-                print("\n❌ Ошибки JSON-LD:")
-                for error in json_ld_validation["errors"]:
-                    print(f"   {error}")
-            
-            # Проверяем общий результат валидации
-            overall_success = html_validation["success"] and json_ld_validation["success"]
-            
-            if not overall_success:
-                print("\n⚠️  Статья создана, но есть критические ошибки валидации!")
-                print("   Рекомендуется проверить и исправить перед публикацией.")
-            else:
-                print("\n✅ Валидация пройдена успешно! Статья готова к публикации.")
+    def _build_article_messages(self, topic: str, target_audience: str, keywords: str = "") -> list:
+        """Формирует input для Responses API: общий для всех тем префикс, переменные темы в конце"""
+        return build_article_input(self.article_template, topic, target_audience, keywords)
+
+    def _request_options(self) -> dict:
+        """Параметры запроса статьи: ключ кэша промптов по неизменному префиксу"""
+        return {"extra_body": {"prompt_cache_key": prompt_cache_key(self.article_template)}}
 
-            # Сохраняем
-            article_path = self.project_root / article_filename
-            article_path.write_text(article_content, encoding="utf-8")
+    def _record_usage(self, usage, article_filename: str):
+        cached = record_usage(usage)
+        input_tokens = getattr(usage, "input_tokens", None)
+        if input_tokens:
+            print(f"🧠 [{article_filename}] Кэш промпта: {cached} из {input_tokens} входных токенов")
 
+    def _finalize_article(self, topic: str, article_filename: str, article_content: str,
+                          write: bool = True) -> dict:
+        """Проверяет ответ модели, валидирует и сохраняет статью.
+
+        write=False — статья не записывается, а возвращается в поле "content"
+        (для конвейера ArticlePipeline).
+        """
+        if not article_content:
+            return {
+                "success": False,
+                "error": "GPT не вернул содержимое статьи",
+                "message": "Ошибка: GPT не сгенерировал содержимое"
+            }
+
+        # Проверяем, что это похоже на HTML
+        if not article_content.strip().startswith('<!DOCTYPE html'):
+            return {
+                "success": False,
+                "error": "GPT вернул не HTML",
+                "message": "Ошибка: GPT вернул не HTML-код"
+            }
+
+        # Валидируем созданную статью
+        print("🔍 Выполняю валидацию созданной статьи...")
+        
+        html_validation = self._validate_html_structure(article_content)
+        json_ld_validation = self._validate_json_ld(article_content)
+        
+        # Выводим результаты валидации
+        print("\n📊 Результаты валидации HTML:")
+        for check in html_validation["checks"].values():
+            print(f"   {check}")
+        
+        if html_validation["warnings"]:
+            print("\n⚠️  Предупреждения HTML:")
+            for warning in html_validation["warnings"]:
+                print(f"   {warning}")
+        
+        if html_validation["errors"]:
+            print("\n❌ Ошибки HTML:")
+            for error in html_validation["errors"]:
+                print(f"   {error}")
+        
+        print("\n📊 Результаты валидации JSON-LD:")
+        for check in json_ld_validation["checks"].values():
+            print(f"   {check}")
+        
+        if json_ld_validation["warnings"]:
+            print("\n⚠️  Предупреждения JSON-LD:")
+            for warning in json_ld_validation["warnings"]:
+                print(f"   {warning}")
+        
+        if json_ld_validation["errors"]:
+            print("\n❌ Ошибки JSON-LD:")
+            for error in json_ld_validation["errors"]:
+                print(f"   {error}")
+        
+        # Проверяем общий результат валидации
+        overall_success = html_validation["success"] and json_ld_validation["success"]
+        
+        if not overall_success:
+            print("\n⚠️  Статья создана, но есть критические ошибки валидации!")
+            print("   Рекомендуется проверить и исправить перед публикацией.")
+        else:
+            print("\n✅ Валидация пройдена успешно! Статья готова к публикации.")
+
+        article_path = self.project_root / article_filename
+        if not write:
             return {
                 "success": True,
                 "filename": article_filename,
                 "path": str(article_path),
-                "message": f"Статья '{topic}' сохранена в {article_filename}",
+                "content": article_content,
+                "message": f"Статья '{topic}' сгенерирована (еще не сохранена)",
             }
 
+        # Сохраняем: временный файл с правами по umask и переименование (nginx не увидит половину статьи)
+        atomic_write(article_path, article_content)
+
+        return {
+            "success": True,
+            "filename": article_filename,
+            "path": str(article_path),
+            "message": f"Статья '{topic}' сохранена в {article_filename}",
+        }
+
+    @staticmethod
+    def _stream_aborted(reason: str):
+        print(f"🛑 Генерация прервана досрочно: {reason}")
+        raise ArticleStreamAborted(reason)
+
+    def _request_article_streaming(self, article_filename: str, msgs: list) -> Tuple[str, object]:
+        """Потоковая генерация: чанки накапливаются в памяти, ошибки обрывают запрос"""
+        guard = ArticleStreamGuard()
+        # Выход из with закрывает соединение — так запрос отменяется на стороне API
+        with self.client.responses.create(model=self.MODEL, input=msgs, stream=True,
+                                          **self._request_options()) as stream:
+            for event in stream:
+                if guard.on_event(event):
+                    break
+
+        self._record_usage(guard.usage, article_filename)
+        reason = guard.finish()
+        if reason:
+            self._stream_aborted(reason)
+
+        print(f"🔧 Получен потоковый ответ от API ({len(guard.content)} символов)")
+        return guard.content, guard.usage
+
+    async def _request_article_streaming_async(self, article_filename: str, msgs: list) -> Tuple[str, object]:
+        """Асинхронная версия _request_article_streaming"""
+        guard = ArticleStreamGuard()
+        stream = await self.async_client.responses.create(model=self.MODEL, input=msgs, stream=True,
+                                                          **self._request_options())
+        async with stream:
+            async for event in stream:
+                if guard.on_event(event):
+                    break
+
+        self._record_usage(guard.usage, article_filename)
+        reason = guard.finish()
+        if reason:
+            self._stream_aborted(reason)
+
+        print(f"🔧 [{article_filename}] Получен потоковый ответ от API ({len(guard.content)} символов)")
+        return guard.content, guard.usage
+
+    def _article_cache_key(self, msgs: list) -> str:
+        """Ключ кэша ответа: модель + полный input"""
+        return self.response_cache.make_key(model=self.MODEL, input=msgs)
+
+    @staticmethod
+    def _is_cacheable_article(content: str) -> bool:
+        return content.strip().startswith('<!DOCTYPE html')
+
+    def create_article(self, topic: str, target_audience: str,
+                       article_filename: str, keywords: str = "", write: bool = True) -> dict:
+        try:
+            msgs = self._build_article_messages(topic, target_audience, keywords)
+            requested = []
+
+            def request_article():
+                requested.append(True)
+                print(f"🔧 Отправляю запрос к модели {self.MODEL}...")
+
+                estimated_tokens = self.scheduler.estimate_tokens(msgs, self.EXPECTED_OUTPUT_TOKENS)
+                if self.STREAMING:
+                    content, _ = self.scheduler.call(
+                        lambda: self._request_article_streaming(article_filename, msgs),
+                        estimated_tokens, article_filename,
+                        stage="article", article=article_filename, usage=lambda result: result[1])
+                    return content
+
+                resp = self.scheduler.call(
+                    lambda: self.client.responses.create(
+                        model=self.MODEL,
+                        input=msgs,
+                        # max_output_tokens убран - без ограничений
+                        **self._request_options(),
+                    ),
+                    estimated_tokens, article_filename, stage="article", article=article_filename)
+
+                print(f"🔧 Получен ответ от API")
+                self._record_usage(getattr(resp, 'usage', None), article_filename)
+                return getattr(resp, 'output_text', None)
+
+            article_content = self.response_cache.get_or_create(
+                self._article_cache_key(msgs), request_article,
+                should_cache=self._is_cacheable_article, model=self.MODEL, stage="article"
+            )
+            if not requested:
+                print("💾 Ответ модели взят из кэша")
+
+            return self._finalize_article(topic, article_filename, article_content, write=write)
+
+        except ArticleStreamAborted as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Ошибка: генерация прервана — {str(e)}"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Ошибка при создании статьи: {str(e)}"
+            }
+
+    async def create_article_async(self, topic: str, target_audience: str,
+                                   article_filename: str, keywords: str = "", write: bool = True) -> dict:
+        """Асинхронная версия create_article (используется пакетным режимом генератора)"""
+        try:
+            msgs = self._build_article_messages(topic, target_audience, keywords)
+            requested = []
+
+            async def request_article():
+                requested.append(True)
+                print(f"🔧 [{article_filename}] Отправляю асинхронный запрос к модели {self.MODEL}...")
+
+                estimated_tokens = self.scheduler.estimate_tokens(msgs, self.EXPECTED_OUTPUT_TOKENS)
+                if self.STREAMING:
+                    content, _ = await self.scheduler.acall(
+                        lambda: self._request_article_streaming_async(article_filename, msgs),
+                        estimated_tokens, article_filename,
+                        stage="article", article=article_filename, usage=lambda result: result[1])
+                    return content
+
+                resp = await self.scheduler.acall(
+                    lambda: self.async_client.responses.create(model=self.MODEL, input=msgs,
+                                                               **self._request_options()),
+                    estimated_tokens, article_filename, stage="article", article=article_filename)
+
+                print(f"🔧 [{article_filename}] Получен ответ от API")
+                self._record_usage(getattr(resp, 'usage', None), article_filename)
+                return getattr(resp, 'output_text', None)
+
+            article_content = await self.response_cache.aget_or_create(
+                self._article_cache_key(msgs), request_article,
+                should_cache=self._is_cacheable_article, model=self.MODEL, stage="article"
+            )
+            if not requested:
+                print(f"💾 [{article_filename}] Ответ модели взят из кэша")
+
+            return self._finalize_article(topic, article_filename, article_content, write=write)
+
+        except ArticleStreamAborted as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Ошибка: генерация прервана — {str(e)}"
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -555,7 +720,7 @@ class ArticleAgent:
         
         print("\n🎉 Работа агента завершена!")
 
-    def _run_automation(self, article_filename: str):
+    def _run_automation(self, article_filename: str, draft: Optional[ArticleDraft] = None):
         """
         Запускает автоматическое обновление файлов (после GEO-оптимизации)
         """
@@ -566,7 +731,7 @@ class ArticleAgent:
             from auto_article_updater import ArticleUpdater
             
             updater = ArticleUpdater()
-            updater.update_all_files(article_filename)
+            updater.update_all_files(article_filename, draft)
             
             print("✅ Автоматизация завершена!")
             
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Конвейер обработки статьи в памяти для AI-Ассистент
+Статья проходит ArticleAgent → GEOHybridAgent → ArticleUpdater как один
+объект ArticleDraft: HTML разбирается по требованию один раз на версию
+содержимого, а на диск записывается один раз — в конце, в commit().
+
+StagedArticlePipeline разносит этапы по потокам: пока статья N+1
+генерируется, статья N проходит GEO-планирование, а N-1 — обновление
+файлов сайта. Между этапами — ограниченные очереди, у каждого этапа свое
+число воркеров, и пропускная способность определяется самым медленным
+этапом, а не суммой всех этапов.
+"""
+
+import os
+import time
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backup_store import get_backup_store
+from html_document import HTMLDocument
+from site_files import atomic_write
+
+
+class ArticleDraft:
+    """Статья в памяти: текущее содержимое, разобранный документ и снимки для backup"""
+
+    def __init__(self, project_root, filename: str, content: str, on_disk: bool = False):
+        self.project_root = Path(project_root)
+        self.filename = filename
+        self._content = content
+        self._document: Optional[HTMLDocument] = None
+        self.snapshots: List[Tuple[str, str]] = []  # (метка, содержимое до изменения)
+        self.dirty = not on_disk
+
+    @classmethod
+    def load(cls, project_root, filename: str) -> "ArticleDraft":
+        """Читает существующую статью с диска"""
+        path = Path(project_root) / filename
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(project_root, filename, f.read(), on_disk=True)
+
+    @property
+    def path(self) -> Path:
+        return self.project_root / self.filename
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        if value != self._content:
+            self._content = value
+            self._document = None
+            self.dirty = True
+
+    @property
+    def document(self) -> HTMLDocument:
+        """Модель документа для текущего содержимого (разбирается один раз на версию)"""
+        if self._document is None:
+            self._document = HTMLDocument(self._content)
+        return self._document
+
+    def snapshot(self, label: str):
+        """Запоминает текущее содержимое как backup с меткой (gpt, rules ...)"""
+        self.snapshots.append((label, self._content))
+
+    def backup_ref(self, label: str) -> str:
+        """Ссылка на снимок для восстановления: python3 backup_store.py restore <ссылка>"""
+        return f"{self.filename}@{label}"
+
+    def commit(self) -> Path:
+        """Сохраняет backup-снимки в хранилище (вне каталога сайта) и статью на диск (только если что-то изменилось)"""
+        if self.snapshots:
+            store = get_backup_store()
+            for label, content in self.snapshots:
+                store.save(self.filename, label, content)
+        self.snapshots = []
+
+        if self.dirty:
+            # Временный файл и переименование: nginx не отдаст статью, записанную наполовину
+            atomic_write(self.path, self._content)
+            self.dirty = False
+        return self.path
+
+
+class ArticlePipeline:
+    """Генерация → гибридная GEO-оптимизация → обновление файлов сайта без промежуточных записей"""
+
+    def __init__(self, article_agent):
+        self.article_agent = article_agent
+
+    def run(self, topic: str) -> dict:
+        """Создает статью по теме и доводит ее до публикации"""
+        result, draft = self.generate(topic)
+        if draft is None:
+            return result
+
+        self.process(draft)
+        result["message"] = f"Статья '{topic}' сохранена в {draft.filename}"
+        return result
+
+    def generate(self, topic: str) -> Tuple[dict, Optional[ArticleDraft]]:
+        """Генерация статьи в память: (результат ArticleAgent, черновик или None при ошибке)"""
+        agent = self.article_agent
+        target_audience = agent._generate_target_audience(topic)
+        filename = agent._generate_filename(topic)
+        keywords = agent._generate_keywords(topic)
+
+        result = agent.create_article(topic, target_audience, filename, keywords, write=False)
+        if not result.get("success"):
+            return result, None
+        return result, ArticleDraft(agent.project_root, filename, result.pop("content"))
+
+    def process(self, draft: ArticleDraft):
+        """GEO-оптимизация и обновление файлов для уже сгенерированной статьи"""
+        self.optimize(draft)
+        self.publish(draft)
+
+    def optimize(self, draft: ArticleDraft):
+        """Полная гибридная GEO-оптимизация в памяти"""
+        self.article_agent._run_full_geo_optimization(draft.filename, draft)
+
+    def publish(self, draft: ArticleDraft):
+        """Обновление файлов сайта; статья фиксируется на диске здесь"""
+        try:
+            self.article_agent._run_automation(draft.filename, draft)
+        finally:
+            # Статья не должна потеряться, даже если автоматизация упала до записи
+            if draft.dirty or draft.snapshots:
+                draft.commit()
+
+
+class PipelineJob:
+    """Тема, проходящая этапы StagedArticlePipeline"""
+
+    def __init__(self, key, topic: str):
+        self.key = key  # идентификатор вызывающей стороны (например, индекс темы в очереди)
+        self.topic = topic
+        self.result: dict = {}
+        self.draft: Optional[ArticleDraft] = None
+        self.timings: Dict[str, float] = {}
+
+
+# Этапы конвейера: имя -> переменная окружения с числом воркеров и значение по умолчанию.
+# Общие файлы сайта (sitemap.xml, llms.txt, index.html) публикация меняет в SiteTransaction
+# под блокировками файлов, поэтому воркеров публикации (и процессов) может быть несколько.
+PIPELINE_STAGES = (
+    ("generate", "PIPELINE_GENERATE_WORKERS", "2"),
+    ("optimize", "PIPELINE_OPTIMIZE_WORKERS", "2"),
+    ("publish", "PIPELINE_PUBLISH_WORKERS", "1"),
+)
+
+
+class StagedArticlePipeline:
+    """Конвейер генерация → GEO-оптимизация → публикация для потока тем.
+
+    Каждый этап — пул потоков, читающий из своей ограниченной очереди.
+    Когда следующий этап не успевает, его очередь заполняется и предыдущий
+    этап ждет (обратное давление), поэтому в памяти одновременно не больше
+    workers + queue_size черновиков на этап.
+    """
+
+    _STOP = object()
+
+    def __init__(self, article_agent, workers: Optional[Dict[str, int]] = None, queue_size: Optional[int] = None):
+        self.pipeline = ArticlePipeline(article_agent)
+        workers = workers or {}
+        self.workers = {
+            name: max(1, int(workers.get(name) or os.getenv(env_name, default)))
+            for name, env_name, default in PIPELINE_STAGES
+        }
+        self.queue_size = max(1, int(queue_size or os.getenv("PIPELINE_QUEUE_SIZE", "2")))
+        self._stats_lock = threading.Lock()
+        self.busy_seconds = {name: 0.0 for name, _, _ in PIPELINE_STAGES}
+
+    # ---------- этапы ----------
+
+    def _stage_generate(self, job: PipelineJob) -> bool:
+        job.result, job.draft = self.pipeline.generate(job.topic)
+        return job.draft is not None
+
+    def _stage_optimize(self, job: PipelineJob) -> bool:
+        self.pipeline.optimize(job.draft)
+        return True
+
+    def _stage_publish(self, job: PipelineJob) -> bool:
+        self.pipeline.publish(job.draft)
+        job.result["message"] = f"Статья '{job.topic}' сохранена в {job.draft.filename}"
+        return True
+
+    def _worker(self, name: str, handler: Callable, inbox: queue.Queue, outbox: queue.Queue, done: queue.Queue):
+        while True:
+            job = inbox.get()
+            if job is self._STOP:
+                return
+            started = time.perf_counter()
+            try:
+                passed = handler(job)
+            except Exception as e:
+                job.result = {"success": False, "error": f"{name}: {e}"}
+                passed = False
+            elapsed = time.perf_counter() - started
+            job.timings[name] = elapsed
+            with self._stats_lock:
+                self.busy_seconds[name] += elapsed
+            # Последний этап и ошибки сразу отдаются вызывающей стороне
+            (outbox if passed and outbox is not None else done).put(job)
+
+    # ---------- запуск ----------
+
+    def run(self, items: Iterable[Tuple[object, str]],
+            on_result: Optional[Callable[[PipelineJob], None]] = None) -> List[PipelineJob]:
+        """Прогоняет темы [(ключ, тема)] через конвейер.
+
+        on_result вызывается в потоке вызывающей стороны по мере готовности
+        каждой темы (успех или ошибка на любом этапе), поэтому в нем можно
+        работать с объектами, не рассчитанными на многопоточность (очередь тем).
+        """
+        items = list(items)
+        names = [name for name, _, _ in PIPELINE_STAGES]
+        handlers = {"generate": self._stage_generate, "optimize": self._stage_optimize,
+                    "publish": self._stage_publish}
+        inboxes = {name: queue.Queue(maxsize=self.queue_size) for name in names}
+        done: queue.Queue = queue.Queue()
+
+        print(f"🏭 Конвейер: {len(items)} тем, воркеры "
+              + ", ".join(f"{name}={self.workers[name]}" for name in names)
+              + f", очередь между этапами {self.queue_size}")
+
+        stages = []
+        for position, name in enumerate(names):
+            outbox = inboxes[names[position + 1]] if position + 1 < len(names) else None
+            threads = [threading.Thread(target=self._worker, name=f"pipeline-{name}-{i}", daemon=True,
+                                        args=(name, handlers[name], inboxes[name], outbox, done))
+                       for i in range(self.workers[name])]
+            for thread in threads:
+                thread.start()
+            stages.append((name, threads))
+
+        def feed():
+            for key, topic in items:
+                inboxes[names[0]].put(PipelineJob(key, topic))
+
+        started = time.perf_counter()
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        finished = []
+        while len(finished) < len(items):
+            job = done.get()
+            finished.append(job)
+            if on_result is not None:
+                on_result(job)
+
+        # Все задания прошли: останавливаем этапы по порядку
+        feeder.join()
+        for name, threads in stages:
+            for _ in threads:
+                inboxes[name].put(self._STOP)
+            for thread in threads:
+                thread.join()
+
+        self._print_stats(time.perf_counter() - started, len(items))
+        return finished
+
+    def _print_stats(self, wall_seconds: float, count: int):
+        """Загрузка этапов: самый загруженный этап и есть узкое место конвейера"""
+        if not count or wall_seconds <= 0:
+            return
+        print(f"⏱️ Конвейер: {count} тем за {wall_seconds:.1f} сек")
+        loads = {}
+        for name, busy in self.busy_seconds.items():
+            loads[name] = busy / (wall_seconds * self.workers[name])
+            print(f"   {name}: занят {busy:.1f} сек, загрузка воркеров {loads[name] * 100:.0f}%")
+        print(f"   узкое место: {max(loads, key=loads.get)}")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сборка промпта статьи для AI-Ассистент
+Кэш промптов OpenAI срабатывает только на общем начале запроса, поэтому
+промпт собирается так: system, затем неизменные инструкции и HTML-шаблон
+(одинаковые для всех тем), и только в самом конце — тема, аудитория
+и ключевые слова. Доля закэшированных входных токенов (usage.input_tokens_details.cached_tokens)
+копится в PromptCacheStats, чтобы попадания в кэш было видно.
+"""
+
+import hashlib
+import threading
+from typing import Dict, List
+
+DEFAULT_KEYWORDS = "автоматизация, AI, нейросети, бизнес, CRM"
+
+ARTICLE_SYSTEM_PROMPT = (
+    'Ты эксперт по созданию SEO + GEO/LLMO оптимизированных HTML-статей. Твоя задача - создавать качественные, валидные HTML-страницы с правильной структурой, мета-тегами и JSON-LD схемами. КРИТИЧЕСКИ ВАЖНО: статьи должны быть ИНФОРМАТИВНЫМИ и давать реальную практическую пользу читателю, а не быть прямой рекламой. Отвечай ТОЛЬКО валидным HTML-кодом, без пояснений.'
+)
+
+# Неизменная часть до шаблона: аудитория, главное правило
+ARTICLE_INSTRUCTIONS = """
+Создай SEO + GEO/LLMO оптимизированную статью для SmartVizitka. Тема, целевая аудитория
+и ключевые слова указаны в разделе «ЗАДАНИЕ» в самом конце.
+
+## 🎯 ЦЕЛЕВАЯ АУДИТОРИЯ SMARTVIZITKA:
+
+### **1. Сегменты бизнеса:**
+• Салоны красоты и барбершопы — мастера, студии с 1–10 сотрудников
+• Медицинские и оздоровительные услуги — стоматологии, массажисты, клиники
+• Фитнес и спорт — тренеры, залы, секции
+• Образование и репетиторы — частные школы, курсы, репетиторы
+• Бытовые и сервисные услуги — автомойки, ремонт, клининг, прокат
+• Досуг и развлечения — студии танца, квесты, кружки
+
+### **2. Размер бизнеса:**
+• Индивидуальные предприниматели и малые компании (1–30 сотрудников)
+• Без выделенного IT-отдела, ограниченный бюджет
+
+### **3. Боли и потребности:**
+• Постоянные «пустые окна» и неявки клиентов
+• Хаос в записях (блокнот, Excel, телефонные звонки)
+• Нет прозрачности в финансах и загрузке
+• Нужно больше клиентов, но нет времени и бюджета на маркетинг
+• Желание удерживать существующих клиентов, запускать акции и бонусы
+
+### **4. Ценности и мотивация:**
+• Простота: «чтобы всё работало сразу, без программиста»
+• Доступность: бесплатно/дешево, без подписок
+• Гибкость: записи 24/7, уведомления, аналитика «в одном окне»
+• Рост дохода: больше записей, меньше неявок, возврат клиентов
+
+### **5. Поведенческие особенности:**
+• Активные пользователи WhatsApp, Instagram, Telegram
+• Решают вопросы быстро (без долгого чтения инструкций)
+• Готовы пробовать новое, если «бесплатно и без риска»
+
+**Используй эти данные для создания релевантного контента, который точно попадет в боли и потребности целевой аудитории!**
+
+**🎯 ГЛАВНОЕ ПРАВИЛО: Статья должна быть ПОЛЕЗНОЙ для читателя - давать реальные знания, инструменты и понимание, а не только рассказывать о SmartVizitka. Читатель должен получить практическую ценность от прочтения!**
+
+Используй этот HTML-шаблон и замени все заглушки:
+
+"""
+
+# Неизменная часть после шаблона: обязательные требования
+ARTICLE_REQUIREMENTS = """
+
+**⚠️ КРИТИЧЕСКИ ВАЖНО: В шаблоне есть комментарии-инструкции для каждого раздела. СЛЕДУЙ ИМ СТРОГО!**
+**Каждый раздел должен давать читателю РЕАЛЬНУЮ ПОЛЬЗУ, а не быть рекламой SmartVizitka!**
+
+## 🎯 ОБЯЗАТЕЛЬНЫЕ ТРЕБОВАНИЯ:
+
+### **1. Структура контента:**
+- **4 раздела (H2)** с четкой логикой
+- **FAQ блок** с 6 вопросами и ответами
+- **Каждый раздел** должен следовать структуре: БОЛЬ → РЕШЕНИЕ → РЕЗУЛЬТАТ → ЦЕННОСТЬ (описывать естественно, без явных слов "боль", "решение", "результат")
+
+### **2. Мета-теги (обязательно):**
+- Title: "<тема статьи> - SmartVizitka" (60-70 символов)
+- Description: SEO-описание (150-160 символов)
+- Keywords: ключевые слова через запятую
+- Author: SmartVizitka
+- Robots: index, follow, max-snippet:-1, max-image-preview:large, max-video-preview:-1
+- Canonical: ссылка на статью
+- OpenGraph: title, description, type=article, image, url, locale, site_name, article:published_time, article:modified_time, article:author, article:section, article:tag
+- Twitter: card=summary_large_image, site, creator, title, description, image
+
+### **3. JSON-LD схемы (обязательно):**
+- **Article**: headline, description, image, keywords, author, publisher, datePublished, dateModified, articleSection, articleBody
+- **WebSite**: name, url, description, potentialAction (SearchAction)
+- **BreadcrumbList**: itemListElement с навигацией (Главная → Статьи → [Тема статьи])
+- **FAQPage**: mainEntity с 6 вопросами
+
+### **4. CTA блоки:**
+- **После каждого раздела** (4 CTA)
+- **Главный CTA в конце** статьи
+- **Все ссылки** ведут на главную страницу (/)
+
+### **5. SEO-оптимизация:**
+- Используй ключевые слова в **H1, H2 заголовках**
+- **H1** - только один на странице
+- **H2** - минимум 4, максимум 6
+- **Внутренние ссылки** на главную страницу
+
+### **6. Контент:**
+- **Раздел 1**: Проблемы и боли целевой аудитории (описывать естественно, без явных слов "боль", "решение", "результат")
+- **Раздел 2**: Как AI-технологии решают эти проблемы (описывать процесс и технологии)
+- **Раздел 3**: Конкретные результаты и преимущества (цифры, кейсы, метрики)
+- **Раздел 4**: Практическое применение и внедрение (пошагово, с примерами)
+
+### **7. FAQ вопросы (для LLM поиска):**
+- **Вопрос 1**: Что такое [тема статьи] для бизнеса?
+- **Вопрос 2**: Как работает [тема статьи] в [отрасли]?
+- **Вопрос 3**: Какие преимущества [темы статьи] перед традиционными методами?
+- **Вопрос 4**: Сколько стоит внедрение [темы статьи]?
+- **Вопрос 5**: Как внедрить [тему статьи] в бизнес?
+- **Вопрос 6**: Есть ли поддержка при использовании [темы статьи]?
+
+**ВАЖНО:** FAQ вопросы должны быть конкретными и содержать ключевые слова для лучшего попадания в ответы LLM при поиске информации.
+
+### **8. Качество контента (ОБЯЗАТЕЛЬНО):**
+- **Статья должна быть ИНФОРМАТИВНОЙ** - давать реальные знания, а не только рекламу
+- **Практическая польза** - читатель должен получить конкретные инструменты и понимание
+- **НЕ должно быть прямой рекламы SmartVizitka** - упоминания только в контексте решения проблем
+- **Объективная информация** - честно рассказывать о возможностях и ограничениях
+- **Кейсы и примеры** - реальные истории успеха и применения
+- **Пошаговые инструкции** - конкретные действия, которые можно применить
+- **Экспертное мнение** - глубокое понимание темы, а не поверхностная информация
+
+## ⚠️ ВАЖНО:
+- Верни ПОЛНЫЙ HTML-код от <!DOCTYPE html> до </html>
+- НЕ изменяй структуру шаблона
+- Замени ВСЕ заглушки на реальный контент, включая:
+  * ЗАГОЛОВОК_СТАТЬИ
+  * ОПИСАНИЕ_СТАТЬИ
+  * КЛЮЧЕВЫЕ_СЛОВА_СТАТЬИ
+  * НАЗВАНИЕ_ФАЙЛА
+  * СОДЕРЖИМОЕ_СТАТЬИ_ДЛЯ_JSON_LD
+- Сохрани все CSS классы и атрибуты
+- Видео-виджет уже подключен - НЕ трогай его
+- Все даты используй в формате ISO 8601: 2025-01-01T00:00:00+03:00
+"""
+
+ARTICLE_TASK = """
+## 📝 ЗАДАНИЕ:
+Тема статьи: "{topic}"
+Целевая аудитория: {target_audience}
+Ключевые слова: {keywords}
+Title: "{topic} - SmartVizitka"
+"""
+
+
+def build_prompt_prefix(template: str) -> str:
+    """Общая для всех тем часть промпта (меняется только вместе с шаблоном)"""
+    return ARTICLE_INSTRUCTIONS + template + ARTICLE_REQUIREMENTS
+
+
+def prompt_cache_key(template: str) -> str:
+    """Ключ маршрутизации кэша промптов: запросы с одним префиксом попадают на один кэш"""
+    return "article-" + hashlib.sha256(build_prompt_prefix(template).encode("utf-8")).hexdigest()[:16]
+
+
+def build_article_input(template: str, topic: str, target_audience: str, keywords: str = "") -> List[Dict]:
+    """input для Responses API: неизменный префикс, переменные темы — последним сообщением"""
+    return [
+        {"role": "system", "content": ARTICLE_SYSTEM_PROMPT},
+        {"role": "user", "content": build_prompt_prefix(template)},
+        {"role": "user", "content": ARTICLE_TASK.format(
+            topic=topic, target_audience=target_audience, keywords=keywords or DEFAULT_KEYWORDS)},
+    ]
+
+
+class PromptCacheStats:
+    """Входные токены и попадания в кэш промптов по данным usage ответов"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0  # ответы, у которых cached_tokens > 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage) -> int:
+        """Учитывает usage ответа (объект SDK или dict). Возвращает cached_tokens"""
+        if usage is None:
+            return 0
+        if isinstance(usage, dict):
+            input_tokens = usage.get("input_tokens") or 0
+            cached = (usage.get("input_tokens_details") or {}).get("cached_tokens") or 0
+        else:
+            input_tokens = getattr(usage, "input_tokens", 0) or 0
+            cached = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", 0) or 0
+        with self._lock:
+            self.requests += 1
+            self.hits += 1 if cached else 0
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached
+        return cached
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hits": self.hits,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_ratio": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+            }
+
+
+_stats = PromptCacheStats()
+
+
+def record_usage(usage) -> int:
+    return _stats.record(usage)
+
+
+def prompt_cache_stats() -> Dict[str, float]:
+    return _stats.snapshot()
+
+
+def format_prompt_cache_stats() -> str:
+    stats = prompt_cache_stats()
+    return (f"🧠 Кэш промптов OpenAI: попаданий {stats['hits']}/{stats['requests']}, "
+            f"закэшировано {stats['cached_tokens']} из {stats['input_tokens']} входных токенов "
+            f"({stats['cached_ratio'] * 100:.0f}%)")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Манифест версий ассетов для AI-Ассистент
+Версия styles.css, app.js и sv-video-widget.js — начало SHA-256 их
+содержимого. В nginx эти файлы помечены immutable на год, поэтому
+?v= меняется только тогда, когда меняется сам файл: публикация новой
+статьи больше не сбрасывает кэш CSS/JS у посетителей. Хэши хранятся
+в .asset_manifest.json вместе с mtime/размером и пересчитываются только
+для измененных файлов. Манифест читают ArticleAgent (шаблон статьи)
+и ArticleUpdater (статьи и index.html).
+
+Использование:
+    python3 asset_manifest.py   # показать текущие версии
+"""
+
+import re
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from site_files import atomic_write
+
+MANIFEST_FILENAME = ".asset_manifest.json"
+
+# Ассет -> путь от корня сайта
+ASSET_FILES = {
+    "css": "assets/css/styles.css",
+    "js": "js/app.js",
+    "widget": "js/sv-video-widget.js",
+}
+
+# Длина версии в шестнадцатеричных символах (48 бит — коллизии на практике исключены)
+HASH_LENGTH = 12
+
+# Ссылка на ассет с абсолютным (/js/app.js) или относительным (js/app.js) путем;
+# версия — старый номер (?v=29) или хэш
+ASSET_REFERENCES = {
+    key: re.compile(r'((?:href|src)="/?' + re.escape(path) + r'\?v=)([0-9A-Za-z]+)"')
+    for key, path in ASSET_FILES.items()
+}
+
+ASSET_LABELS = {"css": "🎨 CSS", "js": "⚡ JS", "widget": "🎥 Видео-виджет"}
+
+
+def content_version(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def find_versions(text: str) -> Dict[str, Optional[str]]:
+    """Версии ассетов, на которые ссылается страница (None — ссылки нет)"""
+    versions = {}
+    for key, pattern in ASSET_REFERENCES.items():
+        match = pattern.search(text)
+        versions[key] = match.group(2) if match else None
+    return versions
+
+
+class AssetManifest:
+    def __init__(self, project_root=".", manifest_path=None):
+        self.project_root = Path(project_root)
+        self.manifest_path = Path(manifest_path) if manifest_path else self.project_root / MANIFEST_FILENAME
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("assets", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Манифест ассетов поврежден, будет перестроен: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Атомарно сохраняет манифест (только если он изменился)"""
+        if not self._dirty:
+            return
+        atomic_write(self.manifest_path, json.dumps({"assets": self.entries}, ensure_ascii=False, indent=1, sort_keys=True))
+        self._dirty = False
+
+    def refresh(self) -> "AssetManifest":
+        """Пересчитывает хэши только для новых и измененных файлов ассетов"""
+        for key, relative in ASSET_FILES.items():
+            path = self.project_root / relative
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                if self.entries.pop(key, None) is not None:
+                    self._dirty = True
+                continue
+            entry = self.entries.get(key)
+            if (entry and entry.get("path") == relative and entry.get("mtime_ns") == stat.st_mtime_ns
+                    and entry.get("size") == stat.st_size):
+                continue
+            with open(path, 'rb') as f:
+                version = content_version(f.read())
+            self.entries[key] = {"path": relative, "mtime_ns": stat.st_mtime_ns,
+                                 "size": stat.st_size, "version": version}
+            self._dirty = True
+        self.save()
+        return self
+
+    def version(self, key: str) -> Optional[str]:
+        """Версия ассета (None — файла нет, ссылки на него не трогаются)"""
+        entry = self.entries.get(key)
+        return entry["version"] if entry else None
+
+    @property
+    def versions(self) -> Dict[str, Optional[str]]:
+        return {key: self.version(key) for key in ASSET_FILES}
+
+    def apply(self, content: str) -> Tuple[str, List[str]]:
+        """Проставляет версии из манифеста в ссылки на ассеты: (содержимое, измененные ассеты)"""
+        changed = []
+        for key, pattern in ASSET_REFERENCES.items():
+            version = self.version(key)
+            if version is None:
+                continue
+            updated = pattern.sub(lambda match: f'{match.group(1)}{version}"', content)
+            if updated != content:
+                content = updated
+                changed.append(key)
+        return content, changed
+
+
+def main():
+    manifest = AssetManifest(".").refresh()
+    for key, relative in ASSET_FILES.items():
+        print(f"{ASSET_LABELS[key]}: {relative}?v={manifest.version(key) or '— (файла нет)'}")
+
+
+if __name__ == "__main__":
+    main()
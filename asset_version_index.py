@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянный индекс версий ассетов для AI-Ассистент
+Хранит для каждой HTML-страницы найденные версии styles.css, app.js
+и sv-video-widget.js вместе с mtime/размером файла. Индекс обновляет
+cli.py update-indexes: перечитываются только измененные страницы, причем не
+целиком: <head> и хвост документа, где подключаются скрипты.
+Backup-копии (*.backup.html) и шаблон статьи в индекс не попадают. Актуальные версии
+(хэши содержимого) — в asset_manifest; индекс показывает страницы,
+которые ссылаются на устаревшие.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from asset_manifest import find_versions
+from site_files import atomic_write
+
+INDEX_FILENAME = ".asset_versions.json"
+
+# Шаблон статьи не публикуется: версии в нем проставляет ArticleAgent при загрузке
+TEMPLATE_FILENAME = "AI_ARTICLE_TEMPLATE.html"
+
+HEAD_CHUNK = 16 * 1024
+HEAD_LIMIT = 256 * 1024
+TAIL_SIZE = 16 * 1024
+
+
+class AssetVersionIndex:
+    def __init__(self, project_root=".", index_path=None):
+        self.project_root = Path(project_root)
+        self.index_path = Path(index_path) if index_path else self.project_root / INDEX_FILENAME
+        self.entries: Dict[str, Dict] = {}
+        self.stats = {"scanned": 0, "reused": 0, "removed": 0}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get("files", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Индекс версий поврежден, будет перестроен: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Атомарно сохраняет индекс (только если он изменился)"""
+        if not self._dirty:
+            return
+        atomic_write(self.index_path, json.dumps({"files": self.entries}, ensure_ascii=False, indent=1, sort_keys=True))
+        self._dirty = False
+
+    @staticmethod
+    def _is_indexed(path: Path) -> bool:
+        return not path.name.endswith(".backup.html") and path.name != TEMPLATE_FILENAME
+
+    def _read_head_and_tail(self, path: Path, size: int) -> str:
+        """Читает <head> (до </head>, но не больше HEAD_LIMIT) и последние TAIL_SIZE байт"""
+        with open(path, 'rb') as f:
+            head = b""
+            while len(head) < HEAD_LIMIT:
+                chunk = f.read(HEAD_CHUNK)
+                if not chunk:
+                    break
+                head += chunk
+                if b"</head>" in head.lower():
+                    break
+            tail = b""
+            if size > len(head):
+                f.seek(max(len(head), size - TAIL_SIZE))
+                tail = f.read()
+        # Обрезанные на границе чанка символы UTF-8 не влияют на ASCII-шаблоны
+        return head.decode('utf-8', errors='ignore') + "\n" + tail.decode('utf-8', errors='ignore')
+
+    def _entry_for(self, stat, versions: Dict[str, Optional[str]]) -> Dict:
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, **versions}
+
+    def refresh(self) -> "AssetVersionIndex":
+        """Приводит индекс в соответствие с диском: перечитывает только новые и измененные страницы"""
+        seen = set()
+        for path in self.project_root.glob("*.html"):
+            if not self._is_indexed(path):
+                continue
+            name = path.name
+            seen.add(name)
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entry = self.entries.get(name)
+            if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                self.stats["reused"] += 1
+                continue
+            versions = find_versions(self._read_head_and_tail(path, stat.st_size))
+            self.entries[name] = self._entry_for(stat, versions)
+            self.stats["scanned"] += 1
+            self._dirty = True
+
+        for name in list(self.entries):
+            if name not in seen:
+                del self.entries[name]
+                self.stats["removed"] += 1
+                self._dirty = True
+
+        self.save()
+        return self
+
+    def stale_pages(self, versions: Dict[str, Optional[str]]) -> List[str]:
+        """Страницы, которые ссылаются на ассет с версией, отличной от текущей"""
+        return sorted(
+            name for name, entry in self.entries.items()
+            if any(entry.get(key) is not None and version is not None and entry[key] != version
+                   for key, version in versions.items())
+        )
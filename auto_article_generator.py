@@ -8,23 +8,63 @@
 """
 
 import csv
+import sys
 import time
 import json
 import os
+import fcntl
+import signal
+import asyncio
+import socket
+import threading
 from datetime import datetime
 from pathlib import Path
-from article_agent import ArticleAgent
+from article_pipeline import ArticleDraft, ArticlePipeline, StagedArticlePipeline
+from article_prompt import format_prompt_cache_stats
+from site_files import atomic_write
+from topic_queue import FAILED, TopicQueue, default_db_path, default_worker_id
+from openai_batch import (DEFAULT_REQUESTS_FILE, iter_results, load_manifest, make_custom_id,
+                          manifest_path_for, write_batch)
+
+# Аренда тем, выгруженных в Batch API: окно выполнения пакета 24 ч + запас
+BATCH_LEASE_SECONDS = 26 * 3600
 
 class AutoArticleGenerator:
     def __init__(self):
+        # Настройки очереди и расписания читаются из .env (раньше его загружал импорт ArticleAgent)
+        from dotenv import load_dotenv
+        load_dotenv(override=True)
         self.csv_file = "ai_business_3themes.csv"  # Теперь содержит 1,700 тем (100 базовых + 1,600 с городами)
         self.progress_file = "ai_topic_progress.json"
         self.log_file = "ai_generation_log.txt"
-        self.article_agent = ArticleAgent()
-        self.current_topic_index = 0
+        self.queue_file = default_db_path()
+        # Блокировка только от двойного запуска демона на одном хосте; темы делит очередь
+        self.lock_file = f"ai_generator.{socket.gethostname()}.lock"
+        self._lock_handle = None
+        self.last_run = None  # время последнего слота расписания (timestamp)
+        self._stop_event = threading.Event()
+        self._loop = None  # один event loop на процесс: асинхронный клиент привязан к нему
+        self._article_agent = None  # создается при первой генерации (тянет за собой OpenAI SDK)
+        self.queue = None  # TopicQueue: состояние тем, аренды, повторы, dead letter
+        self.worker_id = default_worker_id()
+        self.current_topic_index = 0  # устаревший прогресс, нужен только для переноса в очередь
+        self.completed_indices = set()
         self.topics = []
         
-    def load_topics_from_csv(self):
+    @property
+    def article_agent(self):
+        """ArticleAgent импортируется лениво: команды очереди обходятся без OpenAI SDK"""
+        if self._article_agent is None:
+            from article_agent import ArticleAgent
+            self._article_agent = ArticleAgent()
+        return self._article_agent
+    
+    @staticmethod
+    def connection_stats_line():
+        from openai_clients import format_connection_stats
+        return format_connection_stats()
+    
+    def load_topics_from_csv(self, verbose=False):
         """Загружает темы из CSV файла"""
         try:
             with open(self.csv_file, 'r', encoding='utf-8') as file:
@@ -34,8 +74,9 @@ class AutoArticleGenerator:
                 self.topics = [row[0] for row in reader if row[0].strip()]
             
             print(f"✅ Загружено {len(self.topics)} тем из CSV файла")
-            for i, topic in enumerate(self.topics):
-                print(f"   {i+1}. {topic}")
+            if verbose:
+                for i, topic in enumerate(self.topics):
+                    print(f"   {i+1}. {topic}")
             return True
             
         except Exception as e:
@@ -43,12 +84,14 @@ class AutoArticleGenerator:
             return False
     
     def load_progress(self):
-        """Загружает прогресс из файла"""
+        """Загружает прогресс из файла (last_run демона; current_index — для переноса в очередь)"""
         try:
             if os.path.exists(self.progress_file):
                 with open(self.progress_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                     self.current_topic_index = data.get('current_index', 0)
+                    self.completed_indices = set(data.get('completed_indices', []))
+                    self.last_run = data.get('last_run')
                     print(f"📊 Загружен прогресс: тема {self.current_topic_index + 1}")
             else:
                 self.current_topic_index = 0
@@ -62,14 +105,44 @@ class AutoArticleGenerator:
         try:
             progress_data = {
                 'current_index': self.current_topic_index,
+                'completed_indices': sorted(self.completed_indices),
+                'last_run': self.last_run,
                 'last_updated': datetime.now().isoformat(),
-                'total_topics': len(self.topics)
+                'total_topics': len(self.topics),
+                'queue': self.queue.stats() if self.queue else None
             }
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(progress_data, f, ensure_ascii=False, indent=2)
+            atomic_write(self.progress_file, json.dumps(progress_data, ensure_ascii=False, indent=2))
         except Exception as e:
             print(f"⚠️ Ошибка сохранения прогресса: {e}")
     
+    def acquire_instance_lock(self):
+        """Берет эксклюзивную блокировку: на одном хосте не работает два демона
+        (или демон и однократный запуск)"""
+        try:
+            handle = open(self.lock_file, 'a+')
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            print("⏳ Другой экземпляр генератора уже работает. Завершение.")
+            return False
+        except Exception as e:
+            print(f"⚠️ Ошибка блокировки: {e}")
+            return False
+        
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._lock_handle = handle
+        return True
+    
+    def release_instance_lock(self):
+        """Снимает блокировку экземпляра"""
+        if self._lock_handle:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+            self._lock_handle.close()
+            self._lock_handle = None
+    
     def log_generation(self, topic, status, details=""):
         """Логирует процесс генерации"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -85,77 +158,407 @@ class AutoArticleGenerator:
         
         print(log_entry)
     
+    def open_queue(self):
+        """Открывает очередь тем, добавляет новые темы из CSV и однократно переносит старый прогресс"""
+        if self.queue is None:
+            self.queue = TopicQueue(self.queue_file)
+        added = self.queue.sync_topics(self.topics)
+        if added:
+            print(f"🆕 В очередь добавлено тем: {added}")
+        if self.queue.migrate_from_progress(self.current_topic_index, self.completed_indices) and self.current_topic_index:
+            print(f"📦 Прогресс перенесен в очередь: темы 1…{self.current_topic_index} отмечены выполненными")
+        stats = self.queue.stats()
+        print(f"📊 Очередь: ожидают {stats['pending']}, в работе {stats['leased']}, "
+              f"готово {stats['done']}, dead letter {stats['failed']}")
+        return self.queue
+    
+    def prepare(self):
+        """Загружает темы, прогресс и очередь"""
+        if not self.load_topics_from_csv():
+            print("❌ Не удалось загрузить темы. Завершение работы.")
+            return False
+        self.load_progress()
+        self.open_queue()
+        return True
+    
+    def lease_topics(self, count, owner=None, lease_seconds=None):
+        """Арендует до count тем из очереди: [(индекс, тема)]. Когда все темы пройдены — новый круг"""
+        owner = owner or self.worker_id
+        leased = self.queue.lease(owner, count, lease_seconds)
+        if not leased and self.queue.start_new_cycle():
+            print("🔄 Все темы пройдены, начинаю новый круг")
+            leased = self.queue.lease(owner, count, lease_seconds)
+        return leased
+    
     def get_next_topic(self):
-        """Получает следующую тему по кругу"""
-        if not self.topics:
+        """Арендует следующую тему: (индекс, тема) или None"""
+        leased = self.lease_topics(1)
+        if not leased:
             return None
-        
-        topic = self.topics[self.current_topic_index]
-        print(f"🎯 Текущая тема ({self.current_topic_index + 1}/{len(self.topics)}): {topic}")
-        return topic
+        index, topic = leased[0]
+        print(f"🎯 Текущая тема ({index + 1}/{len(self.topics)}): {topic}")
+        return index, topic
+    
+    def finish_topic(self, index, success, details="", owner=None):
+        """Фиксирует результат темы в очереди: done или повтор/dead letter"""
+        owner = owner or self.worker_id
+        if success:
+            if not self.queue.complete(index, owner, details):
+                print(f"⚠️ Аренда темы {index + 1} истекла до завершения — тема могла быть выдана другому воркеру")
+        else:
+            state = self.queue.fail(index, owner, details or "ошибка генерации")
+            if state == FAILED:
+                print(f"☠️ Тема {index + 1} исчерпала попытки и перенесена в dead letter")
+            elif state is not None:
+                print(f"🔁 Тема {index + 1} вернется в очередь для повтора")
     
     def generate_article(self, topic):
         """Генерирует статью по теме"""
+        return self._generate_article_result(topic)[0]
+    
+    def _generate_article_result(self, topic):
+        """Генерирует статью по теме: (успех, файл или текст ошибки)"""
         try:
             print(f"🚀 Начинаю генерацию статьи по теме: {topic}")
             
             # Генерируем статью через article_agent
             result = self.article_agent.create_article_by_topic(topic)
-            
-            if result.get("success"):
-                filename = result.get("filename", "неизвестно")
-                self.log_generation(topic, "✅ УСПЕХ", f"Файл: {filename}")
-                return True
-            else:
-                error = result.get("error", "неизвестная ошибка")
-                self.log_generation(topic, "❌ ОШИБКА", error)
-                return False
+            return self._log_result(topic, result)
                 
         except Exception as e:
             self.log_generation(topic, "❌ ИСКЛЮЧЕНИЕ", str(e))
-            return False
+            return False, str(e)
     
-    def run_auto_generation(self):
-        """Основной цикл автоматической генерации (запускается cron каждые 5 минут)"""
-        print("🤖 АВТОМАТИЧЕСКИЙ ГЕНЕРАТОР СТАТЕЙ AI-АССИСТЕНТ ЗАПУЩЕН")
-        print("🎯 Тематика: AI-ассистенты, чат-боты, автоматизация продаж")
+    async def generate_article_async(self, topic):
+        """Асинхронно генерирует статью по теме (для пакетного режима)"""
+        return (await self._generate_article_result_async(topic))[0]
+    
+    async def _generate_article_result_async(self, topic):
+        try:
+            result = await self.article_agent.create_article_by_topic_async(topic)
+            return self._log_result(topic, result)
+                
+        except Exception as e:
+            self.log_generation(topic, "❌ ИСКЛЮЧЕНИЕ", str(e))
+            return False, str(e)
+    
+    def _log_result(self, topic, result):
+        if result.get("success"):
+            filename = result.get("filename", "неизвестно")
+            self.log_generation(topic, "✅ УСПЕХ", f"Файл: {filename}")
+            return True, filename
+        else:
+            error = result.get("error", "неизвестная ошибка")
+            self.log_generation(topic, "❌ ОШИБКА", error)
+            return False, error
+    
+    def run_async(self, coroutine):
+        """Выполняет корутину в постоянном event loop генератора"""
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+    
+    async def _generate_batch(self, leased, concurrency):
+        """Параллельно генерирует статьи по арендованным темам [(индекс, тема)] с ограничением concurrency"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def process(index, topic):
+            async with semaphore:
+                print(f"🎯 Тема ({index + 1}/{len(self.topics)}): {topic}")
+                success, details = await self._generate_article_result_async(topic)
+            # Результат фиксируется в очереди сразу после каждой темы
+            self.finish_topic(index, success, details)
+            return success
+        
+        return await asyncio.gather(*(process(index, topic) for index, topic in leased))
+    
+    def run_batch_generation(self, batch_size, concurrency=3):
+        """Пакетная генерация: batch_size тем из очереди, не более concurrency одновременно.
+
+        Несколько таких процессов (в том числе на разных хостах с общей папкой)
+        можно запускать одновременно: очередь выдает каждому свои темы.
+        """
+        print("🤖 ПАКЕТНЫЙ ГЕНЕРАТОР СТАТЕЙ AI-АССИСТЕНТ ЗАПУЩЕН")
+        print(f"📦 Размер пакета: {batch_size}, параллельность: {concurrency}")
         print("=" * 50)
         
-        # Загружаем темы
-        if not self.load_topics_from_csv():
-            print("❌ Не удалось загрузить темы. Завершение работы.")
+        if not self.prepare():
             return
         
-        # Загружаем прогресс
-        self.load_progress()
+        leased = self.lease_topics(batch_size)
+        if not leased:
+            print("❌ Нет тем для генерации")
+            return
         
-        print(f"📚 Всего тем: {len(self.topics)}")
+        try:
+            results = self.run_async(self._generate_batch(leased, max(1, concurrency)))
+            print(f"✅ Пакет завершен: успешно {sum(results)}/{len(results)}")
+            print(self.connection_stats_line())
+            print(format_prompt_cache_stats())
+        except Exception as e:
+            print(f"❌ Критическая ошибка пакетной генерации: {e}")
+        finally:
+            self.save_progress()
+    
+    def run_pipeline_generation(self, count, workers=None):
+        """Конвейерная генерация: этапы разных статей перекрываются во времени.
+
+        Пока статья N+1 генерируется, статья N проходит GEO-оптимизацию,
+        а N-1 — обновление файлов сайта. workers — число воркеров по этапам
+        ({"generate": 2, "optimize": 2}), по умолчанию из окружения.
+        """
+        print("🤖 КОНВЕЙЕРНЫЙ ГЕНЕРАТОР СТАТЕЙ AI-АССИСТЕНТ ЗАПУЩЕН")
+        print(f"📦 Тем: {count}")
         print("=" * 50)
         
+        if not self.prepare():
+            return
+        
+        pipeline = StagedArticlePipeline(self.article_agent, workers)
+        # Темы ждут своей очереди на генерацию: аренда рассчитана на весь конвейер
+        rounds = -(-count // pipeline.workers["generate"])
+        leased = self.lease_topics(count, lease_seconds=self.queue.lease_seconds * max(1, rounds))
+        if not leased:
+            print("❌ Нет тем для генерации")
+            return
+        
+        def on_result(job):
+            # Вызывается в этом потоке: очередь тем не делится между потоками
+            success, details = self._log_result(job.topic, job.result)
+            self.finish_topic(job.key, success, details)
+        
         try:
-            # Получаем текущую тему
-            topic = self.get_next_topic()
-            if not topic:
-                print("❌ Нет тем для генерации")
-                return
+            jobs = pipeline.run(leased, on_result)
+            print(f"✅ Конвейер завершен: успешно {sum(1 for job in jobs if job.result.get('success'))}/{len(jobs)}")
+            print(self.connection_stats_line())
+            print(format_prompt_cache_stats())
+        except Exception as e:
+            print(f"❌ Критическая ошибка конвейерной генерации: {e}")
+        finally:
+            self.save_progress()
+    
+    def export_batch_requests(self, count, start=None, requests_path=DEFAULT_REQUESTS_FILE):
+        """Экспортирует count тем в JSONL-запросы Batch API (/v1/responses) и манифест.
+
+        start — номер темы (с 1); по умолчанию — следующие темы из очереди.
+        Темы арендуются в очереди на BATCH_LEASE_SECONDS и завершаются при импорте результатов.
+        """
+        print("📦 ЭКСПОРТ ПАКЕТА ЗАПРОСОВ ДЛЯ BATCH API")
+        print("=" * 50)
+        
+        if not self.prepare():
+            return None
+        
+        # Темы арендуются на срок выполнения пакета, чтобы воркеры их не взяли
+        owner = f"batch-api:{Path(requests_path).name}:{int(time.time())}"
+        if start is None:
+            leased = self.lease_topics(count, owner, BATCH_LEASE_SECONDS)
+        else:
+            first = max(0, start - 1)
+            leased = self.queue.lease(owner, count, BATCH_LEASE_SECONDS,
+                                      indices=list(range(first, min(first + count, len(self.topics)))))
+        if not leased:
+            print("❌ Нет тем для экспорта")
+            return None
+        indices = [index for index, _ in leased]
+        
+        items = []
+        for index, topic in leased:
+            request = self.article_agent.build_batch_request(topic)
+            request["custom_id"] = make_custom_id(index)
+            request["index"] = index
+            request["lease_owner"] = owner
+            items.append(request)
+        
+        requests_file, manifest_file = write_batch(requests_path, items, self.article_agent.MODEL)
+        print(f"✅ Экспортировано запросов: {len(items)} (темы {indices[0] + 1}…{indices[-1] + 1})")
+        print(f"📄 Запросы: {requests_file}")
+        print(f"🗂️ Манифест: {manifest_file}")
+        print("💡 Загрузите файл запросов в OpenAI Batch API (endpoint /v1/responses),")
+        print(f"   затем: python3 auto_article_generator.py batch-import <результаты.jsonl> [{requests_file}]")
+        return requests_file
+    
+    def import_batch_results(self, results_path, requests_path=DEFAULT_REQUESTS_FILE):
+        """Импортирует результаты Batch API: валидация → GEO-оптимизация → ArticleUpdater (одним пакетом)"""
+        print("📥 ИМПОРТ РЕЗУЛЬТАТОВ BATCH API")
+        print("=" * 50)
+        
+        manifest_file = manifest_path_for(requests_path)
+        if not manifest_file.exists():
+            print(f"❌ Манифест {manifest_file} не найден")
+            return False
+        manifest = load_manifest(manifest_file)
+        
+        if not self.prepare():
+            return False
+        
+        try:
+            pipeline = ArticlePipeline(self.article_agent)
+            drafts = {}
+            processed = []  # (индекс, тема, файл)
+            failed = 0
             
-            # Генерируем статью
-            success = self.generate_article(topic)
+            for custom_id, article_content, error in iter_results(results_path):
+                meta = manifest["requests"].get(custom_id)
+                if meta is None:
+                    print(f"⚠️ {custom_id}: нет в манифесте, пропускаю")
+                    continue
+                
+                topic = meta["topic"]
+                print(f"🎯 {custom_id}: {topic}")
+                owner = meta.get("lease_owner")
+                if error:
+                    self.log_generation(topic, "❌ ОШИБКА", f"Batch API: {error}")
+                    self.finish_topic(meta["index"], False, f"Batch API: {error}", owner)
+                    failed += 1
+                    continue
+                
+                result = self.article_agent.accept_batch_article(
+                    topic, meta["target_audience"], meta["filename"], meta["keywords"], article_content)
+                if not result.get("success"):
+                    error = result.get("error", "неизвестная ошибка")
+                    self.log_generation(topic, "❌ ОШИБКА", error)
+                    self.finish_topic(meta["index"], False, error, owner)
+                    failed += 1
+                    continue
+                
+                draft = ArticleDraft(self.article_agent.project_root, meta["filename"], result["content"])
+                pipeline.optimize(draft)
+                drafts[draft.filename] = draft
+                processed.append((meta["index"], topic, draft.filename, owner))
             
-            # Переходим к следующей теме
-            self.current_topic_index = (self.current_topic_index + 1) % len(self.topics)
+            if drafts:
+                from auto_article_updater import ArticleUpdater
+                try:
+                    ArticleUpdater().update_all_files_batch(list(drafts), drafts)
+                finally:
+                    # Статьи не должны потеряться, даже если обновление файлов упало
+                    for draft in drafts.values():
+                        if draft.dirty or draft.snapshots:
+                            draft.commit()
+            
+            for index, topic, filename, owner in processed:
+                self.log_generation(topic, "✅ УСПЕХ", f"Файл: {filename} (Batch API)")
+                self.finish_topic(index, True, filename, owner)
+            
+            print(f"✅ Импорт завершен: успешно {len(processed)}, с ошибками {failed}")
+            return True
+        finally:
             self.save_progress()
+    
+    def generate_next_topic(self):
+        """Генерирует статью по следующей теме из очереди (темы и очередь уже загружены)"""
+        try:
+            # Арендуем тему
+            leased = self.get_next_topic()
+            if not leased:
+                print("❌ Нет тем для генерации")
+                return False
+            index, topic = leased
+            
+            # Генерируем статью и фиксируем результат: ошибка вернет тему в очередь
+            success, details = self._generate_article_result(topic)
+            self.finish_topic(index, success, details)
             
             if success:
-                print(f"✅ Статья сгенерирована! Следующая тема: {self.current_topic_index + 1}")
+                print(f"✅ Статья сгенерирована! Тема {index + 1} выполнена")
             else:
                 print(f"⚠️ Ошибка генерации")
-            
-            print("✅ Генерация завершена. Cron запустит следующий запуск через 5 минут.")
+            return success
                 
         except Exception as e:
             print(f"❌ Критическая ошибка: {e}")
             self.save_progress()
+            return False
+    
+    def run_auto_generation(self):
+        """Однократный запуск: одна тема из очереди (так же запускала старая задача cron)"""
+        print("🤖 АВТОМАТИЧЕСКИЙ ГЕНЕРАТОР СТАТЕЙ AI-АССИСТЕНТ ЗАПУЩЕН")
+        print("🎯 Тематика: AI-ассистенты, чат-боты, автоматизация продаж")
+        print("=" * 50)
+        
+        # Темы делит очередь, но расписание и last_run ведет демон: пока он работает на этом
+        # хосте, однократный запуск (например, оставшаяся задача cron) не публикует лишних статей
+        if not self.acquire_instance_lock():
+            return
+        
+        try:
+            if not self.prepare():
+                return
+            
+            print(f"📚 Всего тем: {len(self.topics)}")
+            print("=" * 50)
+            
+            self.generate_next_topic()
+            self.save_progress()
+            print("✅ Генерация завершена. Регулярную генерацию выполняет режим daemon.")
+        finally:
+            self.release_instance_lock()
+    
+    def _count_missed_slots(self, now, interval):
+        """Сколько слотов расписания наступило с момента last_run"""
+        if self.last_run is None:
+            return 1
+        return max(0, int((now - self.last_run) // interval))
+    
+    def run_daemon(self, interval_minutes=None, catchup_max=3, concurrency=3):
+        """Резидентный режим: клиент, шаблон и темы загружаются один раз, расписание внутреннее.
+
+        После простоя пропущенные слоты догоняются небольшим пакетом
+        (не более catchup_max статей за раз).
+        """
+        if interval_minutes is None:
+            interval_minutes = float(os.getenv("GENERATION_INTERVAL_MINUTES", "60"))
+        interval = max(1.0, interval_minutes * 60)
+        
+        print("🤖 ДЕМОН ГЕНЕРАТОРА СТАТЕЙ AI-АССИСТЕНТ ЗАПУЩЕН")
+        print(f"⏰ Интервал: {interval_minutes} мин, догоняем не более {catchup_max} статей за раз")
+        print("=" * 50)
+        
+        if not self.acquire_instance_lock():
+            return
+        
+        def handle_stop(signum, frame):
+            print(f"🛑 Получен сигнал {signum}, завершаю работу после текущего шага...")
+            self._stop_event.set()
+        
+        signal.signal(signal.SIGTERM, handle_stop)
+        signal.signal(signal.SIGINT, handle_stop)
+        
+        try:
+            if not self.prepare():
+                return
+            
+            while not self._stop_event.is_set():
+                now = time.time()
+                missed = self._count_missed_slots(now, interval)
+                
+                if missed > 0:
+                    self.article_agent.refresh_template_if_changed()
+                    count = min(missed, max(1, catchup_max))
+                    if count == 1:
+                        self.generate_next_topic()
+                    else:
+                        print(f"⏩ Пропущено слотов: {missed}, догоняю пакетом из {count} статей")
+                        leased = self.lease_topics(count)
+                        self.run_async(self._generate_batch(leased, max(1, concurrency)))
+                    
+                    # Выравниваем last_run по сетке расписания, остаток пропусков не копим
+                    if self.last_run is None or missed > count:
+                        self.last_run = now
+                    else:
+                        self.last_run += missed * interval
+                    self.save_progress()
+                
+                print(self.connection_stats_line())
+                print(format_prompt_cache_stats())
+                wait = max(1.0, self.last_run + interval - time.time())
+                print(f"💤 Следующая генерация через {int(wait)} сек")
+                self._stop_event.wait(wait)
+        finally:
+            self.save_progress()
+            self.release_instance_lock()
+            print("👋 Демон остановлен")
 
 def main():
     """Главная функция для AI-Ассистент"""
@@ -165,6 +568,46 @@ def main():
     print("=" * 50)
     
     generator = AutoArticleGenerator()
+    
+    # Резидентный режим: python3 auto_article_generator.py daemon [интервал_мин] [макс_догон]
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        interval = float(sys.argv[2]) if len(sys.argv) > 2 else None
+        catchup_max = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+        generator.run_daemon(interval, catchup_max)
+        return
+    
+    # Пакетный режим: python3 auto_article_generator.py batch <кол-во_тем> [параллельность]
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+        generator.run_batch_generation(batch_size, concurrency)
+        return
+    
+    # Конвейер: python3 auto_article_generator.py pipeline <кол-во_тем> [воркеры_генерации] [воркеры_оптимизации]
+    if len(sys.argv) > 1 and sys.argv[1] == "pipeline":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        workers = {}
+        if len(sys.argv) > 3:
+            workers["generate"] = int(sys.argv[3])
+        if len(sys.argv) > 4:
+            workers["optimize"] = int(sys.argv[4])
+        generator.run_pipeline_generation(count, workers)
+        return
+    
+    # Офлайн-пакет Batch API: python3 auto_article_generator.py batch-export <кол-во_тем> [с_темы] [файл]
+    if len(sys.argv) > 1 and sys.argv[1] == "batch-export":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        start = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        requests_path = sys.argv[4] if len(sys.argv) > 4 else DEFAULT_REQUESTS_FILE
+        generator.export_batch_requests(count, start, requests_path)
+        return
+    
+    # Импорт результатов: python3 auto_article_generator.py batch-import <результаты.jsonl> [файл_запросов]
+    if len(sys.argv) > 2 and sys.argv[1] == "batch-import":
+        requests_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_REQUESTS_FILE
+        generator.import_batch_results(sys.argv[2], requests_path)
+        return
+    
     generator.run_auto_generation()
 
 if __name__ == "__main__":
@@ -11,72 +11,47 @@
 import os
 import re
 import json
-import requests
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from article_pipeline import ArticleDraft
+from asset_manifest import ASSET_LABELS, AssetManifest
+from sitemap_builder import SITEMAP_FILES, SitemapBuilder
+from site_files import SiteTransaction, atomic_write, site_transaction
+
+LLMS_TXT = "llms.txt"
+AI_TXT = ".well-known/ai.txt"
+MAIN_PAGE = "index.html"
+
+# Общие файлы сайта, которые меняет публикация статьи (одна транзакция на публикацию)
+SHARED_SITE_FILES = SITEMAP_FILES + (LLMS_TXT, AI_TXT, MAIN_PAGE)
 
 class ArticleUpdater:
     def __init__(self, project_root="."):
         self.project_root = Path(project_root)
         self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.css_version = self._get_next_css_version()
-        self.js_version = self._get_next_js_version()
-        self.video_widget_version = self._get_next_video_widget_version()
-        
-    def _get_next_css_version(self):
-        """Получает следующую версию CSS из существующих файлов"""
-        css_files = list(self.project_root.glob("*.html"))
-        versions = []
-        
-        for file in css_files:
-            with open(file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # AI-Ассистент использует Tailwind CSS из CDN, версии не нужны
-                # Но оставляем функцию для совместимости
-                match = re.search(r'href="/assets/css/styles\.css\?v=(\d+)"', content)
-                if match:
-                    versions.append(int(match.group(1)))
-        
-        return max(versions) + 1 if versions else 1
-    
-    def _get_next_js_version(self):
-        """Получает следующую версию JavaScript из существующих файлов"""
-        js_files = list(self.project_root.glob("*.html"))
-        versions = []
-        
-        for file in js_files:
-            with open(file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                match = re.search(r'src="js/app\.js\?v=(\d+)"', content)
-                if match:
-                    versions.append(int(match.group(1)))
-        
-        return max(versions) + 1 if versions else 1
-    
-    def _get_next_video_widget_version(self):
-        """Получает следующую версию видео-виджета из существующих файлов"""
-        widget_files = list(self.project_root.glob("*.html"))
-        versions = []
-        
-        for file in widget_files:
-            with open(file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                match = re.search(r'src="js/sv-video-widget\.js\?v=(\d+)"', content)
-                if match:
-                    versions.append(int(match.group(1)))
-        
-        return max(versions) + 1 if versions else 29
-
+        # Версии ассетов — хэши содержимого: меняются, только когда меняется сам файл
+        self.asset_manifest = AssetManifest(self.project_root).refresh()
+        self.css_version = self.asset_manifest.version("css")
+        self.js_version = self.asset_manifest.version("js")
+        self.video_widget_version = self.asset_manifest.version("widget")
 
+    def _apply_asset_versions(self, content, where=""):
+        """Проставляет версии из манифеста ассетов в ссылки на CSS/JS/виджет"""
+        content, changed = self.asset_manifest.apply(content)
+        for key in changed:
+            print(f"{ASSET_LABELS[key]} версия{where} обновлена до ?v={self.asset_manifest.version(key)}")
+        return content
 
-    def validate_json_ld(self, article_filename):
-        """Валидирует JSON-LD схемы в статье"""
+    def validate_json_ld(self, article_filename, content=None):
+        """Валидирует JSON-LD схемы в статье (content — содержимое из памяти, если уже прочитано)"""
         article_path = self.project_root / article_filename
         
         try:
-            with open(article_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if content is None:
+                with open(article_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
             
             validation_results = []
             
@@ -144,13 +119,14 @@ class ArticleUpdater:
             "   • WebPageTest.org"
         ]
 
-    def check_page_structure(self, article_filename):
+    def check_page_structure(self, article_filename, content=None):
         """Проверяет структуру страницы"""
         article_path = self.project_root / article_filename
         
         try:
-            with open(article_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if content is None:
+                with open(article_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
             
             checks = []
             
@@ -195,15 +171,15 @@ class ArticleUpdater:
         except Exception as e:
             return [f"❌ Ошибка проверки структуры: {str(e)}"]
 
-    def create_comprehensive_seo_report(self, article_filename):
+    def create_comprehensive_seo_report(self, article_filename, article_content=None):
         """Создает комплексный SEO-отчет с автоматическими проверками"""
         report_path = self.project_root / f"SEO_ОТЧЕТ_{article_filename}.md"
         
         # Выполняем автоматические проверки
         print("🔍 Выполняем автоматические проверки...")
         
-        json_ld_validation = self.validate_json_ld(article_filename)
-        page_structure = self.check_page_structure(article_filename)
+        json_ld_validation = self.validate_json_ld(article_filename, article_content)
+        page_structure = self.check_page_structure(article_filename, article_content)
         core_web_vitals = self.check_core_web_vitals(article_filename)
         
         content = f"""# 📊 Комплексный SEO-отчет для статьи: {article_filename}
@@ -294,57 +270,55 @@ http://localhost:8080/{article_filename}
         print(f"📊 Создан комплексный SEO-отчет: SEO_ОТЧЕТ_{article_filename}.md")
         return True
     
-    def update_sitemap(self, article_filename):
-        """Обновляет sitemap.xml, добавляя новую статью"""
-        sitemap_path = self.project_root / "sitemap.xml"
-        
-        if not sitemap_path.exists():
-            print("❌ sitemap.xml не найден!")
-            return False
-        
-        # Читаем текущий sitemap
-        with open(sitemap_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def update_sitemap(self, article_filename, content=None, files=None):
+        """Обновляет sitemap.xml: добавляет статью или обновляет ее запись (lastmod — по хэшу содержимого).
+        files — открытая SiteTransaction (тогда запись фиксируется вместе с ней)"""
+        if content is None:
+            article_path = self.project_root / article_filename
+            if not article_path.exists():
+                print(f"❌ Файл статьи {article_filename} не найден!")
+                return False
+            with open(article_path, 'r', encoding='utf-8') as f:
+                content = f.read()
         
-        # Формируем имя файла без расширения
-        article_name = Path(article_filename).stem
-        
-        # Создаем новые URL-записи для AI-Ассистент
-        new_urls = f'''  <url>
-    <loc>https://ai-agent-lia.ru/{article_filename}</loc>
-    <lastmod>{self.current_date}</lastmod>
-    <changefreq>monthly</changefreq>
-    <priority>0.7</priority>
-  </url>
-  <url>
-    <loc>https://ai-agent-lia.ru/{article_filename}#faq</loc>
-    <lastmod>{self.current_date}</lastmod>
-    <changefreq>monthly</changefreq>
-    <priority>0.6</priority>
-  </url>
-</urlset>'''
-        
-        # Заменяем закрывающий тег
-        updated_content = content.replace('</urlset>', new_urls)
-        
-        # Сохраняем обновленный файл
-        with open(sitemap_path, 'w', encoding='utf-8') as f:
-            f.write(updated_content)
-        
-        print(f"✅ sitemap.xml обновлен: добавлена статья {article_filename}")
+        with site_transaction(self.project_root, SITEMAP_FILES, files) as files:
+            builder = SitemapBuilder(self.project_root, files=files)
+            self._upsert_sitemap_article(builder, article_filename, content)
+            builder.write()
         return True
+
+    def _upsert_sitemap_article(self, builder, article_filename, content):
+        is_new = builder.url_for(article_filename) not in builder.entries
+        changed = builder.upsert_article(article_filename, content)
+        if is_new:
+            print(f"✅ sitemap.xml обновлен: добавлена статья {article_filename}")
+        elif changed:
+            print(f"✅ sitemap.xml обновлен: lastmod статьи {article_filename} -> {builder.current_date}")
+        else:
+            print(f"ℹ️ Статья {article_filename} уже есть в sitemap.xml и не изменилась")
     
-    def update_llms_txt(self, article_filename):
+    def update_llms_txt(self, article_filename, files=None):
         """Обновляет llms.txt, добавляя новую статью"""
-        llms_path = self.project_root / "llms.txt"
-        
-        if not llms_path.exists():
-            print("❌ llms.txt не найден!")
-            return False
+        with site_transaction(self.project_root, (LLMS_TXT,), files) as files:
+            # Читаем текущий файл (под блокировкой)
+            content = files.read(LLMS_TXT)
+            if content is None:
+                print("❌ llms.txt не найден!")
+                return False
+            
+            updated_content = self._add_to_llms_txt(content, article_filename)
+            
+            # Сохраняем обновленный файл
+            if updated_content != content:
+                files.write(LLMS_TXT, updated_content)
         
-        # Читаем текущий файл
-        with open(llms_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        return True
+
+    def _add_to_llms_txt(self, content, article_filename):
+        """Добавляет статью в раздел статей llms.txt (в памяти)"""
+        if f"/{article_filename}\n" in content + "\n":
+            print(f"ℹ️ Статья {article_filename} уже есть в llms.txt")
+            return content
         
         # Добавляем новую статью в раздел статей
         new_entry = f"\n# Статьи для AI-понимания\n/{article_filename}"
@@ -358,12 +332,8 @@ http://localhost:8080/{article_filename}
             # Добавляем в конец
             content += new_entry
         
-        # Сохраняем обновленный файл
-        with open(llms_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
         print(f"✅ llms.txt обновлен: добавлена статья {article_filename}")
-        return True
+        return content
     
     def update_robots_txt(self):
         """Обновляет robots.txt для AI-ботов"""
@@ -384,18 +354,23 @@ http://localhost:8080/{article_filename}
         print("ℹ️ robots.txt уже оптимизирован")
         return True
     
-    def update_ai_txt(self, article_filename):
+    def update_ai_txt(self, article_filename, files=None):
         """Обновляет .well-known/ai.txt с новой статьей"""
-        ai_dir = self.project_root / ".well-known"
-        ai_dir.mkdir(exist_ok=True)
-        
-        ai_path = ai_dir / "ai.txt"
+        with site_transaction(self.project_root, (AI_TXT,), files) as files:
+            content = self._read_ai_txt(files)
+            
+            updated_content = self._add_to_ai_txt(content, article_filename)
+            if updated_content != content:
+                # Сохраняем обновленный файл (каталог .well-known создается при фиксации)
+                files.write(AI_TXT, updated_content)
         
+        return True
+
+    def _read_ai_txt(self, files):
+        """Читает .well-known/ai.txt из транзакции или возвращает шаблон нового файла"""
         # Читаем существующий файл или создаем новый
-        if ai_path.exists():
-            with open(ai_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        else:
+        content = files.read(AI_TXT)
+        if content is None:
             content = """# AI-Ассистент AI.txt
 # Явно разрешаем доступ к публичному контенту для AI-агентов
 
@@ -409,58 +384,45 @@ AI-Ассистент - это умный чат-бот на базе GPT и н
 
 # Статьи для AI-понимания
 """
-        
-        # Добавляем новую статью
+        return content
+
+    def _add_to_ai_txt(self, content, article_filename):
+        """Добавляет статью в ai.txt (в памяти)"""
         if article_filename not in content:
             content += f"\n/{article_filename}"
-            
-            # Сохраняем обновленный файл
-            with open(ai_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
             print(f"✅ .well-known/ai.txt обновлен: добавлена статья {article_filename}")
         else:
             print(f"ℹ️ Статья {article_filename} уже есть в ai.txt")
-        
-        return True
+        return content
     
-    def update_versions_in_article(self, article_filename):
-        """Автоматически обновляет версии всех файлов в статье"""
+    def update_versions_in_article(self, article_filename, draft=None):
+        """Автоматически обновляет версии всех файлов в статье.
+
+        Если передан draft (ArticleDraft), версии обновляются в памяти,
+        а запись на диск выполняет draft.commit().
+        """
         article_path = self.project_root / article_filename
         
-        if not article_path.exists():
+        if draft is None and not article_path.exists():
             print(f"❌ Файл статьи {article_filename} не найден!")
             return False
         
         try:
             # Читаем содержимое статьи
-            with open(article_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Обновляем CSS версию
-            old_css_pattern = r'href="/assets/css/styles\.css\?v=\d+"'
-            new_css = f'href="/assets/css/styles.css?v={self.css_version}"'
-            if re.search(old_css_pattern, content):
-                content = re.sub(old_css_pattern, new_css, content)
-                print(f"🎨 CSS версия обновлена до ?v={self.css_version}")
-            
-            # Обновляем JS версию
-            old_js_pattern = r'src="/js/app\.js\?v=\d+"'
-            new_js = f'src="/js/app.js?v={self.js_version}"'
-            if re.search(old_js_pattern, content):
-                content = re.sub(old_js_pattern, new_js, content)
-                print(f"⚡ JS версия обновлена до ?v={self.js_version}")
+            if draft is not None:
+                content = draft.content
+            else:
+                with open(article_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
             
-            # Обновляем видео-виджет версию
-            old_widget_pattern = r'src="/js/sv-video-widget\.js\?v=\d+"'
-            new_widget = f'src="/js/sv-video-widget.js?v={self.video_widget_version}"'
-            if re.search(old_widget_pattern, content):
-                content = re.sub(old_widget_pattern, new_widget, content)
-                print(f"🎥 Видео-виджет версия обновлена до ?v={self.video_widget_version}")
+            original = content
+            content = self._apply_asset_versions(content)
             
-            # Сохраняем обновленную статью
-            with open(article_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # Сохраняем обновленную статью (без записи, если версии уже актуальны)
+            if draft is not None:
+                draft.content = content
+            elif content != original:
+                atomic_write(article_path, content)
             
             print(f"✅ Все версии в статье обновлены")
             return True
@@ -469,42 +431,20 @@ AI-Ассистент - это умный чат-бот на базе GPT и н
             print(f"❌ Ошибка при обновлении версий: {str(e)}")
             return False
     
-    def update_main_page_versions(self):
+    def update_main_page_versions(self, files=None):
         """Обновляет версии в главной странице index.html"""
-        main_page = self.project_root / "index.html"
-        
-        if not main_page.exists():
-            print("❌ index.html не найден!")
-            return False
-        
         try:
-            with open(main_page, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Обновляем CSS версию
-            old_css_pattern = r'href="/assets/css/styles\.css\?v=\d+"'
-            new_css = f'href="/assets/css/styles.css?v={self.css_version}"'
-            if re.search(old_css_pattern, content):
-                content = re.sub(old_css_pattern, new_css, content)
-                print(f"🎨 CSS версия в главной странице обновлена до ?v={self.css_version}")
-            
-            # Обновляем JS версию
-            old_js_pattern = r'src="/js/app\.js\?v=\d+"'
-            new_js = f'src="/js/app.js?v={self.js_version}"'
-            if re.search(old_js_pattern, content):
-                content = re.sub(old_js_pattern, new_js, content)
-                print(f"⚡ JS версия в главной странице обновлена до ?v={self.js_version}")
-            
-            # Обновляем видео-виджет версию
-            old_widget_pattern = r'src="/js/sv-video-widget\.js\?v=\d+"'
-            new_widget = f'src="/js/sv-video-widget.js?v={self.video_widget_version}"'
-            if re.search(old_widget_pattern, content):
-                content = re.sub(old_widget_pattern, new_widget, content)
-                print(f"🎥 Видео-виджет версия в главной странице обновлена до ?v={self.video_widget_version}")
-            
-            # Сохраняем обновленную главную страницу
-            with open(main_page, 'w', encoding='utf-8') as f:
-                f.write(content)
+            with site_transaction(self.project_root, (MAIN_PAGE,), files) as files:
+                content = files.read(MAIN_PAGE)
+                if content is None:
+                    print("❌ index.html не найден!")
+                    return False
+                
+                updated = self._update_main_page_content(content)
+                
+                # Сохраняем обновленную главную страницу, только если версии ассетов изменились
+                if updated != content:
+                    files.write(MAIN_PAGE, updated)
             
             print(f"✅ Все версии в главной странице обновлены")
             return True
@@ -512,9 +452,22 @@ AI-Ассистент - это умный чат-бот на базе GPT и н
         except Exception as e:
             print(f"❌ Ошибка при обновлении главной страницы: {str(e)}")
             return False
+
+    def _update_main_page_content(self, content):
+        """Проставляет текущие версии CSS/JS/виджета в содержимом index.html"""
+        return self._apply_asset_versions(content, " в главной странице")
     
-    def update_all_files(self, article_filename):
-        """Обновляет все файлы для новой статьи"""
+    def update_all_files(self, article_filename, draft=None):
+        """Обновляет все файлы для новой статьи.
+
+        draft — статья в памяти (ArticleDraft) из конвейера генерации: версии
+        проставляются в ней, и статья записывается на диск один раз.
+        """
+        if draft is None:
+            article_path = self.project_root / article_filename
+            if article_path.exists():
+                draft = ArticleDraft.load(self.project_root, article_filename)
+        
         print(f"🚀 Обновление файлов для статьи: {article_filename}")
         print(f"📅 Дата: {self.current_date}")
         print(f"🎨 CSS версия: {self.css_version}")
@@ -522,20 +475,26 @@ AI-Ассистент - это умный чат-бот на базе GPT и н
         print(f"🎥 Видео-виджет версия: {self.video_widget_version}")
         print("-" * 60)
         
-        # Обновляем все файлы
-        self.update_sitemap(article_filename)
-        self.update_llms_txt(article_filename)
-        self.update_robots_txt()
-        self.update_ai_txt(article_filename)
-        
-        # Обновляем версии в статье
-        self.update_versions_in_article(article_filename)
-        
-        # Обновляем версии в главной странице
-        self.update_main_page_versions()
+        # Обновляем версии в статье и записываем ее (единственная запись статьи)
+        if draft is not None:
+            self.update_versions_in_article(article_filename, draft)
+            draft.commit()
+        else:
+            self.update_versions_in_article(article_filename)
+        
+        # Обновляем все общие файлы одной транзакцией (sitemap — по итоговому содержимому статьи):
+        # параллельные публикации ждут блокировок, а nginx видит файлы только целиком
+        with SiteTransaction(self.project_root, SHARED_SITE_FILES) as files:
+            self.update_sitemap(article_filename, draft.content if draft is not None else None, files)
+            self.update_llms_txt(article_filename, files)
+            self.update_robots_txt()
+            self.update_ai_txt(article_filename, files)
+            
+            # Обновляем версии в главной странице
+            self.update_main_page_versions(files)
         
         # Создаем комплексный SEO-отчет с автоматическими проверками
-        self.create_comprehensive_seo_report(article_filename)
+        self.create_comprehensive_seo_report(article_filename, draft.content if draft is not None else None)
         
         # Информация о тестировании
         print("\n🔍 Автоматические проверки завершены!")
@@ -554,6 +513,85 @@ AI-Ассистент - это умный чат-бот на базе GPT и н
         
         return True
 
+    def _publish_article_draft(self, draft):
+        """Работа над одной статьей в пакете: версии в памяти и единственная запись"""
+        self.update_versions_in_article(draft.filename, draft)
+        draft.commit()
+        return draft
+
+    def update_all_files_batch(self, article_filenames, drafts=None, max_workers=None):
+        """Обновляет файлы для пакета статей.
+
+        Изменения общих файлов (sitemap.xml, llms.txt, .well-known/ai.txt,
+        index.html) накапливаются в памяти, и каждый файл записывается один
+        раз на весь пакет. Версии в статьях и SEO-отчеты обрабатываются
+        в пуле потоков. drafts — статьи в памяти (ArticleDraft) по имени файла.
+        """
+        drafts = dict(drafts or {})
+        print(f"🚀 Пакетное обновление файлов для {len(article_filenames)} статей")
+        print(f"📅 Дата: {self.current_date}")
+        print(f"🎨 CSS версия: {self.css_version}")
+        print(f"⚡ JS версия: {self.js_version}")
+        print(f"🎥 Видео-виджет версия: {self.video_widget_version}")
+        print("-" * 60)
+        
+        # Статьи, которые нужно загрузить с диска
+        filenames = []
+        for article_filename in dict.fromkeys(article_filenames):
+            if article_filename in drafts:
+                filenames.append(article_filename)
+            elif (self.project_root / article_filename).exists():
+                drafts[article_filename] = ArticleDraft.load(self.project_root, article_filename)
+                filenames.append(article_filename)
+            else:
+                print(f"❌ Файл статьи {article_filename} не найден, пропускаю")
+        
+        if not filenames:
+            print("❌ Нет статей для обновления")
+            return False
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Версии в статьях и запись статей — параллельно
+            published = list(executor.map(self._publish_article_draft, (drafts[name] for name in filenames)))
+            
+            # Общие файлы: все изменения в памяти одной транзакции, одна запись на файл
+            with SiteTransaction(self.project_root, SHARED_SITE_FILES) as files:
+                builder = SitemapBuilder(self.project_root, files=files)
+                for draft in published:
+                    self._upsert_sitemap_article(builder, draft.filename, draft.content)
+                builder.write()
+                
+                llms_content = files.read(LLMS_TXT)
+                if llms_content is not None:
+                    updated_llms = llms_content
+                    for article_filename in filenames:
+                        updated_llms = self._add_to_llms_txt(updated_llms, article_filename)
+                    if updated_llms != llms_content:
+                        files.write(LLMS_TXT, updated_llms)
+                else:
+                    print("❌ llms.txt не найден!")
+                
+                self.update_robots_txt()
+                
+                ai_content = self._read_ai_txt(files)
+                updated_ai = ai_content
+                for article_filename in filenames:
+                    updated_ai = self._add_to_ai_txt(updated_ai, article_filename)
+                if updated_ai != ai_content:
+                    files.write(AI_TXT, updated_ai)
+                
+                self.update_main_page_versions(files)
+            
+            # SEO-отчеты по итоговому содержимому статей — параллельно
+            list(executor.map(lambda draft: self.create_comprehensive_seo_report(draft.filename, draft.content),
+                              published))
+        
+        print("-" * 60)
+        print(f"✅ Пакет обновлен: {len(filenames)} статей, общие файлы записаны по одному разу")
+        for article_filename in filenames:
+            print(f"   • https://ai-agent-lia.ru/{article_filename}")
+        
+        return True
 
 
 def main():
@@ -567,6 +605,21 @@ def main():
     # Создаем экземпляр обновлятора
     updater = ArticleUpdater()
     
+    # Несколько файлов в аргументах — пакетный режим (общие файлы пишутся один раз)
+    if len(sys.argv) > 2:
+        article_filenames = sys.argv[1:]
+        invalid = [name for name in article_filenames if not name.endswith('.html')]
+        if invalid:
+            print(f"❌ Файлы должны иметь расширение .html: {', '.join(invalid)}")
+            return
+        print(f"📝 Пакетный режим: {len(article_filenames)} статей")
+        try:
+            updater.update_all_files_batch(article_filenames)
+            print("\n🎉 Автоматизация завершена!")
+        except Exception as e:
+            print(f"\n❌ Ошибка во время выполнения: {str(e)}")
+        return
+    
     # Проверяем аргументы командной строки
     if len(sys.argv) > 1:
         article_filename = sys.argv[1]
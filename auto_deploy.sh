@@ -59,6 +59,14 @@ fi
 # ШАГ 5: Настройка Nginx
 echo "🌐 ШАГ 5: Настройка Nginx..."
 
+# Готовые .gz/.br рядом с файлами пишет сам агент (precompress.py):
+# gzip_static отдает их без сжатия на лету, brotli_static — если есть модуль brotli
+apt install -y libnginx-mod-http-brotli-static || true
+BROTLI_CONF=""
+if ls /etc/nginx/modules-enabled/*brotli* >/dev/null 2>&1; then
+    BROTLI_CONF="brotli_static on;"
+fi
+
 # Создаем конфигурацию сайта
 cat > /etc/nginx/sites-available/$DOMAIN << EOF
 server {
@@ -71,6 +79,17 @@ server {
     access_log /var/log/nginx/$DOMAIN.access.log;
     error_log /var/log/nginx/$DOMAIN.error.log;
     
+    # Служебные скрытые файлы и каталоги проекта (.env, .git, .llm_cache ...) не отдаются;
+    # исключение — .well-known (ai.txt, проверка certbot)
+    location ~ /\.(?!well-known/) {
+        deny all;
+    }
+    
+    # Очередь тем, телеметрия и пакеты Batch API, оставшиеся в каталоге сайта от прежних версий
+    location ~ \.(sqlite3|sqlite3-journal|jsonl)$ {
+        deny all;
+    }
+    
     location ~ \.html$ {
         try_files \$uri \$uri/ =404;
         add_header Content-Type "text/html; charset=utf-8";
@@ -85,6 +104,10 @@ server {
     add_header X-XSS-Protection "1; mode=block" always;
     add_header X-Content-Type-Options "nosniff" always;
     
+    gzip_static on;
+    $BROTLI_CONF
+    
+    # Сжатие на лету — для файлов без готовых копий
     gzip on;
     gzip_vary on;
     gzip_min_length 1024;
@@ -114,7 +137,7 @@ Type=simple
 User=root
 WorkingDirectory=$PROJECT_DIR
 Environment=PATH=$PROJECT_DIR/venv/bin
-ExecStart=$PROJECT_DIR/venv/bin/python3 auto_article_generator.py
+ExecStart=$PROJECT_DIR/venv/bin/python3 auto_article_generator.py daemon
 Restart=always
 RestartSec=10
 
@@ -126,11 +149,15 @@ EOF
 systemctl daemon-reload
 systemctl enable $SERVICE_NAME
 
-# ШАГ 7: Настройка Cron
-echo "⏰ ШАГ 7: Настройка Cron..."
+# ШАГ 7: Расписание генерации
+echo "⏰ ШАГ 7: Расписание генерации..."
 
-# Добавляем задачу в crontab (каждый час)
-(crontab -l 2>/dev/null; echo "0 * * * * cd $PROJECT_DIR && $PROJECT_DIR/venv/bin/python3 auto_article_generator.py >> $PROJECT_DIR/ai_generation_log.txt 2>&1") | crontab -
+# Cron больше не нужен: сервис работает в режиме daemon со своим расписанием
+# (интервал задается GENERATION_INTERVAL_MINUTES в .env, по умолчанию 60 минут).
+# Старую задачу cron (deploy.sh ставил запуск каждые 5 минут) удаляем; если она
+# все же осталась, однократный запуск не получит блокировку демона и завершится.
+crontab -l 2>/dev/null | grep -v "auto_article_generator.py" | crontab - || true
+echo "   Генерация выполняется демоном $SERVICE_NAME (GENERATION_INTERVAL_MINUTES в .env)"
 
 # ШАГ 8: Создание папки для логов
 echo "📝 ШАГ 8: Создание папки для логов..."
@@ -146,6 +173,9 @@ chmod 644 $PROJECT_DIR/*.html
 chmod 644 $PROJECT_DIR/*.css
 chmod 644 $PROJECT_DIR/*.js
 
+# Сжатые копии для статических файлов из git (статьи агент сжимает сам при записи)
+python3 precompress.py $PROJECT_DIR
+
 # ШАГ 10: Тестовая генерация
 echo "🧪 ШАГ 10: Тестовая генерация..."
 cd $PROJECT_DIR
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище backup-снимков статей AI-Ассистент
+Снимки (версия статьи до оптимизации по правилам, до применения плана
+GPT-5 ...) хранятся вне каталога сайта: содержимое сжимается (zstd, если
+установлен zstandard, иначе gzip) и адресуется по SHA-256, поэтому
+одинаковые снимки занимают место один раз. Индекс снимков — SQLite.
+Политика хранения: последние BACKUP_KEEP_PER_ARTICLE снимков статьи и
+общий размер не больше BACKUP_MAX_MB (последний снимок статьи не удаляется).
+
+Использование:
+    python3 backup_store.py                          # статистика хранилища
+    python3 backup_store.py list [статья.html]       # снимки (все или одной статьи)
+    python3 backup_store.py restore статья.html[@метка] [id|метка]   # восстановить статью
+    python3 backup_store.py prune                    # применить политику хранения
+    python3 backup_store.py migrate [каталог]        # перенести старые *.backup.html в хранилище
+"""
+
+import os
+import sys
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from data_paths import data_dir
+from site_files import atomic_write
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен: без него снимки сжимаются gzip
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    codec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article TEXT NOT NULL,
+    label TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES objects (sha256),
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_article ON snapshots (article, id);
+CREATE INDEX IF NOT EXISTS snapshots_sha256 ON snapshots (sha256);
+"""
+
+CODEC_SUFFIX = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def default_backup_dir() -> Path:
+    """Каталог вне корня сайта: nginx отдает весь каталог проекта"""
+    configured = os.getenv("ARTICLE_BACKUP_DIR")
+    if configured:
+        return Path(configured)
+    return data_dir() / "backups"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("снимок сжат zstd: установите пакет zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def split_article_ref(ref: str) -> Tuple[str, Optional[str]]:
+    """'статья.html@gpt' -> ('статья.html', 'gpt')"""
+    article, _, label = ref.partition("@")
+    return article, label or None
+
+
+class BackupStore:
+    def __init__(self, root=None, keep_per_article=None, max_size_mb=None, codec=None):
+        self.root = Path(root or default_backup_dir())
+        self.keep_per_article = int(keep_per_article if keep_per_article is not None
+                                    else os.getenv("BACKUP_KEEP_PER_ARTICLE", "10"))
+        self.max_size = int(float(max_size_mb if max_size_mb is not None
+                                  else os.getenv("BACKUP_MAX_MB", "200")) * 1024 * 1024)
+        codec = codec or os.getenv("BACKUP_CODEC") or ("zstd" if zstandard is not None else "gzip")
+        if codec == "zstd" and zstandard is None:
+            print("⚠️ zstandard не установлен, backup-снимки сжимаются gzip")
+            codec = "gzip"
+        if codec not in CODEC_SUFFIX:
+            raise ValueError(f"❌ Неизвестный кодек backup: {codec} (zstd или gzip)")
+        self.codec = codec
+
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Журнал DELETE (а не WAL), как у очереди тем: хранилище может лежать на сетевом диске
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Запись объектов и индекса под блокировкой: очистка не удалит объект, который сейчас сохраняется"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def _object_path(self, sha256: str, codec: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}{CODEC_SUFFIX[codec]}"
+
+    # ---------- запись ----------
+
+    def save(self, article: str, label: str, content: str, created_at: Optional[float] = None) -> int:
+        """Сохраняет снимок статьи; возвращает id снимка.
+        Запись снимка создается всегда (метка должна находиться при восстановлении),
+        а одинаковое содержимое хранится одним объектом."""
+        data = content.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        created_at = created_at or time.time()
+
+        with self._transaction() as conn:
+            if not conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone():
+                stored = _compress(data, self.codec)
+                path = self._object_path(sha256, self.codec)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(stored)
+                os.replace(tmp_path, path)
+                conn.execute("INSERT INTO objects (sha256, size, stored_size, codec) VALUES (?, ?, ?, ?)",
+                             (sha256, len(data), len(stored), self.codec))
+
+            snapshot_id = conn.execute(
+                "INSERT INTO snapshots (article, label, sha256, created_at) VALUES (?, ?, ?, ?)",
+                (article, label, sha256, created_at)).lastrowid
+            self._prune(conn, article)
+        return snapshot_id
+
+    def prune(self) -> Dict[str, int]:
+        """Политика хранения для всех статей; возвращает число удаленных снимков и объектов"""
+        with self._transaction() as conn:
+            articles = [row[0] for row in conn.execute("SELECT DISTINCT article FROM snapshots")]
+            before = self._counts(conn)
+            for article in articles:
+                self._prune(conn, article, enforce_size=False)
+            self._enforce_size(conn)
+            after = self._counts(conn)
+        return {"snapshots": before[0] - after[0], "objects": before[1] - after[1]}
+
+    def _prune(self, conn, article: str, enforce_size: bool = True):
+        stale = [row[0] for row in conn.execute(
+            "SELECT id FROM snapshots WHERE article = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (article, self.keep_per_article))]
+        for snapshot_id in stale:
+            self._delete_snapshot(conn, snapshot_id)
+        if enforce_size:
+            self._enforce_size(conn)
+
+    def _enforce_size(self, conn):
+        """Удаляет самые старые снимки, пока объекты не уложатся в лимит; последний снимок статьи остается"""
+        total = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_size:
+            return
+        candidates = conn.execute(
+            "SELECT id FROM snapshots WHERE id NOT IN (SELECT MAX(id) FROM snapshots GROUP BY article) "
+            "ORDER BY id").fetchall()
+        for (snapshot_id,) in candidates:
+            total -= self._delete_snapshot(conn, snapshot_id)
+            if total <= self.max_size:
+                break
+
+    def _delete_snapshot(self, conn, snapshot_id: int) -> int:
+        """Удаляет снимок и ставший ненужным объект; возвращает освобожденный размер"""
+        row = conn.execute("SELECT sha256 FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        if row is None:
+            return 0
+        conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+        sha256 = row[0]
+        if conn.execute("SELECT 1 FROM snapshots WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone():
+            return 0
+        stored_size, codec = conn.execute("SELECT stored_size, codec FROM objects WHERE sha256 = ?",
+                                          (sha256,)).fetchone()
+        conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+        try:
+            self._object_path(sha256, codec).unlink()
+        except FileNotFoundError:
+            pass
+        return stored_size
+
+    @staticmethod
+    def _counts(conn) -> Tuple[int, int]:
+        return (conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0])
+
+    # ---------- чтение ----------
+
+    def find(self, article: str, ref: Optional[str] = None) -> Optional[Dict]:
+        """Снимок статьи: по id, по метке (последний с этой меткой) или просто последний"""
+        query = "SELECT id, article, label, sha256, created_at FROM snapshots WHERE article = ?"
+        params: tuple = (article,)
+        if ref is not None and ref.isdigit():
+            query += " AND id = ?"
+            params += (int(ref),)
+        elif ref:
+            query += " AND label = ?"
+            params += (ref,)
+        row = self._conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "article", "label", "sha256", "created_at"), row))
+
+    def read(self, sha256: str) -> str:
+        row = self._conn.execute("SELECT codec FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            raise KeyError(f"объект {sha256[:12]} отсутствует в хранилище")
+        with open(self._object_path(sha256, row[0]), "rb") as f:
+            data = _decompress(f.read(), row[0])
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"объект {sha256[:12]} поврежден: хэш не совпадает")
+        return data.decode("utf-8")
+
+    def snapshots(self, article: Optional[str] = None) -> List[Dict]:
+        query = ("SELECT s.id, s.article, s.label, s.created_at, o.size, o.stored_size "
+                 "FROM snapshots s JOIN objects o ON o.sha256 = s.sha256")
+        params: tuple = ()
+        if article:
+            query += " WHERE s.article = ?"
+            params = (article,)
+        rows = self._conn.execute(query + " ORDER BY s.article, s.id", params).fetchall()
+        return [dict(zip(("id", "article", "label", "created_at", "size", "stored_size"), row)) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        snapshots, objects = self._counts(self._conn)
+        logical = self._conn.execute(
+            "SELECT COALESCE(SUM(o.size), 0) FROM snapshots s JOIN objects o ON o.sha256 = s.sha256").fetchone()[0]
+        size, stored = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects").fetchone()
+        articles = self._conn.execute("SELECT COUNT(DISTINCT article) FROM snapshots").fetchone()[0]
+        return {"articles": articles, "snapshots": snapshots, "objects": objects,
+                "logical_size": logical, "unique_size": size, "stored_size": stored}
+
+    # ---------- восстановление ----------
+
+    def restore(self, project_root, article: str, ref: Optional[str] = None) -> Dict:
+        """Возвращает статью к снимку. Текущая версия сначала сохраняется как снимок 'restore',
+        поэтому восстановление тоже можно откатить."""
+        snapshot = self.find(article, ref)
+        if snapshot is None:
+            return {"success": False, "error": f"Снимок {ref or 'последний'} для {article} не найден"}
+        content = self.read(snapshot["sha256"])
+
+        path = Path(project_root) / article
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                self.save(article, "restore", f.read())
+        atomic_write(path, content)
+        return {"success": True, "snapshot": snapshot, "path": str(path)}
+
+    def migrate_legacy(self, project_root) -> int:
+        """Переносит старые копии статья.<метка>.backup.html из каталога сайта в хранилище"""
+        legacy = sorted(Path(project_root).glob("*.backup.html"), key=lambda path: path.stat().st_mtime)
+        for path in legacy:
+            stem, _, label = path.name[:-len(".backup.html")].rpartition(".")
+            if not stem:
+                stem, label = label, "legacy"
+            with open(path, 'r', encoding='utf-8') as f:
+                self.save(f"{stem}.html", label, f.read(), created_at=path.stat().st_mtime)
+            path.unlink()
+        return len(legacy)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_backup_store() -> BackupStore:
+    """Общее для процесса хранилище снимков"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BackupStore()
+        return _store
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} МБ" if size >= 1024 * 1024 else f"{size / 1024:.1f} КБ"
+
+
+def main():
+    store = get_backup_store()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "list":
+        rows = store.snapshots(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"🗄️ Снимков: {len(rows)} ({store.root})")
+        for row in rows:
+            created = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"   {row['id']:>6}  {row['article']}@{row['label']}  {created}  "
+                  f"{_format_size(row['size'])} -> {_format_size(row['stored_size'])}")
+    elif command == "restore":
+        if len(sys.argv) < 3:
+            print("❌ Укажите статью: backup_store.py restore статья.html[@метка] [id|метка]")
+            return 1
+        article, label = split_article_ref(sys.argv[2])
+        result = store.restore(".", article, sys.argv[3] if len(sys.argv) > 3 else label)
+        if not result["success"]:
+            print(f"❌ {result['error']}")
+            return 1
+        snapshot = result["snapshot"]
+        print(f"♻️ {article} восстановлена из снимка {snapshot['id']} ({snapshot['label']}); "
+              f"текущая версия сохранена как '{article}@restore'")
+    elif command == "prune":
+        removed = store.prune()
+        print(f"🧹 Удалено снимков: {removed['snapshots']}, объектов: {removed['objects']}")
+    elif command == "migrate":
+        moved = store.migrate_legacy(sys.argv[2] if len(sys.argv) > 2 else ".")
+        print(f"📦 Перенесено старых backup-файлов: {moved}")
+    else:
+        stats = store.stats()
+        print(f"🗄️ Хранилище backup: {store.root} (кодек {store.codec})")
+        print(f"   статей: {stats['articles']}, снимков: {stats['snapshots']}, уникальных: {stats['objects']}")
+        print(f"   объем снимков {_format_size(stats['logical_size'])}, без дублей "
+              f"{_format_size(stats['unique_size'])}, на диске {_format_size(stats['stored_size'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
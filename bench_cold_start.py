@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк холодного старта подкоманд cli.py
+Каждый замер — новый процесс Python, который импортирует модули подкоманды
+(cli.load) без запуска. Берется медиана нескольких запусков и сравнивается
+с бюджетом; для легких подкоманд дополнительно проверяется, что OpenAI SDK,
+dotenv и requests не попали в sys.modules.
+
+Использование:
+    python3 bench_cold_start.py [запусков]
+Код выхода 1 — бюджет превышен или легкая подкоманда тянет тяжелые модули.
+"""
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+from cli import COMMANDS
+
+# Бюджет медианного времени импорта, секунды
+BUDGETS = {
+    "generate": 2.0,
+    "optimize": 2.0,
+    "update-indexes": 0.3,
+    "audit": 0.3,
+    "topics": 0.3,
+    "backups": 0.3,
+}
+
+# Модули, которых не должно быть у подкоманд без обращения к OpenAI
+HEAVY_MODULES = ("openai", "dotenv", "requests", "httpx")
+LIGHT_COMMANDS = ("update-indexes", "audit", "topics", "backups")
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import cli
+cli.load({command!r})
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy, "modules": len(sys.modules)}}))
+"""
+
+
+def measure(command: str, runs: int):
+    """Медиана времени импорта подкоманды в новых процессах"""
+    project_root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    heavy = []
+    modules = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(command=command, heavy=HEAVY_MODULES)],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["elapsed"])
+        heavy = result["heavy"]
+        modules = result["modules"]
+    return statistics.median(samples), heavy, modules
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"⏱️ Холодный старт подкоманд cli.py (медиана {runs} запусков)")
+    print("=" * 60)
+
+    violations = []
+    for command in COMMANDS:
+        median, heavy, modules = measure(command, runs)
+        budget = BUDGETS[command]
+        status = "✅" if median <= budget else "❌"
+        print(f"{status} {command:<15} {median * 1000:7.1f} мс (бюджет {budget * 1000:.0f} мс), модулей {modules}")
+        if median > budget:
+            violations.append(f"{command}: {median:.3f} сек > {budget} сек")
+        if command in LIGHT_COMMANDS and heavy:
+            print(f"   ⚠️ загружены тяжелые модули: {', '.join(heavy)}")
+            violations.append(f"{command}: импортирует {', '.join(heavy)}")
+
+    if violations:
+        print("\n❌ Нарушения:")
+        for violation in violations:
+            print(f"   • {violation}")
+        return 1
+    print("\n🎉 Все подкоманды в бюджете")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
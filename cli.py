@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Единая точка входа AI-Ассистент
+Каждая подкоманда импортирует только свои модули: обновление индексов,
+аудит и работа с темами запускаются без OpenAI SDK и dotenv.
+
+Использование:
+    python3 cli.py generate [batch N [параллельность] | daemon [интервал] [догон] | batch-export ... | batch-import ...]
+    python3 cli.py optimize <статья.html>
+    python3 cli.py update-indexes [статья.html ...]
+    python3 cli.py audit [--force] [процессов]
+    python3 cli.py topics [stats | dead | requeue [номер] | cities]
+    python3 cli.py backups [list [статья.html] | restore статья.html[@метка] [id|метка] | prune | migrate]
+"""
+
+import sys
+import importlib
+
+# Подкоманда -> модули, которые она загружает (по ним же меряется холодный старт)
+COMMANDS = {
+    "generate": ("auto_article_generator", "article_agent"),
+    "optimize": ("geo_hybrid_agent", "openai_clients", "llm_scheduler"),
+    "update-indexes": ("auto_article_updater",),
+    "audit": ("geo_hybrid_agent",),
+    "topics": ("topic_queue",),
+    "backups": ("backup_store",),
+}
+
+
+def load(command: str):
+    """Импортирует модули подкоманды (без запуска)"""
+    return [importlib.import_module(name) for name in COMMANDS[command]]
+
+
+def _run_script_main(module_name: str, args):
+    """Запускает main() модуля так, как будто скрипт вызван с этими аргументами"""
+    module = importlib.import_module(module_name)
+    sys.argv = [f"{module_name}.py", *args]
+    return module.main()
+
+
+def cmd_generate(args):
+    return _run_script_main("auto_article_generator", args)
+
+
+def cmd_optimize(args):
+    if not args:
+        print("❌ Укажите статью: cli.py optimize <статья.html>")
+        return 1
+    return _run_script_main("geo_hybrid_agent", ["hybrid", args[0]])
+
+
+def cmd_update_indexes(args):
+    # Со списком статей — полное обновление файлов сайта для них (пакетом, если статей несколько)
+    if args:
+        return _run_script_main("auto_article_updater", args)
+
+    # Без аргументов — только пересборка индексов по статьям на диске
+    from asset_manifest import AssetManifest
+    from asset_version_index import AssetVersionIndex
+    from sitemap_builder import SITEMAP_FILES, SitemapBuilder
+    from site_files import SiteTransaction
+
+    version_index = AssetVersionIndex(".").refresh()
+    print(f"🎨 Индекс версий: перечитано {version_index.stats['scanned']}, "
+          f"без изменений {version_index.stats['reused']}, удалено {version_index.stats['removed']}")
+    stale = version_index.stale_pages(AssetManifest(".").refresh().versions)
+    if stale:
+        print(f"⚠️ Страниц со старыми версиями ассетов: {len(stale)} "
+              f"(python3 auto_article_updater.py {' '.join(stale[:3])}{' ...' if len(stale) > 3 else ''})")
+    with SiteTransaction(".", SITEMAP_FILES) as files:
+        builder = SitemapBuilder(".", files=files)
+        changed = builder.rescan_articles()
+        written = builder.write()
+    print(f"🗺️ Sitemap: {len(builder.entries)} URL, изменилось статей {changed}, файлов {len(written)}")
+    return 0
+
+
+def cmd_audit(args):
+    return _run_script_main("geo_hybrid_agent", ["audit", *args])
+
+
+def cmd_topics(args):
+    if args and args[0] == "cities":
+        import generate_city_topics
+        generate_city_topics.main()
+        return 0
+    return _run_script_main("topic_queue", args)
+
+
+def cmd_backups(args):
+    return _run_script_main("backup_store", args)
+
+
+HANDLERS = {
+    "generate": cmd_generate,
+    "optimize": cmd_optimize,
+    "update-indexes": cmd_update_indexes,
+    "audit": cmd_audit,
+    "topics": cmd_topics,
+    "backups": cmd_backups,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in HANDLERS:
+        print(__doc__.strip())
+        return 1
+    return HANDLERS[argv[0]](argv[1:]) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
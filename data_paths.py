@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Каталог служебных данных AI-Ассистент
+nginx отдает весь каталог проекта, поэтому кэш ответов LLM, backup-снимки,
+очередь тем, телеметрия и результаты аудита по умолчанию хранятся вне
+него: $AI_AGENT_DATA_DIR или $XDG_DATA_HOME/ai-agent-lia
+(~/.local/share/ai-agent-lia). Файлы, оставшиеся в каталоге проекта от
+прежних версий, переносятся туда при первом обращении.
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+PROJECT_DIR = Path(__file__).parent
+
+
+def data_dir() -> Path:
+    configured = os.getenv("AI_AGENT_DATA_DIR")
+    if configured:
+        return Path(configured)
+    data_home = os.getenv("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(data_home) / "ai-agent-lia"
+
+
+def data_path(name: str, legacy: Optional[str] = None) -> Path:
+    """Путь к служебному файлу или каталогу name в каталоге данных.
+    legacy — прежнее имя в каталоге проекта: если новый путь еще не существует, данные переносятся"""
+    path = data_dir() / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    old = PROJECT_DIR / (legacy or name)
+    if not path.exists() and old.exists() and old.resolve() != path.resolve():
+        _migrate(old, path)
+    return path
+
+
+def _migrate(old: Path, path: Path):
+    # SQLite с горячим журналом переносить нельзя: транзакция еще не завершена
+    if Path(f"{old}-journal").exists():
+        print(f"⚠️ {old} используется (есть журнал SQLite), перенос в {path} отложен")
+        return
+    try:
+        shutil.move(str(old), str(path))
+        print(f"📦 {old.name} перенесен из каталога сайта в {path}")
+    except FileNotFoundError:
+        pass  # перенес параллельный процесс
+    except OSError as e:
+        print(f"⚠️ Не удалось перенести {old} в {path}: {e}")
@@ -152,7 +152,7 @@ def create_ai_business_csv(all_topics):
     print(f"📝 Формат: готов для генерации статей")
     print(f"🎯 Структура: 100 базовых + {len(all_topics) - 100} с городами")
 
-if __name__ == "__main__":
+def main():
     print("🚀 Генерация тем с городами для AI-Ассистент")
     print("=" * 60)
     
@@ -175,3 +175,7 @@ if __name__ == "__main__":
         print("   4. Начать с базовых тем, потом перейти к темам с городами")
     else:
         print("❌ Ошибка при генерации тем")
+
+
+if __name__ == "__main__":
+    main()
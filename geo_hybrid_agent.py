@@ -9,28 +9,74 @@ GEO-гибридный агент оптимизации для AI-Ассист
 """
 
 import os
-import re
 import json
-import requests
+import queue
+import hashlib
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
-import openai
-from dotenv import load_dotenv
+from llm_cache import get_response_cache
+from data_paths import data_path
+from html_document import HTMLDocument
+from html_splice import EditPlan
+from article_pipeline import ArticleDraft
+from geo_plan import PLAN_SECTIONS, PLAN_TEXT_FORMAT, PlanStreamError, PlanStreamParser, validate_plan
 
-# Загружаем переменные окружения
-load_dotenv()
+# openai, dotenv и планировщик импортируются только в онлайн-режиме:
+# аудиту (offline=True) SDK не нужен
+
+# Оценка ответа с планом (включая reasoning-токены) для лимита TPM
+PLAN_EXPECTED_OUTPUT_TOKENS = 4000
+
+# Комментарии-маркеры секций шаблона статьи (места вставки FAQ и вывода)
+FOOTER_MARKER = '============== FOOTER =============='
+FAQ_MARKER = '============== FAQ SECTION =============='
+
+# Типовой контентный вывод, который добавляет оптимизация по правилам
+RULES_SUMMARY_HTML = '''
+                <!-- ============== КОНТЕНТНЫЙ ВЫВОД ============== -->
+                <section class="content-summary-section">
+                  <div class="container">
+                    <div class="content-summary" style="background: var(--bg-alt); padding: 32px; border-radius: 20px; margin: 48px 0; text-align: center;">
+                      <h2 class="h2">📋 Краткий вывод</h2>
+                      <p style="font-size: 18px; line-height: 1.6; margin: 24px 0; color: var(--text);">
+                        AI-Ассистент предоставляет полный функционал автоматизации продаж и лидогенерации, позволяя бизнесу работать 24/7 без потери качества обслуживания. Интеграция с популярными платформами и CRM-системами обеспечивает seamless-внедрение в существующие бизнес-процессы.
+                      </p>
+                      <div style="display: flex; gap: 16px; justify-content: center; flex-wrap: wrap; margin-top: 24px;">
+                        <a href="/#trial" class="btn btn-primary">Протестировать бота</a>
+                        <a href="/#contact" class="btn btn-ghost">Получить консультацию</a>
+                      </div>
+                    </div>
+                  </div>
+                </section>'''
 
 class GEOHybridAgent:
-    def __init__(self):
+    def __init__(self, offline: bool = False, client=None):
+        """offline=True — только анализ по правилам (аудит): ключ API и клиент не нужны.
+        client — готовый клиент OpenAI (по умолчанию общий клиент процесса)."""
         self.project_root = Path(__file__).parent
+        self.MODEL = "gpt-5"  # Используем GPT-5 для планирования
+        self.client = None
+        self.scheduler = None
+        if not offline:
+            from dotenv import load_dotenv
+            from llm_scheduler import get_scheduler
+            from openai_clients import get_client
+            
+            # Загружаем переменные окружения
+            load_dotenv()
+        
         # Читаем API ключ из переменных окружения
         self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if not self.api_key and not offline:
             raise ValueError("❌ OPENAI_API_KEY не найден в переменных окружения. Проверьте файл .env")
         
-        self.client = openai.OpenAI(api_key=self.api_key)
-        self.MODEL = "gpt-5"  # Используем GPT-5 для планирования
+        if not offline:
+            # Общий для процесса клиент с пулом keep-alive соединений (повторы — в планировщике)
+            self.client = client or get_client(self.api_key)
+            self.scheduler = get_scheduler(self.MODEL)
+        self.response_cache = get_response_cache()
         
         # SEO элементы для проверки
         self.required_seo_elements = {
@@ -48,35 +94,74 @@ class GEOHybridAgent:
 
     def run_hybrid_optimization(self, article_path: str) -> Dict:
         """Запускает гибридную оптимизацию: анализ + GPT-5 планирование + применение"""
+        article_file = self.project_root / article_path
+        if not article_file.exists():
+            return {"success": False, "error": f"Файл {article_path} не найден"}
+        
+        draft = ArticleDraft.load(self.project_root, article_path)
+        result = self.optimize_draft(draft)
+        draft.commit()
+        return result
+
+    def optimize_draft(self, draft: ArticleDraft) -> Dict:
+        """Гибридная оптимизация статьи в памяти (запись на диск — draft.commit())"""
+        article_path = draft.filename
         try:
             print(f"🚀 Запускаю ГИБРИДНУЮ GEO-оптимизацию для: {article_path}")
             
             # 1. Анализируем статью через правила (быстро)
             print("📊 Этап 1: Анализ статьи через правила...")
-            analysis = self.analyze_article(article_path)
+            analysis = self.analyze_draft(draft)
             if not analysis["success"]:
                 return analysis
             
-            # 2. Планируем оптимизацию через GPT-5 (умно)
-            print("🤖 Этап 2: GPT-5 планирование оптимизации...")
-            llm_plan = self._request_gpt_optimization_plan(article_path, analysis)
-            if not llm_plan.get("success"):
+            # 2-3. План GPT-5 (самый долгий шаг) запрашивается в фоне, а оптимизация
+            # по правилам тем временем идет на копии статьи: от плана она не зависит
+            # Разделы плана приходят по мере генерации и применяются сразу (см. этап 4)
+            print("🤖 Этап 2: GPT-5 планирование оптимизации (в фоне)...")
+            streamed_sections = queue.Queue()
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                plan_future = executor.submit(self._request_gpt_optimization_plan, article_path, analysis,
+                                              draft.content, lambda key, value: streamed_sections.put((key, value)))
+                
+                print("🔧 Этап 3: Оптимизация по правилам (параллельно с GPT-5)...")
+                rules_draft = ArticleDraft(draft.project_root, draft.filename, draft.content, on_disk=True)
+                optimization_result = self.optimize_draft_rules(rules_draft, analysis)
+                
+                # 4. Сводим правки: правила — сразу, разделы плана — по мере поступления
+                print("🔧 Этап 4: Объединение правок правил и GPT-5 плана...")
+                rules_summary_added = self._merge_rules_into_draft(draft, rules_draft)
+                draft.snapshot("gpt")
+                applied = {}
+                while not plan_future.done() or not streamed_sections.empty():
+                    try:
+                        key, value = streamed_sections.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    self._apply_plan_sections_to_draft(draft, {key: value}, applied, rules_summary_added)
+                
+                llm_plan = plan_future.result()
+            
+            if llm_plan.get("success"):
+                # План из кэша не стримится: применяем разделы, которые еще не применены
+                self._apply_plan_sections_to_draft(draft, llm_plan["data"], applied, rules_summary_added)
+                print("✅ GPT-5 план применен успешно!")
+            elif applied:
+                print(f"⚠️ GPT-5 план оборван ({llm_plan.get('error')}), применены полученные разделы: "
+                      f"{', '.join(applied)}")
+                llm_plan = {"success": True, "partial": True,
+                            "data": {key: section["data"] for key, section in applied.items()}}
+            else:
                 print(f"⚠️ GPT-5 планирование не удалось: {llm_plan.get('error')}")
                 print("🔄 Продолжаем с оптимизацией по правилам...")
                 llm_plan = {"success": False, "data": {}}
             
-            # 3. Применяем GPT-5 план (если есть)
-            if llm_plan.get("success"):
-                print("🔧 Этап 3: Применение GPT-5 плана...")
-                gpt_result = self._apply_gpt_plan(article_path, llm_plan["data"])
-                if gpt_result.get("success"):
-                    print("✅ GPT-5 план применен успешно!")
-                else:
-                    print(f"⚠️ Ошибка применения GPT-5 плана: {gpt_result.get('error')}")
-            
-            # 4. Дополнительная оптимизация по правилам
-            print("🔧 Этап 4: Дополнительная оптимизация по правилам...")
-            optimization_result = self.optimize_article(article_path)
+            if applied.get("content_improvements", {}).get("summary_replaced"):
+                # Типовой вывод правил заменен выводом из плана
+                elements = optimization_result.get("elements_generated", [])
+                optimization_result["elements_generated"] = [
+                    element for element in elements if not element.startswith("Добавлено")
+                ] + ["Типовой вывод заменен выводом из GPT-5 плана"]
             
             # 5. Создаем комплексный отчет
             print("📋 Этап 5: Создание комплексного отчета...")
@@ -102,66 +187,137 @@ class GEOHybridAgent:
         except Exception as e:
             return {"success": False, "error": f"Ошибка гибридной оптимизации: {str(e)}"}
 
-    def _request_gpt_optimization_plan(self, article_path: str, analysis: Dict) -> Dict:
-        """Запрашивает план оптимизации у GPT-5"""
+    def _merge_rules_into_draft(self, draft: ArticleDraft, rules_draft: ArticleDraft) -> bool:
+        """Переносит результат правил (выполнялись на копии исходной статьи) в статью.
+
+        Разделы плана потом применяются поверх. Правки почти не пересекаются:
+        правила только добавляют недостающее (alt, keywords/author, вывод),
+        а план переписывает title, description, alt по шаблону src и добавляет
+        FAQ/вывод. Единственный конфликт — контентный вывод, его разрешает
+        _apply_plan_sections_to_draft. Возвращает True, если правила добавили типовой вывод.
+        """
+        rules_summary = RULES_SUMMARY_HTML + '\n\n'
+        rules_summary_added = rules_summary in rules_draft.content and rules_summary not in draft.content
+        
+        # Backup исходной версии и обновление статьи в памяти
+        draft.snapshot("rules")
+        draft.content = rules_draft.content
+        return rules_summary_added
+
+    def _request_gpt_optimization_plan(self, article_path: str, analysis: Dict, article_content: Optional[str] = None,
+                                       on_section=None) -> Dict:
+        """Запрашивает план оптимизации у GPT-5 (строгая JSON-схема, ответ разбирается по мере потока).
+        on_section(ключ, значение) вызывается для каждого готового раздела плана до конца ответа."""
         try:
-            # Читаем содержимое статьи
-            article_file = self.project_root / article_path
-            with open(article_file, 'r', encoding='utf-8') as f:
-                article_content = f.read()
+            # Читаем содержимое статьи (если его не передали из памяти)
+            if article_content is None:
+                article_file = self.project_root / article_path
+                with open(article_file, 'r', encoding='utf-8') as f:
+                    article_content = f.read()
             
             # Собираем контекст для GPT-5
             context = self._collect_context_for_gpt(article_path, analysis, article_content)
             
             # Формируем промпт для GPT-5
             system_prompt = (
-                "Ты эксперт по SEO и LLM-оптимизации. Проанализируй статью и создай план оптимизации. "
-                "Верни ТОЛЬКО валидный JSON без пояснений."
+                "Ты эксперт по SEO и LLM-оптимизации. Проанализируй статью и создай план оптимизации "
+                "по заданной JSON-схеме."
             )
             
             user_prompt = self._build_gpt_prompt(context, analysis)
             
-            # Отправляем запрос к GPT-5 через Responses API
-            response = self.client.responses.create(
-                model=self.MODEL,
-                input=f"{system_prompt}\n\n{user_prompt}",
-                reasoning={"effort": "medium"},   # minimal|low|medium|high
-                text={"verbosity": "medium"}     # low|medium|high
+            # Отправляем запрос к GPT-5 через Responses API (одинаковый промпт — ответ из кэша)
+            request_params = {
+                "model": self.MODEL,
+                "input": f"{system_prompt}\n\n{user_prompt}",
+                "reasoning": {"effort": "medium"},   # minimal|low|medium|high
+                "text": {"verbosity": "medium",      # low|medium|high
+                         "format": PLAN_TEXT_FORMAT}  # Structured Outputs: ответ строго по схеме плана
+            }
+            requested = []
+
+            def request_plan():
+                requested.append(True)
+                text, _ = self.scheduler.call(
+                    lambda: self._stream_plan(request_params, PlanStreamParser(on_section)),
+                    self.scheduler.estimate_tokens(request_params["input"], PLAN_EXPECTED_OUTPUT_TOKENS),
+                    f"GEO-план {article_path}",
+                    stage="geo_plan", article=article_path,
+                    reasoning_effort=request_params["reasoning"]["effort"], usage=lambda result: result[1])
+                return text.strip()
+
+            # Промпт строится только из анализа, поэтому в ключ добавляем хэш статьи:
+            # иначе статьи с одинаковыми оценками получили бы один и тот же план
+            cache_key = self.response_cache.make_key(
+                article_sha256=hashlib.sha256(article_content.encode("utf-8")).hexdigest(),
+                **request_params
             )
+            gpt_response = self.response_cache.get_or_create(
+                cache_key, request_plan,
+                should_cache=lambda text: self._parse_gpt_plan(text, verbose=False)["success"],
+                model=self.MODEL, stage="geo_plan"
+            )
+            if not requested:
+                print("💾 План GPT-5 взят из кэша")
+
+            return self._parse_gpt_plan(gpt_response)
             
-            # Парсим ответ
-            gpt_response = response.output_text.strip()
-            
-            print(f"🤖 GPT-5 ответ получен (длина: {len(gpt_response)} символов)")
-            print(f"📝 Первые 200 символов: {gpt_response[:200]}...")
-            
-            # Убираем возможные кодовые блоки
-            gpt_response = re.sub(r'^```[a-zA-Z]*\n|\n```$', '', gpt_response)
-            
-            # Ищем JSON в ответе
-            json_match = re.search(r'\{.*\}', gpt_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                print(f"🔍 Найден JSON (длина: {len(json_str)} символов)")
-                print(f"📋 JSON: {json_str[:300]}...")
-                
-                try:
-                    # Парсим JSON
-                    plan = json.loads(json_str)
-                    print("✅ JSON успешно распарсен")
-                    return {"success": True, "data": plan}
-                except json.JSONDecodeError as e:
-                    print(f"❌ Ошибка парсинга JSON: {e}")
-                    print(f"🔍 Проблемный JSON: {json_str}")
-                    return {"success": False, "error": f"Ошибка парсинга JSON: {str(e)}"}
-            else:
-                print("❌ JSON не найден в ответе GPT-5")
-                print(f"🔍 Полный ответ GPT-5: {gpt_response}")
-                return {"success": False, "error": "JSON не найден в ответе GPT-5"}
-            
+        except PlanStreamError as e:
+            print(f"🛑 План GPT-5 не по схеме, запрос прерван: {e}")
+            return {"success": False, "error": f"План не соответствует схеме: {str(e)}"}
         except Exception as e:
             return {"success": False, "error": f"Ошибка GPT-5 планирования: {str(e)}"}
 
+    def _stream_plan(self, request_params: Dict, parser: PlanStreamParser) -> Tuple[str, object]:
+        """Потоковый запрос плана: разделы разбираются по мере поступления, ответ не по схеме
+        обрывает запрос (выход из with закрывает соединение). Возвращает (текст, usage)"""
+        usage = None
+        with self.client.responses.create(**request_params, stream=True) as stream:
+            for event in stream:
+                event_type = getattr(event, "type", "")
+                if event_type == "response.output_text.delta":
+                    parser.feed(event.delta)
+                elif event_type == "response.completed":
+                    usage = getattr(event.response, "usage", None)
+                elif event_type == "response.incomplete":
+                    details = getattr(event.response, "incomplete_details", None)
+                    raise PlanStreamError(f"ответ обрезан ({getattr(details, 'reason', 'incomplete')})")
+                elif event_type in ("response.failed", "error"):
+                    error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", None)
+                    raise RuntimeError(f"ошибка генерации плана: {getattr(error, 'message', error)}")
+        parser.finish()
+        return parser.text, usage
+
+    def _parse_gpt_plan(self, gpt_response: str, verbose: bool = True) -> Dict:
+        """Разбирает JSON-план GPT-5 и проверяет его по схеме"""
+        log = print if verbose else (lambda *args: None)
+
+        log(f"🤖 GPT-5 ответ получен (длина: {len(gpt_response)} символов)")
+        
+        try:
+            # Ответ по схеме — ровно один JSON-объект
+            plan = json.loads(gpt_response)
+        except json.JSONDecodeError:
+            # Планы из кэша, полученные до перехода на схему: код-блок или текст вокруг объекта
+            start = gpt_response.find('{')
+            if start < 0:
+                log("❌ JSON не найден в ответе GPT-5")
+                return {"success": False, "error": "JSON не найден в ответе GPT-5"}
+            try:
+                plan, _ = json.JSONDecoder().raw_decode(gpt_response, start)
+            except json.JSONDecodeError as e:
+                log(f"❌ Ошибка парсинга JSON: {e}")
+                return {"success": False, "error": f"Ошибка парсинга JSON: {str(e)}"}
+        
+        try:
+            validate_plan(plan)
+        except PlanStreamError as e:
+            log(f"❌ План не соответствует схеме: {e}")
+            return {"success": False, "error": f"План не соответствует схеме: {str(e)}"}
+        
+        log("✅ JSON успешно распарсен")
+        return {"success": True, "data": plan}
+
     def _collect_context_for_gpt(self, article_path: str, analysis: Dict, article_content: str) -> Dict:
         """Собирает контекст для GPT-5"""
         context = {
@@ -180,8 +336,6 @@ class GEOHybridAgent:
         return f"""
 Ты эксперт по SEO и LLM-оптимизации. Проанализируй статью и создай план оптимизации.
 
-ВАЖНО: Верни ТОЛЬКО валидный JSON без пояснений, комментариев или дополнительного текста.
-
 ТЕКУЩИЙ АНАЛИЗ:
 - SEO Score: {analysis.get('seo_analysis', {}).get('score', 0)}%
 - LLM Score: {analysis.get('llm_analysis', {}).get('score', 0)}%
@@ -190,98 +344,41 @@ class GEOHybridAgent:
 
 РЕКОМЕНДАЦИИ: {', '.join(analysis.get('recommendations', [])[:5])}
 
-СОЗДАЙ ПЛАН ОПТИМИЗАЦИИ В JSON ФОРМАТЕ:
-
-{{
-  "meta_improvements": {{
-    "title": "улучшенный заголовок статьи",
-    "description": "улучшенное meta описание",
-    "keywords": "ключевые слова через запятую"
-  }},
-  "content_improvements": {{
-    "faq_questions": [
-      {{
-        "question": "Вопрос 1",
-        "answer": "Ответ 1"
-      }},
-      {{
-        "question": "Вопрос 2", 
-        "answer": "Ответ 2"
-      }}
-    ],
-    "summary_text": "краткий вывод раздела",
-    "internal_links": [
-      {{
-        "text": "текст ссылки",
-        "url": "/#section"
-      }}
-    ]
-  }},
-  "technical_improvements": {{
-    "alt_tags": [
-      {{
-        "src_pattern": "часть src",
-        "alt": "описание изображения"
-      }}
-    ],
-    "json_ld_schemas": ["Article", "FAQPage"]
-  }},
-  "priority": "high",
-  "estimated_impact": "описание ожидаемого эффекта"
-}}
+СОЗДАЙ ПЛАН ОПТИМИЗАЦИИ (формат ответа задан JSON-схемой):
+- meta_improvements: улучшенные title, description и keywords статьи
+- content_improvements: до 6 FAQ-вопросов с ответами, краткий вывод (summary_text), внутренние ссылки
+- technical_improvements: alt для изображений (src_pattern — часть src) и нужные JSON-LD схемы
+- priority и estimated_impact: приоритет и ожидаемый эффект
 
 ПРАВИЛА:
-1. JSON должен быть полностью валидным
-2. Все скобки должны быть закрыты
-3. Используй русский язык для контента
-4. Будь конкретным и практичным
-5. Не добавляй текст вне JSON
+1. Пустая строка или пустой список — «без изменений» для этого поля
+2. Используй русский язык для контента
+3. Будь конкретным и практичным
 """
 
     def _apply_gpt_plan(self, article_path: str, plan: Dict) -> Dict:
         """Применяет план оптимизации от GPT-5"""
         try:
-            article_file = self.project_root / article_path
+            draft = ArticleDraft.load(self.project_root, article_path)
+            result = self._apply_gpt_plan_to_draft(draft, plan)
+            draft.commit()
+            return result
+        except Exception as e:
+            return {"success": False, "error": f"Ошибка применения GPT-5 плана: {str(e)}"}
+
+    def _apply_gpt_plan_to_draft(self, draft: ArticleDraft, plan: Dict) -> Dict:
+        """Применяет план оптимизации от GPT-5 к статье в памяти"""
+        try:
+            # Создаем backup (сохраняется в хранилище снимков при commit)
+            draft.snapshot("gpt")
             
-            # Создаем backup
-            backup_path = article_file.with_suffix('.gpt.backup.html')
-            with open(article_file, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                f.write(original_content)
-            
-            optimized_content = original_content
-            applied_changes = []
-            
-            # Применяем улучшения meta тегов
-            if "meta_improvements" in plan:
-                meta_changes = self._apply_meta_improvements(optimized_content, plan["meta_improvements"])
-                if meta_changes["changes"] > 0:
-                    optimized_content = meta_changes["content"]
-                    applied_changes.append(f"Meta теги: {meta_changes['changes']} изменений")
-            
-            # Применяем улучшения контента
-            if "content_improvements" in plan:
-                content_changes = self._apply_content_improvements(optimized_content, plan["content_improvements"])
-                if content_changes["changes"] > 0:
-                    optimized_content = content_changes["content"]
-                    applied_changes.append(f"Контент: {content_changes['changes']} улучшений")
-            
-            # Применяем технические улучшения
-            if "technical_improvements" in plan:
-                tech_changes = self._apply_technical_improvements(optimized_content, plan["technical_improvements"])
-                if tech_changes["changes"] > 0:
-                    optimized_content = tech_changes["content"]
-                    applied_changes.append(f"Технические: {tech_changes['changes']} улучшений")
-            
-            # Сохраняем оптимизированную статью
-            with open(article_file, 'w', encoding='utf-8') as f:
-                f.write(optimized_content)
+            applied = {}
+            self._apply_plan_sections_to_draft(draft, plan, applied)
+            applied_changes = [section["description"] for section in applied.values() if section["description"]]
             
             return {
                 "success": True,
-                "backup_path": str(backup_path),
+                "backup": draft.backup_ref("gpt"),
                 "changes_applied": applied_changes,
                 "total_changes": len(applied_changes)
             }
@@ -289,58 +386,105 @@ class GEOHybridAgent:
         except Exception as e:
             return {"success": False, "error": f"Ошибка применения GPT-5 плана: {str(e)}"}
 
-    def _apply_meta_improvements(self, content: str, meta_plan: Dict) -> Dict:
-        """Применяет улучшения meta тегов"""
+    def _apply_plan_sections_to_draft(self, draft: ArticleDraft, sections: Dict, applied: Dict,
+                                      rules_summary_added: bool = False):
+        """Применяет разделы плана, которых еще нет в applied (раздел -> данные и итог).
+
+        Вызывается и для каждого раздела по мере потока, и для готового плана:
+        повторно раздел не применяется. Все правки новых разделов собираются
+        в один EditPlan и применяются одной склейкой. Если правила добавили
+        типовой вывод, а план дает свой, типовой вывод убирается.
+        """
+        planners = {
+            "meta_improvements": (self._plan_meta_improvements, "Meta теги: {} изменений"),
+            "content_improvements": (self._plan_content_improvements, "Контент: {} улучшений"),
+            "technical_improvements": (self._plan_technical_improvements, "Технические: {} улучшений"),
+        }
+        pending = [key for key in PLAN_SECTIONS if key in sections and key not in applied]
+        if not pending:
+            return
+        
+        edits = EditPlan(draft.content)
+        results = {}
+        for key in pending:
+            value = sections[key]
+            summary_replaced = False
+            if key == "content_improvements" and rules_summary_added and value.get("summary_text"):
+                rules_summary = RULES_SUMMARY_HTML + '\n\n'
+                start = draft.content.find(rules_summary)
+                if start != -1:
+                    edits.replace(start, start + len(rules_summary), "", "типовой вывод")
+                    summary_replaced = True
+            
+            plan_section, description = planners[key]
+            changes = plan_section(edits, value)
+            results[key] = {
+                "data": value,
+                "description": description.format(changes) if changes > 0 else "",
+                "summary_replaced": summary_replaced,
+            }
+        
+        draft.content = edits.apply()
+        for key in pending:
+            applied[key] = results[key]
+            print(f"🧩 Раздел плана применен: {key}")
+
+    def _plan_meta_improvements(self, edits: EditPlan, meta_plan: Dict) -> int:
+        """Правки meta тегов; возвращает число изменений"""
         changes = 0
         
         # Обновляем title
-        if "title" in meta_plan and meta_plan["title"]:
-            title_pattern = r'<title>(.*?)</title>'
-            if re.search(title_pattern, content):
-                content = re.sub(title_pattern, f'<title>{meta_plan["title"]}</title>', content)
-                changes += 1
+        if meta_plan.get("title") and edits.replace_title(meta_plan["title"]):
+            changes += 1
         
         # Обновляем description
-        if "description" in meta_plan and meta_plan["description"]:
-            desc_pattern = r'<meta name="description" content="[^"]*"'
-            if re.search(desc_pattern, content):
-                content = re.sub(desc_pattern, f'<meta name="description" content="{meta_plan["description"]}"', content)
-                changes += 1
+        description_meta = edits.targets.metas.get("description")
+        if meta_plan.get("description") and description_meta is not None and "content" in description_meta.attrs:
+            edits.set_attribute(description_meta, "content", meta_plan["description"], "meta description")
+            changes += 1
         
-        return {"content": content, "changes": changes}
+        return changes
 
-    def _apply_content_improvements(self, content: str, content_plan: Dict) -> Dict:
-        """Применяет улучшения контента"""
+    def _plan_content_improvements(self, edits: EditPlan, content_plan: Dict) -> int:
+        """Правки контента (FAQ перед футером, вывод перед FAQ); возвращает число изменений"""
         changes = 0
         
         # Добавляем FAQ блоки
-        if "faq_questions" in content_plan and content_plan["faq_questions"]:
+        if content_plan.get("faq_questions"):
             faq_html = self._generate_faq_html(content_plan["faq_questions"])
-            if faq_html:
-                content = self._insert_faq_section(content, faq_html)
+            if faq_html and edits.insert_before_comment(FOOTER_MARKER, f'{faq_html}\n\n', "FAQ"):
                 changes += 1
         
         # Добавляем контентный вывод
-        if "summary_text" in content_plan and content_plan["summary_text"]:
+        if content_plan.get("summary_text"):
             summary_html = self._generate_summary_html(content_plan["summary_text"])
-            if summary_html:
-                content = self._insert_summary_section(content, summary_html)
+            if summary_html and edits.insert_before_comment(FAQ_MARKER, f'{summary_html}\n\n', "вывод"):
                 changes += 1
         
-        return {"content": content, "changes": changes}
+        return changes
 
-    def _apply_technical_improvements(self, content: str, tech_plan: Dict) -> Dict:
-        """Применяет технические улучшения"""
-        changes = 0
+    def _plan_technical_improvements(self, edits: EditPlan, tech_plan: Dict) -> int:
+        """Alt теги по шаблону src: один проход по найденным изображениям.
+        Если изображение подходит под несколько шаблонов, действует последний."""
+        alt_items = [item for item in tech_plan.get("alt_tags") or []
+                     if item.get("src_pattern") and "alt" in item]
+        if not alt_items:
+            return 0
         
-        # Обновляем alt теги изображений
-        if "alt_tags" in tech_plan and tech_plan["alt_tags"]:
-            for alt_item in tech_plan["alt_tags"]:
-                if "src_pattern" in alt_item and "alt" in alt_item:
-                    content = self._update_image_alt(content, alt_item["src_pattern"], alt_item["alt"])
-                    changes += 1
+        new_alts = {}
+        matched = set()
+        for index, image in enumerate(edits.targets.images):
+            src = image.attrs.get("src")
+            if src is None or "src" not in image.value_spans:
+                continue
+            for item_index, item in enumerate(alt_items):
+                if item["src_pattern"] in src:
+                    new_alts[index] = item["alt"]
+                    matched.add(item_index)
         
-        return {"content": content, "changes": changes}
+        for index, alt in new_alts.items():
+            edits.set_attribute(edits.targets.images[index], "alt", alt, f"alt {index}")
+        return len(matched)
 
     def _generate_faq_html(self, faq_items: List[Dict]) -> str:
         """Генерирует HTML для FAQ блока"""
@@ -386,33 +530,6 @@ class GEOHybridAgent:
   </div>
 </section>'''
 
-    def _insert_faq_section(self, content: str, faq_html: str) -> str:
-        """Вставляет FAQ секцию перед футером"""
-        footer_marker = r'<!-- ============== FOOTER ============== -->'
-        if re.search(footer_marker, content):
-            return re.sub(footer_marker, f'{faq_html}\n\n{footer_marker}', content, count=1)
-        return content
-
-    def _insert_summary_section(self, content: str, summary_html: str) -> str:
-        """Вставляет контентный вывод перед FAQ"""
-        faq_marker = r'<!-- ============== FAQ SECTION ============== -->'
-        if re.search(faq_marker, content):
-            return re.sub(faq_marker, f'{summary_html}\n\n{faq_marker}', content, count=1)
-        return content
-
-    def _update_image_alt(self, content: str, src_pattern: str, alt_text: str) -> str:
-        """Обновляет alt тег изображения"""
-        img_pattern = rf'<img([^>]*?)src="[^"]*{re.escape(src_pattern)}[^"]*"([^>]*?)>'
-        
-        def replace_img(match):
-            img_attrs = match.group(1) + match.group(2)
-            if 'alt=' in img_attrs:
-                return re.sub(r'alt="[^"]*"', f'alt="{alt_text}"', match.group(0))
-            else:
-                return match.group(0)[:-1] + f' alt="{alt_text}">'
-        
-        return re.sub(img_pattern, replace_img, content)
-
     def analyze_article(self, article_path: str) -> Dict:
         """Анализирует созданную статью и выявляет недостающие SEO элементы"""
         try:
@@ -423,19 +540,35 @@ class GEOHybridAgent:
             with open(article_file, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            print(f"🔍 Анализирую статью: {article_path}")
+            return self.analyze_content(content, article_path)
+            
+        except Exception as e:
+            return {"success": False, "error": f"Ошибка анализа: {str(e)}"}
+
+    def analyze_draft(self, draft: ArticleDraft) -> Dict:
+        """Анализирует статью в памяти (модель документа берется из draft)"""
+        return self.analyze_content(draft.document, draft.filename)
+
+    def analyze_content(self, content, article_path: str, verbose: bool = True) -> Dict:
+        """Анализирует HTML статьи (строку или готовую модель документа)"""
+        try:
+            if verbose:
+                print(f"🔍 Анализирую статью: {article_path}")
+            
+            # Один проход токенизатора — общая модель документа для всех анализаторов
+            doc = HTMLDocument.ensure(content)
             
             # Анализ SEO элементов
-            seo_analysis = self._analyze_seo_elements(content)
+            seo_analysis = self._analyze_seo_elements(doc)
             
             # Анализ LLM-оптимизации
-            llm_analysis = self._analyze_llm_optimization(content)
+            llm_analysis = self._analyze_llm_optimization(doc)
             
             # Анализ структуры контента
-            content_analysis = self._analyze_content_structure(content)
+            content_analysis = self._analyze_content_structure(doc)
             
             # Анализ изображений
-            image_analysis = self._analyze_images(content)
+            image_analysis = self._analyze_images(doc)
             
             return {
                 "success": True,
@@ -450,8 +583,9 @@ class GEOHybridAgent:
         except Exception as e:
             return {"success": False, "error": f"Ошибка анализа: {str(e)}"}
 
-    def _analyze_seo_elements(self, content: str) -> Dict:
+    def _analyze_seo_elements(self, content) -> Dict:
         """Анализирует наличие SEO элементов"""
+        doc = HTMLDocument.ensure(content)
         analysis = {
             "meta_tags": {},
             "opengraph": {},
@@ -464,50 +598,38 @@ class GEOHybridAgent:
         # Проверка meta тегов
         for tag in self.required_seo_elements["meta"]:
             if tag == "title":
-                pattern = r'<title>(.*?)</title>'
-            elif tag == "description":
-                pattern = r'<meta name="description" content="(.*?)"'
-            elif tag == "keywords":
-                pattern = r'<meta name="keywords" content="(.*?)"'
-            elif tag == "author":
-                pattern = r'<meta name="author" content="(.*?)"'
-            elif tag == "robots":
-                pattern = r'<meta name="robots" content="(.*?)"'
+                value = doc.title
             elif tag == "canonical":
-                pattern = r'<link rel="canonical" href="(.*?)"'
+                value = doc.canonical
+            else:
+                value = doc.meta_names.get(tag)
             
-            match = re.search(pattern, content)
-            if match:
-                analysis["meta_tags"][tag] = {"found": True, "value": match.group(1)}
+            if value is not None:
+                analysis["meta_tags"][tag] = {"found": True, "value": value}
             else:
                 analysis["meta_tags"][tag] = {"found": False, "value": None}
                 analysis["missing"].append(f"meta:{tag}")
         
         # Проверка OpenGraph тегов
         for tag in self.required_seo_elements["opengraph"]:
-            pattern = rf'<meta property="{tag}" content="(.*?)"'
-            match = re.search(pattern, content)
-            if match:
-                analysis["opengraph"][tag] = {"found": True, "value": match.group(1)}
+            value = doc.meta_properties.get(tag)
+            if value is not None:
+                analysis["opengraph"][tag] = {"found": True, "value": value}
             else:
                 analysis["opengraph"][tag] = {"found": False, "value": None}
                 analysis["missing"].append(f"og:{tag}")
         
         # Проверка Twitter тегов
         for tag in self.required_seo_elements["twitter"]:
-            pattern = rf'<meta name="{tag}" content="(.*?)"'
-            match = re.search(pattern, content)
-            if match:
-                analysis["twitter"][tag] = {"found": True, "value": match.group(1)}
+            value = doc.meta_names.get(tag)
+            if value is not None:
+                analysis["twitter"][tag] = {"found": True, "value": value}
             else:
                 analysis["twitter"][tag] = {"found": False, "value": None}
                 analysis["missing"].append(f"og:{tag}")
         
         # Проверка JSON-LD схем
-        json_ld_pattern = r'<script type="application/ld\+json">(.*?)</script>'
-        json_ld_blocks = re.findall(json_ld_pattern, content, re.DOTALL)
-        
-        for block in json_ld_blocks:
+        for block in doc.json_ld:
             try:
                 data = json.loads(block)
                 if "@type" in data:
@@ -526,8 +648,9 @@ class GEOHybridAgent:
         
         return analysis
 
-    def _analyze_llm_optimization(self, content: str) -> Dict:
+    def _analyze_llm_optimization(self, content) -> Dict:
         """Анализирует LLM-оптимизацию контента"""
+        doc = HTMLDocument.ensure(content)
         analysis = {
             "faq_blocks": 0,
             "howto_instructions": 0,
@@ -539,28 +662,27 @@ class GEOHybridAgent:
         }
         
         # Подсчет FAQ блоков
-        faq_pattern = r'<(?:article|div)[^>]*class="faq-item"[^>]*>'
-        analysis["faq_blocks"] = len(re.findall(faq_pattern, content))
+        analysis["faq_blocks"] = doc.faq_items
         
-        # Подсчет HowTo инструкций
-        howto_pattern = r'<ol>|<ul>|<li>'
-        analysis["howto_instructions"] = len(re.findall(howto_pattern, content))
+        # Подсчет HowTo инструкций (<ol>, <ul>, <li> без атрибутов)
+        analysis["howto_instructions"] = doc.bare_list_tags
         
         # Подсчет структурированных списков
-        list_pattern = r'<ul[^>]*>.*?</ul>|<ol[^>]*>.*?</ol>'
-        analysis["structured_lists"] = len(re.findall(list_pattern, content, re.DOTALL))
+        analysis["structured_lists"] = doc.lists
         
         # Подсчет семантических заголовков
-        heading_pattern = r'<h[1-6][^>]*>.*?</h[1-6]>'
-        analysis["semantic_headings"] = len(re.findall(heading_pattern, content))
+        analysis["semantic_headings"] = len(doc.headings)
         
         # Подсчет контентных выводов
-        summary_pattern = r'<p[^>]*>.*?(?:в итоге|в результате|таким образом|итак).*?</p>'
-        analysis["content_summaries"] = len(re.findall(summary_pattern, content, re.IGNORECASE))
+        summary_markers = ("в итоге", "в результате", "таким образом", "итак")
+        analysis["content_summaries"] = sum(
+            1 for text in doc.paragraphs
+            if any(marker in text.lower() for marker in summary_markers)
+        )
         
         # Подсчет локальных ключевых слов
         local_keywords = ["салон красоты", "клиника", "фитнес", "образование", "автомойка", "ремонт"]
-        analysis["local_keywords"] = sum(1 for keyword in local_keywords if keyword.lower() in content.lower())
+        analysis["local_keywords"] = sum(1 for keyword in local_keywords if keyword in doc.lower)
         
         # Подсчет score
         max_score = 6
@@ -575,8 +697,9 @@ class GEOHybridAgent:
         
         return analysis
 
-    def _analyze_content_structure(self, content: str) -> Dict:
+    def _analyze_content_structure(self, content) -> Dict:
         """Анализирует структуру контента"""
+        doc = HTMLDocument.ensure(content)
         analysis = {
             "h1_count": 0,
             "h2_count": 0,
@@ -589,22 +712,21 @@ class GEOHybridAgent:
         }
         
         # Подсчет заголовков
-        analysis["h1_count"] = len(re.findall(r'<h1[^>]*>', content))
-        analysis["h2_count"] = len(re.findall(r'<h2[^>]*>', content))
-        analysis["h3_count"] = len(re.findall(r'<h3[^>]*>', content))
+        analysis["h1_count"] = doc.count("h1")
+        analysis["h2_count"] = doc.count("h2")
+        analysis["h3_count"] = doc.count("h3")
         
         # Подсчет параграфов
-        analysis["paragraphs"] = len(re.findall(r'<p[^>]*>', content))
+        analysis["paragraphs"] = doc.count("p")
         
         # Подсчет изображений
-        analysis["images"] = len(re.findall(r'<img[^>]*>', content))
+        analysis["images"] = len(doc.images)
         
         # Подсчет ссылок
-        analysis["links"] = len(re.findall(r'<a[^>]*>', content))
+        analysis["links"] = len(doc.links)
         
         # Подсчет CTA блоков
-        cta_pattern = r'<a[^>]*class="[^"]*btn[^"]*"[^>]*>'
-        analysis["cta_blocks"] = len(re.findall(cta_pattern, content))
+        analysis["cta_blocks"] = len(doc.ctas)
         
         # Подсчет score
         score = 0
@@ -623,8 +745,9 @@ class GEOHybridAgent:
         
         return analysis
 
-    def _analyze_images(self, content: str) -> Dict:
+    def _analyze_images(self, content) -> Dict:
         """Анализирует изображения и их оптимизацию"""
+        doc = HTMLDocument.ensure(content)
         analysis = {
             "total_images": 0,
             "with_alt": 0,
@@ -633,18 +756,16 @@ class GEOHybridAgent:
             "score": 0
         }
         
-        # Поиск всех изображений
-        img_pattern = r'<img[^>]*>'
-        images = re.findall(img_pattern, content)
-        analysis["total_images"] = len(images)
+        # Все изображения уже собраны моделью документа
+        analysis["total_images"] = len(doc.images)
         
         if analysis["total_images"] == 0:
             analysis["score"] = 100  # Нет изображений - идеально
             return analysis
         
-        for img in images:
-            has_alt = 'alt=' in img
-            has_title = 'title=' in img
+        for img in doc.images:
+            has_alt = 'alt' in img
+            has_title = 'title' in img
             
             if has_alt:
                 analysis["with_alt"] += 1
@@ -694,16 +815,34 @@ class GEOHybridAgent:
 
     def optimize_article(self, article_path: str) -> Dict:
         """Выполняет дополнительную оптимизацию по правилам"""
+        try:
+            article_file = self.project_root / article_path
+            if not article_file.exists():
+                return {"success": False, "error": f"Файл {article_path} не найден"}
+            
+            draft = ArticleDraft.load(self.project_root, article_path)
+            result = self.optimize_draft_rules(draft)
+            draft.commit()
+            return result
+            
+        except Exception as e:
+            return {"success": False, "error": f"Ошибка оптимизации: {str(e)}"}
+
+    def optimize_draft_rules(self, draft: ArticleDraft, analysis: Optional[Dict] = None) -> Dict:
+        """Дополнительная оптимизация по правилам для статьи в памяти.
+        analysis — готовый анализ текущего содержимого draft (чтобы не анализировать повторно)."""
+        article_path = draft.filename
         try:
             print(f"🔧 Выполняю дополнительную оптимизацию по правилам: {article_path}")
             
             # Анализируем статью
-            analysis = self.analyze_article(article_path)
+            if analysis is None:
+                analysis = self.analyze_draft(draft)
             if not analysis["success"]:
                 return analysis
             
             # Генерируем недостающие элементы
-            optimization_result = self._generate_missing_elements(article_path, analysis)
+            optimization_result = self._generate_missing_elements_in_draft(draft, analysis)
             
             return {
                 "success": True,
@@ -719,132 +858,89 @@ class GEOHybridAgent:
     def _generate_missing_elements(self, article_path: str, analysis: Dict) -> Dict:
         """Генерирует недостающие SEO элементы"""
         try:
-            article_file = self.project_root / article_path
-            with open(article_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            optimized_content = content
+            draft = ArticleDraft.load(self.project_root, article_path)
+            result = self._generate_missing_elements_in_draft(draft, analysis)
+            draft.commit()
+            return result
+        except Exception as e:
+            return {"error": f"Ошибка генерации элементов: {str(e)}"}
+
+    def _generate_missing_elements_in_draft(self, draft: ArticleDraft, analysis: Dict) -> Dict:
+        """Генерирует недостающие SEO элементы в статье в памяти (одна склейка всех правок)"""
+        try:
+            edits = EditPlan(draft.content)
             generated_elements = []
             
             # Генерируем недостающие alt теги для изображений
             if analysis["image_analysis"]["score"] < 100:
-                optimized_content, alt_tags_generated = self._generate_alt_tags(optimized_content)
+                alt_tags_generated = self._plan_alt_tags(edits)
                 if alt_tags_generated > 0:
                     generated_elements.append(f"Сгенерировано {alt_tags_generated} alt тегов")
             
             # Генерируем недостающие meta теги
             if analysis["seo_analysis"]["score"] < 100:
-                optimized_content, meta_tags_generated = self._generate_missing_meta_tags(optimized_content, analysis)
+                meta_tags_generated = self._plan_missing_meta_tags(edits, analysis)
                 if meta_tags_generated > 0:
                     generated_elements.append(f"Сгенерировано {meta_tags_generated} meta тегов")
             
             # Генерируем LLM-оптимизированный контент
             if analysis["llm_analysis"]["score"] < 70:
-                optimized_content, llm_elements_generated = self._generate_llm_optimized_content(optimized_content, analysis)
+                llm_elements_generated = self._plan_llm_optimized_content(edits, analysis)
                 if llm_elements_generated > 0:
                     generated_elements.append(f"Добавлено {llm_elements_generated} LLM-элементов")
             
-            # Сохраняем оптимизированную статью
-            backup_path = article_file.with_suffix('.rules.backup.html')
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            with open(article_file, 'w', encoding='utf-8') as f:
-                f.write(optimized_content)
+            # Backup исходной версии и обновление статьи в памяти
+            draft.snapshot("rules")
+            draft.content = edits.apply()
             
             return {
                 "elements_generated": generated_elements,
-                "backup_created": str(backup_path),
+                "backup_created": draft.backup_ref("rules"),
                 "content_optimized": True
             }
             
         except Exception as e:
             return {"error": f"Ошибка генерации элементов: {str(e)}"}
 
-    def _generate_alt_tags(self, content: str) -> Tuple[str, int]:
-        """Генерирует alt теги для изображений"""
-        img_pattern = r'<img([^>]*?)>'
+    def _plan_alt_tags(self, edits: EditPlan) -> int:
+        """Alt теги для изображений без alt"""
         generated_count = 0
-        
-        def replace_img(match):
-            nonlocal generated_count
-            img_attrs = match.group(1)
-            
+        for index, image in enumerate(edits.targets.images):
             # Если уже есть alt, не трогаем
-            if 'alt=' in img_attrs:
-                return match.group(0)
+            if "alt" in image.attrs:
+                continue
             
             # Генерируем alt на основе контекста
-            alt_text = "SmartVizitka - Бизнес-автопилот с AI"
-            new_img = f'<img{img_attrs} alt="{alt_text}">'
+            edits.set_attribute(image, "alt", "SmartVizitka - Бизнес-автопилот с AI", f"alt {index}")
             generated_count += 1
-            
-            return new_img
         
-        optimized_content = re.sub(img_pattern, replace_img, content)
-        return optimized_content, generated_count
+        return generated_count
 
-    def _generate_missing_meta_tags(self, content: str, analysis: Dict) -> Tuple[str, int]:
-        """Генерирует недостающие meta теги"""
-        generated_count = 0
-        
-        # Добавляем недостающие meta теги
-        head_pattern = r'(<head[^>]*>)([\s\S]*?)(</head>)'
-        head_match = re.search(head_pattern, content)
+    def _plan_missing_meta_tags(self, edits: EditPlan, analysis: Dict) -> int:
+        """Недостающие meta теги (в конец <head>)"""
+        head_close = edits.targets.head_close
+        if head_close is None:
+            return 0
         
-        if head_match:
-            head_open, head_body, head_close = head_match.groups()
-            
-            # Добавляем keywords если нет
-            if not re.search(r'<meta name="keywords"', head_body):
-                keywords_meta = '  <meta name="keywords" content="SmartVizitka, CRM бесплатно, бизнес-автопилот, AI, автоматизация" />'
-                head_body = head_body + '\n' + keywords_meta
-                generated_count += 1
-            
-            # Добавляем author если нет
-            if not re.search(r'<meta name="author"', head_body):
-                author_meta = '  <meta name="author" content="SmartVizitka" />'
-                head_body = head_body + '\n' + author_meta
+        generated_count = 0
+        missing = [
+            ("keywords", '  <meta name="keywords" content="SmartVizitka, CRM бесплатно, бизнес-автопилот, AI, автоматизация" />'),
+            ("author", '  <meta name="author" content="SmartVizitka" />'),
+        ]
+        for name, meta_html in missing:
+            if name not in edits.targets.metas:
+                edits.insert(head_close, '\n' + meta_html, f"meta {name}")
                 generated_count += 1
-            
-            # Обновляем head
-            content = head_open + head_body + head_close
         
-        return content, generated_count
+        return generated_count
 
-    def _generate_llm_optimized_content(self, content: str, analysis: Dict) -> Tuple[str, int]:
-        """Генерирует LLM-оптимизированный контент"""
-        generated_count = 0
-        
+    def _plan_llm_optimized_content(self, edits: EditPlan, analysis: Dict) -> int:
+        """LLM-оптимизированный контент: типовой вывод перед FAQ"""
         # Добавляем контентные выводы в конце разделов
         if analysis["llm_analysis"]["content_summaries"] == 0:
-            # Ищем конец последнего раздела перед FAQ и добавляем вывод
-            faq_pattern = r'(<!-- ============== FAQ SECTION ============== -->)'
-            
-            def add_summary(match):
-                nonlocal generated_count
-                summary_html = '''
-                <!-- ============== КОНТЕНТНЫЙ ВЫВОД ============== -->
-                <section class="content-summary-section">
-                  <div class="container">
-                    <div class="content-summary" style="background: var(--bg-alt); padding: 32px; border-radius: 20px; margin: 48px 0; text-align: center;">
-                      <h2 class="h2">📋 Краткий вывод</h2>
-                      <p style="font-size: 18px; line-height: 1.6; margin: 24px 0; color: var(--text);">
-                        AI-Ассистент предоставляет полный функционал автоматизации продаж и лидогенерации, позволяя бизнесу работать 24/7 без потери качества обслуживания. Интеграция с популярными платформами и CRM-системами обеспечивает seamless-внедрение в существующие бизнес-процессы.
-                      </p>
-                      <div style="display: flex; gap: 16px; justify-content: center; flex-wrap: wrap; margin-top: 24px;">
-                        <a href="/#trial" class="btn btn-primary">Протестировать бота</a>
-                        <a href="/#contact" class="btn btn-ghost">Получить консультацию</a>
-                      </div>
-                    </div>
-                  </div>
-                </section>'''
-                generated_count += 1
-                return summary_html + '\n\n' + match.group(1)
-            
-            content = re.sub(faq_pattern, add_summary, content, count=1)
-        
-        return content, generated_count
+            if edits.insert_before_comment(FAQ_MARKER, RULES_SUMMARY_HTML + '\n\n', "типовой вывод"):
+                return 1
+        return 0
 
     def _create_hybrid_report(self, analysis: Dict, gpt_plan: Dict, optimization: Dict) -> str:
         """Создает комплексный отчет по гибридной оптимизации"""
@@ -884,21 +980,157 @@ class GEOHybridAgent:
 """
         return report
 
+# Кэш и результаты аудита хранятся в каталоге данных, а не в корне сайта
+AUDIT_CACHE_FILE = "geo_audit_cache.json"
+AUDIT_RESULTS_FILE = "geo_audit_results.json"
+AUDIT_SKIP_FILES = {"index.html", "AI_ARTICLE_TEMPLATE.html"}
+
+_audit_agent = None
+
+
+def _audit_article(path: str, known_hash: Optional[str]) -> Tuple[str, str, Optional[Dict]]:
+    """Воркер аудита (отдельный процесс): хэш файла и анализ, если содержимое изменилось"""
+    global _audit_agent
+    with open(path, 'rb') as f:
+        data = f.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    name = Path(path).name
+    if content_hash == known_hash:
+        return name, content_hash, None
+    
+    if _audit_agent is None:
+        _audit_agent = GEOHybridAgent(offline=True)
+    analysis = _audit_agent.analyze_content(data.decode('utf-8', errors='replace'), name, verbose=False)
+    if not analysis.get("success"):
+        return name, content_hash, {"error": analysis.get("error")}
+    
+    scores = {key: analysis[f"{key}_analysis"]["score"] for key in ("seo", "llm", "content", "image")}
+    return name, content_hash, {
+        "scores": scores,
+        "overall": round(sum(scores.values()) / len(scores), 1),
+        "missing": analysis["seo_analysis"]["missing"],
+        "recommendations": analysis["recommendations"],
+    }
+
+
+def audit_site(project_root=None, workers: Optional[int] = None, force: bool = False,
+               output_file: Optional[str] = None) -> Dict:
+    """Аудит всех статей сайта.
+
+    Результаты кэшируются по хэшу содержимого: файлы с прежними mtime/размером
+    не читаются вовсе, остальные хэшируются и (если хэш изменился)
+    анализируются в пуле процессов. Итог — один агрегированный JSON
+    (по умолчанию geo_audit_results.json в каталоге данных).
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    
+    started = time.time()
+    project_root = Path(project_root) if project_root else Path(__file__).parent
+    cache_path = data_path(AUDIT_CACHE_FILE, legacy=".geo_audit_cache.json")
+    cache = {}
+    if cache_path.exists() and not force:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Кэш аудита поврежден, выполняю полный аудит: {e}")
+    
+    articles = sorted(path for path in project_root.glob("*.html")
+                      if path.name not in AUDIT_SKIP_FILES and not path.name.endswith(".backup.html"))
+    
+    # Файлы с прежними mtime/размером не читаем; остальные отдаем воркерам
+    fresh_cache = {}
+    to_check = []
+    for path in articles:
+        stat = path.stat()
+        entry = cache.get(path.name)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            fresh_cache[path.name] = entry
+        else:
+            to_check.append((path, stat))
+    
+    analyzed = 0
+    if to_check:
+        print(f"🔍 Аудит: проверяю {len(to_check)} из {len(articles)} статей...")
+        stats = {path.name: stat for path, stat in to_check}
+        known = [cache.get(path.name, {}).get("sha256") for path, _ in to_check]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_audit_article, [str(path) for path, _ in to_check], known,
+                                   chunksize=max(1, len(to_check) // ((workers or os.cpu_count() or 1) * 4)))
+            for name, content_hash, result in results:
+                entry = dict(cache.get(name, {})) if result is None else {"result": result}
+                if result is not None:
+                    analyzed += 1
+                entry.update(sha256=content_hash, mtime_ns=stats[name].st_mtime_ns, size=stats[name].st_size)
+                fresh_cache[name] = entry
+    
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(fresh_cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    
+    # Агрегированный отчет
+    per_article = {name: entry["result"] for name, entry in fresh_cache.items()}
+    scored = {name: result for name, result in per_article.items() if "scores" in result}
+    missing_counts: Dict[str, int] = {}
+    for result in scored.values():
+        for missing in result["missing"]:
+            missing_counts[missing] = missing_counts.get(missing, 0) + 1
+    averages = {}
+    if scored:
+        for key in ("seo", "llm", "content", "image"):
+            averages[key] = round(sum(result["scores"][key] for result in scored.values()) / len(scored), 1)
+        averages["overall"] = round(sum(result["overall"] for result in scored.values()) / len(scored), 1)
+    
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "total_articles": len(per_article),
+        "analyzed": analyzed,
+        "reused": len(per_article) - analyzed,
+        "errors": len(per_article) - len(scored),
+        "average_scores": averages,
+        "most_common_missing": sorted(missing_counts.items(), key=lambda item: -item[1])[:20],
+        "worst_articles": [name for name, _ in sorted(scored.items(), key=lambda item: item[1]["overall"])[:20]],
+        "articles": per_article,
+    }
+    output_path = Path(output_file) if output_file else data_path(AUDIT_RESULTS_FILE)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"✅ Аудит завершен за {time.time() - started:.1f} сек: статей {len(per_article)}, "
+          f"проанализировано {analyzed}, из кэша {len(per_article) - analyzed}")
+    if averages:
+        print(f"📊 Средний балл: {averages['overall']} (SEO {averages['seo']}, LLM {averages['llm']}, "
+              f"контент {averages['content']}, изображения {averages['image']})")
+    print(f"📄 Результаты: {output_path}")
+    return report
+
+
 def main():
     """Основная функция для запуска из командной строки для AI-Ассистент"""
     import sys
     
-    agent = GEOHybridAgent()
-    
     if len(sys.argv) < 2:
         print("🚀 GEO-гибридный агент оптимизации AI-Ассистент")
         print("🎯 Тематика: AI-ассистенты, чат-боты, автоматизация продаж")
         print("Использование:")
         print("  python3 geo_hybrid_agent.py <путь_к_статье>")
         print("  python3 geo_hybrid_agent.py hybrid <путь_к_статье>")
+        print("  python3 geo_hybrid_agent.py audit [--force] [процессов]")
         return
     
     command = sys.argv[1]
+    
+    # Аудит всего сайта работает без API-ключа
+    if command == "audit":
+        args = sys.argv[2:]
+        force = "--force" in args
+        numbers = [int(arg) for arg in args if arg.isdigit()]
+        audit_site(workers=numbers[0] if numbers else None, force=force)
+        return
+    
+    agent = GEOHybridAgent()
     article_path = sys.argv[2] if len(sys.argv) > 2 else None
     
     if command == "hybrid" and article_path:
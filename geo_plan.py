@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+План GEO-оптимизации для AI-Ассистент: JSON-схема и потоковый разбор
+План запрашивается со строгой схемой (Structured Outputs), поэтому ответ —
+всегда один JSON-объект с разделами в порядке схемы. PlanStreamParser
+разбирает его по мере поступления: каждый раздел верхнего уровня
+(meta_improvements, content_improvements, ...) отдается сразу, как только
+закрылась его скобка, а ответ не того формата обрывает запрос на первых символах.
+"""
+
+import json
+from typing import Callable, Dict, Optional
+
+# Разделы, которые применяются к статье (в порядке схемы и применения)
+PLAN_SECTIONS = ("meta_improvements", "content_improvements", "technical_improvements")
+
+_STRING = {"type": "string"}
+
+
+def _object(**properties) -> Dict:
+    """Объект строгой схемы: все поля обязательны, лишние запрещены (пустая строка — «без изменений»)"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+PLAN_SCHEMA = _object(
+    meta_improvements=_object(title=_STRING, description=_STRING, keywords=_STRING),
+    content_improvements=_object(
+        faq_questions={"type": "array", "items": _object(question=_STRING, answer=_STRING)},
+        summary_text=_STRING,
+        internal_links={"type": "array", "items": _object(text=_STRING, url=_STRING)},
+    ),
+    technical_improvements=_object(
+        alt_tags={"type": "array", "items": _object(src_pattern=_STRING, alt=_STRING)},
+        json_ld_schemas={"type": "array", "items": _STRING},
+    ),
+    priority={"type": "string", "enum": ["high", "medium", "low"]},
+    estimated_impact=_STRING,
+)
+
+# Параметр text.format для Responses API
+PLAN_TEXT_FORMAT = {
+    "type": "json_schema",
+    "name": "geo_optimization_plan",
+    "schema": PLAN_SCHEMA,
+    "strict": True,
+}
+
+
+class PlanStreamError(ValueError):
+    """Ответ модели не соответствует формату плана (запрос можно обрывать)"""
+
+
+def validate_section(key: str, value) -> None:
+    """Проверка раздела по схеме: тип и отсутствие лишних полей"""
+    schema = PLAN_SCHEMA["properties"].get(key)
+    if schema is None:
+        raise PlanStreamError(f"неизвестный раздел плана: {key}")
+    if schema["type"] == "object":
+        if not isinstance(value, dict):
+            raise PlanStreamError(f"раздел {key} должен быть объектом")
+        extra = set(value) - set(schema["properties"])
+        if extra:
+            raise PlanStreamError(f"лишние поля в {key}: {', '.join(sorted(extra))}")
+    elif not isinstance(value, str):
+        raise PlanStreamError(f"поле {key} должно быть строкой")
+
+
+def validate_plan(plan) -> Dict:
+    """Проверяет готовый план (например, из кэша); возвращает его же"""
+    if not isinstance(plan, dict):
+        raise PlanStreamError("план должен быть JSON-объектом")
+    for key, value in plan.items():
+        validate_section(key, value)
+    return plan
+
+
+class PlanStreamParser:
+    """Инкрементальный разбор JSON-объекта плана.
+
+    feed() принимает очередной фрагмент текста; как только значение
+    раздела верхнего уровня закончилось, оно разбирается, проверяется
+    и передается в on_section(ключ, значение). Ошибка формата — PlanStreamError.
+    """
+
+    def __init__(self, on_section: Optional[Callable[[str, object], None]] = None):
+        self.on_section = on_section
+        self.text = ""
+        self.sections: Dict[str, object] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._closed = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, delta: str):
+        self.text += delta
+        text = self.text
+        while self._pos < len(text):
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                continue
+
+            if ch.isspace():
+                continue
+            if self._closed:
+                raise PlanStreamError("текст после JSON-объекта плана")
+            if self._depth == 0:
+                if ch != "{":
+                    raise PlanStreamError(f"ответ не начинается с JSON-объекта: {text[:40]!r}")
+                self._depth = 1
+                continue
+
+            if self._depth == 1:
+                if ch == ":" and self._key is not None and self._value_start is None:
+                    continue
+                if ch in ",}":
+                    if self._key is not None:
+                        self._emit(i)
+                    if ch == "}":
+                        self._depth = 0
+                        self._closed = True
+                    continue
+                if self._key is None:
+                    if ch != '"':
+                        raise PlanStreamError(f"ожидался ключ плана, получено {ch!r}")
+                    self._key_start = i
+                elif self._value_start is None:
+                    self._value_start = i
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+
+    def _emit(self, end: int):
+        key = self._key
+        if self._value_start is None:
+            raise PlanStreamError(f"нет значения для {key}")
+        try:
+            value = json.loads(self.text[self._value_start:end])
+        except ValueError as e:
+            raise PlanStreamError(f"некорректное значение {key}: {e}")
+        validate_section(key, value)
+        self._key = self._key_start = self._value_start = None
+        self.sections[key] = value
+        if self.on_section is not None:
+            self.on_section(key, value)
+
+    def finish(self) -> Dict:
+        """Проверка после конца потока: объект должен быть закрыт"""
+        if not self._closed:
+            raise PlanStreamError("план оборван: JSON-объект не закрыт")
+        return self.sections
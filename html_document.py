@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Компактная модель HTML-документа для анализа статей AI-Ассистент
+Документ разбирается одним проходом токенизатора (одно регулярное
+выражение, сканирующее текст слева направо без возвратов),
+после чего все анализаторы GEOHybridAgent читают готовые поля
+вместо десятков отдельных регулярных выражений по всему тексту.
+"""
+
+import re
+import html
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+class HTMLDocument:
+    """Результат разбора: мета-теги, OG/Twitter, JSON-LD, заголовки, списки, изображения, ссылки, CTA"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.title: Optional[str] = None
+        self.meta_names: Dict[str, str] = {}  # name="..." (включая twitter:*)
+        self.meta_properties: Dict[str, str] = {}  # property="..." (og:*, article:*)
+        self.canonical: Optional[str] = None
+        self.json_ld: List[str] = []
+        self.headings: List[tuple] = []  # (уровень, текст)
+        self.paragraphs: List[str] = []
+        self.images: List[Dict[str, str]] = []
+        self.links: List[Dict[str, str]] = []
+        self.ctas: List[Dict[str, str]] = []  # ссылки с классом btn
+        self.lists = 0  # закрытые <ul>/<ol>
+        self.bare_list_tags = 0  # <ul>, <ol>, <li> без атрибутов
+        self.faq_items = 0
+        self.section_ids: List[str] = []
+        self.tag_counts: Counter = Counter()
+        self._lower: Optional[str] = None
+
+        _tokenize(self)
+
+    @classmethod
+    def ensure(cls, content: Union[str, "HTMLDocument"]) -> "HTMLDocument":
+        """Принимает готовый документ или строку HTML"""
+        return content if isinstance(content, cls) else cls(content)
+
+    @property
+    def lower(self) -> str:
+        """Исходный текст в нижнем регистре (вычисляется один раз)"""
+        if self._lower is None:
+            self._lower = self.source.lower()
+        return self._lower
+
+    def count(self, tag: str) -> int:
+        return self.tag_counts[tag]
+
+
+# Токенизатор HTML (общий с html_splice). Группы: 1 — текст комментария,
+# 2 — "/" закрывающего тега, 3 — имя тега (None для комментария), 4 — атрибуты
+TOKEN_RE = re.compile(
+    r'<!--(.*?)-->|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.DOTALL,
+)
+_ATTR_RE = re.compile(r'([^\s=/>"\']+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>"\']+)))?')
+_STRIP_TAGS_RE = re.compile(r'<[^>]*>')
+
+# Теги, атрибуты которых нужны анализаторам (для остальных атрибуты не разбираются)
+_ATTR_TAGS = {"meta", "link", "script", "img", "a", "section", "article", "div"}
+_TEXT_TAGS = {"title", "h1", "h2", "h3", "h4", "h5", "h6", "p"}
+_RAW_TEXT_TAGS = {"script", "style"}
+
+
+def iter_attrs(raw: str) -> Iterator[Tuple[str, str, Optional[Tuple[int, int]]]]:
+    """Атрибуты из группы 4 TOKEN_RE: (имя в нижнем регистре, значение,
+    диапазон значения в кавычках внутри raw или None для значения без кавычек)"""
+    for match in _ATTR_RE.finditer(raw):
+        name = match.group(1).lower()
+        for group in (2, 3):
+            if match.group(group) is not None:
+                yield name, html.unescape(match.group(group)), match.span(group)
+                break
+        else:
+            yield name, html.unescape(match.group(4) or ""), None
+
+
+def parse_attrs(raw: str) -> Dict[str, str]:
+    """Атрибуты тега по имени (первое вхождение)"""
+    attributes = {}
+    for name, value, _ in iter_attrs(raw):
+        attributes.setdefault(name, value)
+    return attributes
+
+
+def _text_between(source: str, start: int, end: int) -> str:
+    fragment = _STRIP_TAGS_RE.sub(" ", source[start:end])
+    return " ".join(html.unescape(fragment).split())
+
+
+def _tokenize(doc: HTMLDocument):
+    """Однопроходный токенизатор: одно регулярное выражение сканирует документ слева направо"""
+    source = doc.source
+    lowered_source = None
+    text_stack: List[tuple] = []  # (тег, позиция начала текста)
+    open_lists = 0
+    pos = 0
+
+    while True:
+        match = TOKEN_RE.search(source, pos)
+        if not match:
+            break
+        pos = match.end()
+        tag = match.group(3)
+        if tag is None:  # комментарий
+            continue
+        tag = tag.lower()
+        raw_attrs = match.group(4)
+
+        if match.group(2):  # закрывающий тег
+            if tag in ("ul", "ol") and open_lists:
+                open_lists -= 1
+                doc.lists += 1
+            elif tag in _TEXT_TAGS:
+                for i in range(len(text_stack) - 1, -1, -1):
+                    if text_stack[i][0] == tag:
+                        _, text_start = text_stack.pop(i)
+                        text = _text_between(source, text_start, match.start())
+                        if tag == "title":
+                            if doc.title is None:
+                                doc.title = text
+                        elif tag == "p":
+                            doc.paragraphs.append(text)
+                        else:
+                            doc.headings.append((int(tag[1]), text))
+                        break
+            continue
+
+        doc.tag_counts[tag] += 1
+        attributes = parse_attrs(raw_attrs) if tag in _ATTR_TAGS else {}
+
+        if tag == "meta":
+            content = attributes.get("content", "")
+            if "name" in attributes:
+                doc.meta_names.setdefault(attributes["name"], content)
+            if "property" in attributes:
+                doc.meta_properties.setdefault(attributes["property"], content)
+        elif tag == "link":
+            if attributes.get("rel") == "canonical" and doc.canonical is None:
+                doc.canonical = attributes.get("href", "")
+        elif tag == "img":
+            doc.images.append(attributes)
+        elif tag == "a":
+            doc.links.append(attributes)
+            if "btn" in attributes.get("class", ""):
+                doc.ctas.append(attributes)
+        elif tag in ("ul", "ol"):
+            open_lists += 1
+        elif tag == "section" and attributes.get("id"):
+            doc.section_ids.append(attributes["id"])
+
+        if tag in ("ul", "ol", "li") and not raw_attrs.strip():
+            doc.bare_list_tags += 1
+        if tag in ("article", "div") and attributes.get("class") == "faq-item":
+            doc.faq_items += 1
+
+        if tag in _RAW_TEXT_TAGS:
+            # Содержимое script/style не размечается: перескакиваем к закрывающему тегу
+            if lowered_source is None:
+                lowered_source = doc.lower
+            close = lowered_source.find(f"</{tag}", pos)
+            if close == -1:
+                close = len(source)
+            if tag == "script" and attributes.get("type") == "application/ld+json":
+                doc.json_ld.append(source[pos:close])
+            pos = close
+        elif tag in _TEXT_TAGS and not raw_attrs.rstrip().endswith("/"):
+            if tag == "p" and any(open_tag == "p" for open_tag, _ in text_stack):
+                # <p> неявно закрывает предыдущий <p>
+                for i in range(len(text_stack) - 1, -1, -1):
+                    if text_stack[i][0] == "p":
+                        _, text_start = text_stack.pop(i)
+                        doc.paragraphs.append(_text_between(source, text_start, match.start()))
+                        break
+            text_stack.append((tag, pos))
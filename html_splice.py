@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Однопроходное редактирование HTML-статей AI-Ассистент
+Вместо re.sub по всему документу на каждую правку: документ сканируется
+один раз (title, meta, </head>, <img>, комментарии-маркеры секций),
+правки собираются как операции (позиция, замена), проверяются на
+пересечения и применяются одной склейкой строки.
+
+    edits = EditPlan(content)
+    edits.replace_title("Новый заголовок")
+    for image in edits.targets.images:
+        edits.set_attribute(image, "alt", "...")
+    content = edits.apply()
+"""
+
+import html
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from html_document import TOKEN_RE, iter_attrs
+
+
+class EditConflict(ValueError):
+    """Две правки затрагивают один и тот же участок документа"""
+
+
+class Edit(NamedTuple):
+    start: int
+    end: int  # start == end — вставка
+    text: str
+    label: str
+    seq: int  # порядок добавления: вставки в одну позицию идут в этом порядке
+
+
+class Tag:
+    """Открывающий тег: позиция, атрибуты и диапазоны их значений в исходном тексте"""
+
+    __slots__ = ("name", "start", "end", "attrs", "value_spans", "insert_at")
+
+    def __init__(self, name: str, start: int, end: int):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attrs: Dict[str, str] = {}
+        self.value_spans: Dict[str, Tuple[int, int]] = {}  # только значения в кавычках
+        self.insert_at = end - 1  # куда дописывать новый атрибут (перед > или />)
+
+
+class EditTargets:
+    """Места правок, найденные за один проход по документу"""
+
+    def __init__(self, source: str):
+        self.title: Optional[Tuple[int, int]] = None  # текст первого <title>
+        self.metas: Dict[str, Tag] = {}  # meta name="..." (первое вхождение)
+        self.head_close: Optional[int] = None  # позиция </head>
+        self.images: List[Tag] = []
+        self.comments: Dict[str, int] = {}  # текст комментария -> позиция (первое вхождение)
+
+        _scan(self, source)
+
+
+_SCANNED_TAGS = {"meta", "img"}
+_RAW_TEXT_TAGS = {"script", "style"}
+
+
+def _parse_tag(match, name: str) -> Tag:
+    tag = Tag(name, match.start(), match.end())
+    offset = match.start(4)
+    raw = match.group(4)
+    for attr_name, value, span in iter_attrs(raw):
+        if attr_name in tag.attrs:
+            continue
+        tag.attrs[attr_name] = value
+        if span is not None:
+            tag.value_spans[attr_name] = (offset + span[0], offset + span[1])
+    stripped = raw.rstrip()
+    if stripped.endswith("/"):
+        tag.insert_at = offset + len(stripped) - 1
+        # Пробел перед "/" остается перед "/": <img src="a" /> -> <img src="a" alt="..." />
+        while tag.insert_at > offset and raw[tag.insert_at - offset - 1].isspace():
+            tag.insert_at -= 1
+    else:
+        tag.insert_at = offset + len(stripped)
+    return tag
+
+
+def _scan(targets: EditTargets, source: str):
+    """Один проход регулярного выражения слева направо (как в html_document)"""
+    lowered_source = None
+    title_start = None
+    pos = 0
+
+    while True:
+        match = TOKEN_RE.search(source, pos)
+        if not match:
+            break
+        pos = match.end()
+        if match.group(3) is None:  # комментарий
+            targets.comments.setdefault(match.group(1).strip(), match.start())
+            continue
+        name = match.group(3).lower()
+
+        if match.group(2):  # закрывающий тег
+            if name == "title" and title_start is not None and targets.title is None:
+                targets.title = (title_start, match.start())
+            elif name == "head" and targets.head_close is None:
+                targets.head_close = match.start()
+            continue
+
+        if name in _SCANNED_TAGS:
+            tag = _parse_tag(match, name)
+            if name == "img":
+                targets.images.append(tag)
+            elif "name" in tag.attrs:
+                targets.metas.setdefault(tag.attrs["name"], tag)
+        elif name == "title" and title_start is None:
+            title_start = pos
+        elif name in _RAW_TEXT_TAGS:
+            # Разметка внутри script/style не является целью правок
+            if lowered_source is None:
+                lowered_source = source.lower()
+            close = lowered_source.find(f"</{name}", pos)
+            pos = close if close != -1 else len(source)
+
+
+class EditPlan:
+    """Набор правок одного документа; apply() склеивает результат за один проход"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.edits: List[Edit] = []
+        self._targets: Optional[EditTargets] = None
+
+    @property
+    def targets(self) -> EditTargets:
+        """Места правок (документ сканируется один раз, при первом обращении)"""
+        if self._targets is None:
+            self._targets = EditTargets(self.source)
+        return self._targets
+
+    def replace(self, start: int, end: int, text: str, label: str = ""):
+        if not 0 <= start <= end <= len(self.source):
+            raise ValueError(f"правка {label or text[:30]!r} вне документа: {start}..{end}")
+        self.edits.append(Edit(start, end, text, label, len(self.edits)))
+
+    def insert(self, pos: int, text: str, label: str = ""):
+        self.replace(pos, pos, text, label)
+
+    def insert_before_comment(self, comment: str, text: str, label: str = "") -> bool:
+        """Вставка перед комментарием-маркером (<!-- ... -->); False — маркера нет"""
+        pos = self.targets.comments.get(comment)
+        if pos is None:
+            return False
+        self.insert(pos, text, label)
+        return True
+
+    def replace_title(self, title: str, label: str = "title") -> bool:
+        span = self.targets.title
+        if span is None:
+            return False
+        self.replace(span[0], span[1], html.escape(title, quote=False), label)
+        return True
+
+    def set_attribute(self, tag: Tag, name: str, value: str, label: str = ""):
+        """Заменяет значение атрибута тега или дописывает атрибут"""
+        escaped = html.escape(value, quote=True)
+        span = tag.value_spans.get(name)
+        if span is not None:
+            self.replace(span[0], span[1], escaped, label or name)
+        elif name in tag.attrs:
+            raise EditConflict(f"атрибут {name} без кавычек в <{tag.name}> на позиции {tag.start}")
+        else:
+            self.insert(tag.insert_at, f' {name}="{escaped}"', label or name)
+
+    def check(self) -> List[Edit]:
+        """Правки в порядке документа; пересекающиеся — EditConflict"""
+        ordered = sorted(self.edits, key=lambda edit: (edit.start, edit.end, edit.seq))
+        for previous, current in zip(ordered, ordered[1:]):
+            if previous.end > current.start or (
+                    previous.start == current.start and previous.end == current.end and previous.end > previous.start):
+                raise EditConflict(
+                    f"правки пересекаются: {previous.label or 'edit'} [{previous.start}:{previous.end}] "
+                    f"и {current.label or 'edit'} [{current.start}:{current.end}]")
+        return ordered
+
+    def apply(self) -> str:
+        if not self.edits:
+            return self.source
+        pieces = []
+        pos = 0
+        for edit in self.check():
+            pieces.append(self.source[pos:edit.start])
+            pieces.append(edit.text)
+            pos = edit.end
+        pieces.append(self.source[pos:])
+        return "".join(pieces)
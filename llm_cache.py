@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Дисковый кэш ответов LLM для AI-Ассистент
+Ключ — хэш модели, настроек reasoning/text и полного input запроса.
+Повторные запуски по неизмененным промптам (после сбоя, повторная
+оптимизация той же статьи, тестовые прогоны) не тратят токены.
+Одинаковые запросы, выполняющиеся одновременно, схлопываются в один вызов.
+Кэш хранит полные тексты статей и планов, поэтому лежит вне каталога
+сайта (data_paths), а не в .llm_cache рядом с опубликованными файлами.
+"""
+
+import os
+import json
+import time
+import hashlib
+import asyncio
+import threading
+import concurrent.futures
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from data_paths import data_path
+
+
+def default_cache_dir() -> Path:
+    return Path(os.getenv("LLM_CACHE_DIR") or data_path("llm_cache", legacy=".llm_cache"))
+
+
+class LLMResponseCache:
+    def __init__(self, cache_dir=None, max_size_mb=None, max_age_days=None, enabled=None):
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.max_size = int(float(max_size_mb if max_size_mb is not None else os.getenv("LLM_CACHE_MAX_MB", "500")) * 1024 * 1024)
+        self.max_age = float(max_age_days if max_age_days is not None else os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400
+        self.enabled = enabled if enabled is not None else os.getenv("LLM_CACHE", "1") != "0"
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+        self._total_size = None  # считается при первой записи
+        self.stats = {"hits": 0, "misses": 0, "collapsed": 0, "evicted": 0}
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Хэш параметров запроса (model, input, reasoning, text ...)"""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает закэшированный output_text или None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if time.time() - stat.st_mtime > self.max_age:
+                self._remove(path, stat.st_size)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU: свежие попадания вытесняются последними
+            return entry.get("output_text")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Поврежденная запись кэша {path.name}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key: str, output_text: str, **meta):
+        """Сохраняет ответ в кэш (атомарно) и при необходимости вытесняет старые записи"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"key": key, "created_at": time.time(), "output_text": output_text, **meta}
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._scan_size()
+            else:
+                self._total_size += len(data)
+            over_limit = self._total_size > self.max_size
+        if over_limit:
+            self.evict()
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*/*.json"))
+
+    def _remove(self, path: Path, size: Optional[int] = None):
+        try:
+            size = size if size is not None else path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._total_size is not None:
+                self._total_size -= size
+            self.stats["evicted"] += 1
+
+    def evict(self):
+        """Удаляет просроченные записи, затем самые старые — до 90% лимита размера"""
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= target:
+                break
+            self._remove(path, size)
+            total -= size
+
+        with self._lock:
+            self._total_size = total
+
+    def get_or_create(self, key: str, factory: Callable[[], Optional[str]],
+                      should_cache: Optional[Callable[[str], bool]] = None, **meta) -> Optional[str]:
+        """Возвращает ответ из кэша или вызывает factory.
+
+        Параллельные вызовы с тем же ключом ждут результата первого.
+        Ответ сохраняется, только если should_cache(ответ) истинно.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+        if not owner:
+            self.stats["collapsed"] += 1
+            return future.result()
+
+        try:
+            value = self.get(key)  # запрос мог завершиться, пока мы ждали блокировку
+            if value is None:
+                self.stats["misses"] += 1
+                value = factory()
+                if value and (should_cache is None or should_cache(value)):
+                    self.put(key, value, **meta)
+            else:
+                self.stats["hits"] += 1
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_create(self, key: str, factory, should_cache: Optional[Callable[[str], bool]] = None,
+                             **meta) -> Optional[str]:
+        """Асинхронная версия get_or_create (factory — корутинная функция)"""
+        cached = self.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        future = self._ainflight.get(key)
+        if future is not None:
+            self.stats["collapsed"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._ainflight[key] = future
+        try:
+            self.stats["misses"] += 1
+            value = await factory()
+            if value and (should_cache is None or should_cache(value)):
+                self.put(key, value, **meta)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # помечаем как полученное, если ожидающих нет
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+
+_shared_caches: Dict[str, LLMResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_response_cache(cache_dir=None) -> LLMResponseCache:
+    """Общий для процесса экземпляр кэша (одна таблица выполняющихся запросов)"""
+    resolved = str(Path(cache_dir or default_cache_dir()).resolve())
+    with _shared_lock:
+        if resolved not in _shared_caches:
+            _shared_caches[resolved] = LLMResponseCache(resolved)
+        return _shared_caches[resolved]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Планировщик запросов к OpenAI для AI-Ассистент
+Общий для процесса диспетчер перед каждым вызовом LLM:
+- корзины токенов на запросы в минуту (RPM) и оценку токенов в минуту (TPM);
+- адаптивная параллельность (AIMD): на 429/5xx лимит делится пополам,
+  после успешных ответов растет на единицу за «окно»;
+- повторы с экспоненциальной задержкой и полным джиттером, Retry-After
+  (и retry-after-ms) соблюдается и приостанавливает всех клиентов модели.
+Встроенные повторы SDK отключаются (max_retries=0), чтобы не умножать попытки.
+Каждый вызов (успешный или окончательно упавший) пишется в llm_telemetry.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from typing import Callable, Dict, Optional
+
+import openai
+
+from llm_telemetry import get_telemetry
+
+# Ошибки, после которых запрос имеет смысл повторить
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                    openai.InternalServerError)
+
+
+class TokenBucket:
+    """Корзина токенов с резервированием: долг превращается в время ожидания"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Списывает amount и возвращает, сколько секунд подождать до разрешенного старта"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Запрос больше емкости корзины не должен ждать вечно
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """Возвращает переоцененные токены (фактический расход оказался меньше оценки)"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMScheduler:
+    def __init__(self, model: str, rpm=None, tpm=None, max_concurrency=None, max_retries=None,
+                 base_delay=1.0, max_delay=60.0):
+        self.model = model
+        self.requests = TokenBucket(rpm if rpm is not None else float(os.getenv("OPENAI_RPM", "500")))
+        self.tokens = TokenBucket(tpm if tpm is not None else float(os.getenv("OPENAI_TPM", "200000")))
+        self.max_concurrency = int(max_concurrency if max_concurrency is not None else os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv("LLM_MAX_RETRIES", "5"))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.limit = float(self.max_concurrency)  # текущий лимит AIMD
+        self.in_flight = 0
+        self.paused_until = 0.0  # Retry-After: пауза для всех запросов модели
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    # ---------- оценки ----------
+
+    @staticmethod
+    def estimate_tokens(request_input, expected_output_tokens: int = 0) -> int:
+        """Грубая оценка: ~3 символа на токен для смешанного русского/HTML текста"""
+        text = request_input if isinstance(request_input, str) else json.dumps(request_input, ensure_ascii=False)
+        return len(text) // 3 + expected_output_tokens
+
+    @staticmethod
+    def _usage_of(telemetry: Dict, result):
+        """usage ответа: из ответа SDK или через telemetry["usage"] (например, для потоковых запросов)"""
+        usage_of = telemetry.get("usage")
+        return usage_of(result) if usage_of else getattr(result, "usage", None)
+
+    def _settle(self, usage, estimated_tokens: int):
+        total = getattr(usage, "total_tokens", None)
+        if isinstance(total, int) and total < estimated_tokens:
+            self.tokens.refund(estimated_tokens - total)
+
+    # ---------- AIMD ----------
+
+    def _try_acquire_slot(self) -> bool:
+        with self._cond:
+            if self.in_flight < max(1, int(self.limit)) and time.time() >= self.paused_until:
+                self.in_flight += 1
+                return True
+            return False
+
+    def _slot_wait_time(self) -> float:
+        return max(0.05, self.paused_until - time.time())
+
+    def _acquire_slot(self):
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)) or time.time() < self.paused_until:
+                self._cond.wait(timeout=self._slot_wait_time())
+            self.in_flight += 1
+
+    def _release_slot(self, outcome: str, retry_after: Optional[float] = None):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "ok":
+                # Аддитивный рост: +1 к лимиту примерно за limit успешных ответов
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(1.0, self.limit))
+            elif outcome == "throttled":
+                # Мультипликативное снижение
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.time() + retry_after)
+            self._cond.notify_all()
+
+    # ---------- повторы ----------
+
+    @staticmethod
+    def _retry_after(error) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    @staticmethod
+    def _is_retryable(error) -> bool:
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False  # закончились деньги на счете — повторы не помогут
+        return isinstance(error, RETRYABLE_ERRORS)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, 0.5)
+        # Полный джиттер: случайная задержка от 0 до base * 2^attempt
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _on_error(self, error, attempt: int, description: str) -> Optional[float]:
+        """Возвращает задержку перед повтором или None, если повторять не нужно"""
+        retryable = self._is_retryable(error)
+        throttled = isinstance(error, (openai.RateLimitError, openai.InternalServerError))
+        retry_after = self._retry_after(error) if throttled else None
+        self._release_slot("throttled" if throttled else "error", retry_after)
+        if throttled:
+            self.stats["throttled"] += 1
+
+        if not retryable or attempt >= self.max_retries:
+            self.stats["failed"] += 1
+            return None
+
+        delay = self._backoff(attempt, retry_after)
+        self.stats["retries"] += 1
+        print(f"⏳ {description or self.model}: {type(error).__name__}, повтор {attempt + 1}/{self.max_retries} "
+              f"через {delay:.1f} сек (параллельность {max(1, int(self.limit))})")
+        return delay
+
+    # ---------- телеметрия ----------
+
+    def _record(self, telemetry: Dict, started: float, attempt_started: float, attempt: int,
+                usage=None, error: Optional[BaseException] = None):
+        now = time.perf_counter()
+        get_telemetry().record(
+            stage=telemetry.get("stage", ""),
+            model=self.model,
+            reasoning_effort=telemetry.get("reasoning_effort"),
+            article=telemetry.get("article", ""),
+            usage=usage,
+            latency=now - attempt_started,
+            wall=now - started,
+            retries=attempt,
+            outcome="ok" if error is None else type(error).__name__,
+            error=str(error) if error is not None else "",
+        )
+
+    # ---------- вызовы ----------
+
+    def call(self, fn: Callable, estimated_tokens: int = 0, description: str = "", **telemetry):
+        """Выполняет fn() с учетом лимитов и повторами.
+
+        telemetry — поля записи телеметрии: stage, article, reasoning_effort
+        и usage (функция, достающая usage из результата fn, если это не ответ SDK).
+        """
+        self.stats["calls"] += 1
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            time.sleep(max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens)))
+            self._acquire_slot()
+            attempt_started = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(e, attempt, description)
+                if delay is None:
+                    self._record(telemetry, started, attempt_started, attempt, error=e)
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release_slot("ok")
+            usage = self._usage_of(telemetry, result)
+            self._settle(usage, estimated_tokens)
+            self._record(telemetry, started, attempt_started, attempt, usage)
+            return result
+
+    async def acall(self, coroutine_fn: Callable, estimated_tokens: int = 0, description: str = "", **telemetry):
+        """Асинхронная версия call: coroutine_fn — корутинная функция без аргументов"""
+        self.stats["calls"] += 1
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            await asyncio.sleep(max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens)))
+            while not self._try_acquire_slot():
+                await asyncio.sleep(self._slot_wait_time())
+            attempt_started = time.perf_counter()
+            try:
+                result = await coroutine_fn()
+            except Exception as e:
+                delay = self._on_error(e, attempt, description)
+                if delay is None:
+                    self._record(telemetry, started, attempt_started, attempt, error=e)
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._release_slot("ok")
+            usage = self._usage_of(telemetry, result)
+            self._settle(usage, estimated_tokens)
+            self._record(telemetry, started, attempt_started, attempt, usage)
+            return result
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model: str) -> LLMScheduler:
+    """Общий для процесса планировщик модели (лимиты OpenAI считаются по моделям)"""
+    with _schedulers_lock:
+        if model not in _schedulers:
+            _schedulers[model] = LLMScheduler(model)
+        return _schedulers[model]
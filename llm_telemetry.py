@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Телеметрия вызовов LLM для AI-Ассистент
+Каждый вызов responses.create (через LLMScheduler) дописывает строку
+в llm_telemetry.jsonl (в каталоге данных вне корня сайта): этап, модель, reasoning effort, входные /
+закэшированные / выходные токены, задержка, число повторов и исход.
+Файл только дополняется, строки пишутся одной записью с O_APPEND,
+поэтому несколько процессов могут писать в него одновременно.
+
+Использование:
+    python3 llm_telemetry.py [summary] [часов]   # p50/p95 задержки и токенов по этапам и на статью
+    python3 llm_telemetry.py prometheus [файл]   # экспорт в текстовом формате Prometheus
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from data_paths import data_path
+
+DEFAULT_TELEMETRY_FILE = "llm_telemetry.jsonl"
+
+# Границы корзин гистограммы задержки (секунды): от плана GEO до длинной статьи
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 180, 300, 600)
+
+
+def usage_fields(usage) -> Dict[str, int]:
+    """Токены из usage ответа Responses API (объект SDK или dict)"""
+    if usage is None:
+        return {"input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "reasoning_tokens": 0}
+    if isinstance(usage, dict):
+        get = usage.get
+        input_details = usage.get("input_tokens_details") or {}
+        output_details = usage.get("output_tokens_details") or {}
+        cached = input_details.get("cached_tokens")
+        reasoning = output_details.get("reasoning_tokens")
+    else:
+        get = lambda name: getattr(usage, name, None)
+        cached = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None)
+        reasoning = getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None)
+    return {
+        "input_tokens": get("input_tokens") or 0,
+        "cached_tokens": cached or 0,
+        "output_tokens": get("output_tokens") or 0,
+        "reasoning_tokens": reasoning or 0,
+    }
+
+
+class TelemetryStore:
+    def __init__(self, path=None, enabled=None):
+        self.path = str(path or os.getenv("LLM_TELEMETRY_FILE") or data_path(DEFAULT_TELEMETRY_FILE))
+        self.enabled = enabled if enabled is not None else os.getenv("LLM_TELEMETRY", "1") != "0"
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, model: str, latency: float, wall: float, retries: int, outcome: str,
+               usage=None, reasoning_effort: Optional[str] = None, article: str = "", error: str = ""):
+        """Дописывает запись о вызове (ошибки записи не должны ронять генерацию)"""
+        if not self.enabled:
+            return
+        record = {
+            "ts": round(time.time(), 3),
+            "stage": stage or "other",
+            "model": model,
+            "reasoning_effort": reasoning_effort,
+            "article": article,
+            **usage_fields(usage),
+            "latency": round(latency, 3),  # последняя попытка
+            "wall": round(wall, 3),  # весь вызов: ожидание лимитов, повторы, задержки
+            "retries": retries,
+            "outcome": outcome,
+        }
+        if error:
+            record["error"] = error[:300]
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"⚠️ Не удалось записать телеметрию LLM: {e}")
+
+    def iter_records(self, since: Optional[float] = None) -> Iterator[Dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # недописанная строка упавшего процесса
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_telemetry() -> TelemetryStore:
+    """Общее для процесса хранилище телеметрии"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TelemetryStore()
+        return _store
+
+
+# ---------- агрегаты ----------
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records: Iterable[Dict]) -> Dict[str, Dict]:
+    """Сводка по этапам и по статьям (сумма всех этапов одной статьи)"""
+    by_stage = defaultdict(list)
+    by_article = defaultdict(lambda: {"wall": 0.0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0})
+    for record in records:
+        by_stage[record["stage"]].append(record)
+        if record.get("article") and record.get("outcome") == "ok":
+            totals = by_article[record["article"]]
+            totals["wall"] += record["wall"]
+            for key in ("input_tokens", "cached_tokens", "output_tokens"):
+                totals[key] += record.get(key, 0)
+
+    stages = {}
+    for stage, items in sorted(by_stage.items()):
+        ok = [item for item in items if item["outcome"] == "ok"]
+        stages[stage] = {
+            "calls": len(items),
+            "errors": len(items) - len(ok),
+            "retries": sum(item.get("retries", 0) for item in items),
+        }
+        for key in ("latency", "wall", "input_tokens", "cached_tokens", "output_tokens"):
+            values = [item.get(key, 0) for item in ok]
+            stages[stage][key] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+
+    articles = list(by_article.values())
+    per_article = {"articles": len(articles)}
+    for key in ("wall", "input_tokens", "cached_tokens", "output_tokens"):
+        values = [item[key] for item in articles]
+        per_article[key] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+    return {"stages": stages, "per_article": per_article}
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text(records: Iterable[Dict]) -> str:
+    """Счетчики и гистограмма задержки в текстовом формате Prometheus"""
+    calls = defaultdict(int)
+    retries = defaultdict(int)
+    tokens = defaultdict(int)
+    buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+    latency_sum = defaultdict(float)
+    latency_count = defaultdict(int)
+
+    for record in records:
+        stage, model = record["stage"], record["model"]
+        calls[(stage, model, record["outcome"])] += 1
+        retries[(stage, model)] += record.get("retries", 0)
+        for kind in ("input", "cached", "output", "reasoning"):
+            tokens[(stage, model, kind)] += record.get(f"{kind}_tokens", 0)
+        latency = record["latency"]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                buckets[(stage, model)][i] += 1
+        latency_sum[(stage, model)] += latency
+        latency_count[(stage, model)] += 1
+
+    lines = ["# HELP llm_calls_total Вызовы LLM по этапу, модели и исходу",
+             "# TYPE llm_calls_total counter"]
+    for (stage, model, outcome), value in sorted(calls.items()):
+        lines.append(f"llm_calls_total{_labels(stage=stage, model=model, outcome=outcome)} {value}")
+
+    lines += ["# HELP llm_retries_total Повторы вызовов LLM", "# TYPE llm_retries_total counter"]
+    for (stage, model), value in sorted(retries.items()):
+        lines.append(f"llm_retries_total{_labels(stage=stage, model=model)} {value}")
+
+    lines += ["# HELP llm_tokens_total Токены по видам (input, cached, output, reasoning)",
+              "# TYPE llm_tokens_total counter"]
+    for (stage, model, kind), value in sorted(tokens.items()):
+        lines.append(f"llm_tokens_total{_labels(stage=stage, model=model, kind=kind)} {value}")
+
+    lines += ["# HELP llm_latency_seconds Задержка ответа LLM (последняя попытка)",
+              "# TYPE llm_latency_seconds histogram"]
+    for (stage, model), counts in sorted(buckets.items()):
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            lines.append(f"llm_latency_seconds_bucket{_labels(stage=stage, model=model, le=bound)} {count}")
+        lines.append(f"llm_latency_seconds_bucket{_labels(stage=stage, model=model, le='+Inf')} "
+                     f"{latency_count[(stage, model)]}")
+        lines.append(f"llm_latency_seconds_sum{_labels(stage=stage, model=model)} {latency_sum[(stage, model)]:.3f}")
+        lines.append(f"llm_latency_seconds_count{_labels(stage=stage, model=model)} {latency_count[(stage, model)]}")
+    return "\n".join(lines) + "\n"
+
+
+def print_summary(summary: Dict[str, Dict]):
+    print("📊 Вызовы LLM по этапам (p50 / p95):")
+    for stage, data in summary["stages"].items():
+        print(f"\n🔹 {stage}: вызовов {data['calls']}, ошибок {data['errors']}, повторов {data['retries']}")
+        print(f"   задержка ответа: {data['latency']['p50']:.1f} / {data['latency']['p95']:.1f} сек")
+        print(f"   с ожиданием и повторами: {data['wall']['p50']:.1f} / {data['wall']['p95']:.1f} сек")
+        print(f"   входные токены: {data['input_tokens']['p50']:.0f} / {data['input_tokens']['p95']:.0f} "
+              f"(из кэша {data['cached_tokens']['p50']:.0f} / {data['cached_tokens']['p95']:.0f})")
+        print(f"   выходные токены: {data['output_tokens']['p50']:.0f} / {data['output_tokens']['p95']:.0f}")
+
+    per_article = summary["per_article"]
+    print(f"\n📰 На статью (все этапы, статей: {per_article['articles']}):")
+    print(f"   время в LLM: {per_article['wall']['p50']:.1f} / {per_article['wall']['p95']:.1f} сек")
+    print(f"   входные токены: {per_article['input_tokens']['p50']:.0f} / {per_article['input_tokens']['p95']:.0f}")
+    print(f"   выходные токены: {per_article['output_tokens']['p50']:.0f} / {per_article['output_tokens']['p95']:.0f}")
+
+
+def main():
+    store = get_telemetry()
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+
+    if command == "prometheus":
+        text = prometheus_text(store.iter_records())
+        if len(sys.argv) > 2:
+            # Для textfile-коллектора node_exporter: файл подменяется атомарно
+            tmp_path = f"{sys.argv[2]}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, sys.argv[2])
+            print(f"✅ Метрики записаны: {sys.argv[2]}")
+        else:
+            sys.stdout.write(text)
+        return
+
+    hours = float(sys.argv[2]) if command == "summary" and len(sys.argv) > 2 else None
+    since = time.time() - hours * 3600 if hours else None
+    records = list(store.iter_records(since))
+    if not records:
+        print(f"📭 Нет записей телеметрии в {store.path}")
+        return
+    print_summary(summarize(records))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Офлайн-пакеты запросов OpenAI Batch API для AI-Ассистент
+Экспорт: каждая тема — одна строка JSONL с запросом к /v1/responses
+(тот же промпт, что строит ArticleAgent.create_article) и запись
+в манифесте (тема, имя файла, индекс темы).
+Импорт: строки файла результатов сопоставляются с манифестом по custom_id.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+DEFAULT_REQUESTS_FILE = "openai_batch_requests.jsonl"
+RESPONSES_ENDPOINT = "/v1/responses"
+
+
+def manifest_path_for(requests_path) -> Path:
+    """Манифест лежит рядом с файлом запросов: <имя>.manifest.json"""
+    requests_path = Path(requests_path)
+    return requests_path.with_name(f"{requests_path.stem}.manifest.json")
+
+
+def make_custom_id(index: int) -> str:
+    return f"topic-{index}"
+
+
+def build_request_line(custom_id: str, body: Dict) -> str:
+    """Строка JSONL в формате Batch API"""
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": RESPONSES_ENDPOINT,
+        "body": body,
+    }, ensure_ascii=False)
+
+
+def write_batch(requests_path, items, model: str) -> Tuple[Path, Path]:
+    """Пишет файл запросов и манифест.
+
+    items — словари с ключами custom_id, body и метаданными темы
+    (index, topic, filename, target_audience, keywords).
+    """
+    requests_path = Path(requests_path)
+    manifest_path = manifest_path_for(requests_path)
+    manifest = {"model": model, "endpoint": RESPONSES_ENDPOINT, "requests": {}}
+
+    tmp_path = requests_path.with_name(f".{requests_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(build_request_line(item["custom_id"], item["body"]) + "\n")
+            manifest["requests"][item["custom_id"]] = {
+                key: value for key, value in item.items() if key not in ("custom_id", "body")
+            }
+    os.replace(tmp_path, requests_path)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return requests_path, manifest_path
+
+
+def load_manifest(manifest_path) -> Dict:
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extract_output_text(body: Dict) -> Optional[str]:
+    """Достает текст ответа из тела Responses API (как resp.output_text в SDK)"""
+    if body.get("output_text"):
+        return body["output_text"]
+    parts = []
+    for item in body.get("output") or []:
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content") or []:
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts) or None
+
+
+def iter_results(results_path) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Читает файл результатов Batch API: (custom_id, текст ответа, ошибка)"""
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield f"line-{line_number}", None, f"некорректная строка JSONL: {e}"
+                continue
+
+            custom_id = record.get("custom_id") or f"line-{line_number}"
+            if record.get("error"):
+                error = record["error"]
+                yield custom_id, None, error.get("message", str(error)) if isinstance(error, dict) else str(error)
+                continue
+
+            response = record.get("response") or {}
+            status_code = response.get("status_code")
+            body = response.get("body") or {}
+            if status_code != 200:
+                message = (body.get("error") or {}).get("message") if isinstance(body.get("error"), dict) else None
+                yield custom_id, None, message or f"HTTP {status_code}"
+                continue
+            if body.get("status") not in (None, "completed"):
+                yield custom_id, None, f"ответ не завершен: {body.get('status')}"
+                continue
+
+            yield custom_id, extract_output_text(body), None
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общие клиенты OpenAI для AI-Ассистент
+Один реестр на процесс: ArticleAgent, GEOHybridAgent и воркеры получают
+клиентов с общим пулом keep-alive соединений, поэтому каждая новая статья
+не платит за новые TCP/TLS-рукопожатия. Лимиты пула и таймауты
+настраиваются через окружение, статистика переиспользования соединений
+собирается через trace-расширение httpcore.
+"""
+
+import os
+import asyncio
+import threading
+from typing import Dict, Optional
+
+import openai
+
+try:
+    import httpx
+except ImportError:  # сборки SDK на httpx2
+    import httpx2 as httpx
+
+
+def _env_float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+class ConnectionStats:
+    """Счетчики запросов и новых соединений (остальные запросы шли по живому соединению)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def _trace(self, event_name: str, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def _atrace(self, event_name: str, info):
+        self._trace(event_name, info)
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions = {**request.extensions, "trace": self._trace}
+
+    async def on_async_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions = {**request.extensions, "trace": self._atrace}
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(0, self.requests - self.new_connections)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+class OpenAIClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, openai.OpenAI] = {}
+        self._async_clients: Dict[tuple, openai.AsyncOpenAI] = {}
+        self.stats = ConnectionStats()
+
+    @staticmethod
+    def limits():
+        return httpx.Limits(
+            max_connections=int(_env_float("OPENAI_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(_env_float("OPENAI_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=_env_float("OPENAI_KEEPALIVE_EXPIRY", "120"),
+        )
+
+    @staticmethod
+    def timeout():
+        # Статья генерируется минутами: чтение ждем долго, соединение — нет
+        return httpx.Timeout(
+            _env_float("OPENAI_READ_TIMEOUT", "600"),
+            connect=_env_float("OPENAI_CONNECT_TIMEOUT", "10"),
+        )
+
+    def get_client(self, api_key: Optional[str] = None) -> openai.OpenAI:
+        """Синхронный клиент с общим пулом соединений (повторы — в llm_scheduler)"""
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                http_client = openai.DefaultHttpxClient(
+                    limits=self.limits(), timeout=self.timeout(),
+                    event_hooks={"request": [self.stats.on_request]},
+                )
+                client = openai.OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+                self._clients[api_key] = client
+            return client
+
+    def get_async_client(self, api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+        """Асинхронный клиент: пул привязан к event loop, поэтому один клиент на loop"""
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        try:
+            loop_id = id(asyncio.get_running_loop())
+        except RuntimeError:
+            loop_id = None
+        with self._lock:
+            client = self._async_clients.get((api_key, loop_id))
+            if client is None:
+                http_client = openai.DefaultAsyncHttpxClient(
+                    limits=self.limits(), timeout=self.timeout(),
+                    event_hooks={"request": [self.stats.on_async_request]},
+                )
+                client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+                self._async_clients[(api_key, loop_id)] = client
+            return client
+
+    def connection_stats(self) -> Dict[str, float]:
+        return self.stats.snapshot()
+
+
+_registry = OpenAIClientRegistry()
+
+
+def get_client(api_key: Optional[str] = None) -> openai.OpenAI:
+    return _registry.get_client(api_key)
+
+
+def get_async_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    return _registry.get_async_client(api_key)
+
+
+def connection_stats() -> Dict[str, float]:
+    return _registry.connection_stats()
+
+
+def format_connection_stats() -> str:
+    stats = connection_stats()
+    return (f"🔌 Соединения OpenAI: запросов {stats['requests']}, новых соединений {stats['new_connections']}, "
+            f"TLS-рукопожатий {stats['tls_handshakes']}, переиспользовано {stats['reused']} "
+            f"({stats['reuse_ratio'] * 100:.0f}%)")
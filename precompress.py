@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Предварительное сжатие файлов сайта AI-Ассистент
+Рядом с каждым публикуемым файлом (статьи, index.html, sitemap.xml,
+llms.txt, styles.css, js ...) лежат копии .gz и .br с максимальным
+сжатием. nginx с gzip_static / brotli_static отдает их как есть и не
+сжимает файл заново на каждый запрос. Копии пишет site_files вместе с
+самим файлом; этот модуль решает, что и как сжимать, и умеет обойти
+весь сайт (статические ассеты, файлы из git, устаревшие копии).
+
+Использование:
+    python3 precompress.py [каталог]   # сжать весь сайт и удалить устаревшие копии
+"""
+
+import os
+import sys
+import gzip
+import json
+import fnmatch
+from pathlib import Path, PurePath
+from typing import Dict, Optional, Union
+
+try:
+    import brotli
+except ImportError:  # без пакета brotli пишутся только .gz (устаревшие .br удаляются)
+    brotli = None
+
+# Текстовые форматы, которые отдает nginx (картинки и видео уже сжаты)
+PRECOMPRESS_SUFFIXES = {".html", ".css", ".js", ".xml", ".txt", ".json", ".svg", ".webmanifest"}
+
+# Файлы меньше порога не сжимаются (как gzip_min_length в конфиге nginx)
+MIN_SIZE = int(os.getenv("PRECOMPRESS_MIN_BYTES", "1024"))
+
+# Максимальное сжатие; для больших файлов (sitemap на десятки тысяч URL) brotli 11
+# занимает секунды на каждую публикацию, поэтому для них качество 9
+BROTLI_QUALITY = 11
+BROTLI_LARGE_QUALITY = 9
+LARGE_SIZE = 1024 * 1024
+
+SIBLING_SUFFIXES = (".gz", ".br")
+
+# Самостоятельные сжатые файлы сайта (части sitemap), а не копии
+STANDALONE_COMPRESSED = ("sitemap-*.xml.gz",)
+
+# Файлы, которые сжатие не уменьшило (mtime/размер на момент попытки):
+# sweep не сжимает их заново, пока файл не изменится
+NO_GAIN_FILENAME = ".precompress_no_gain.json"
+
+# Каталоги, которые обход сайта пропускает (кроме них — все скрытые, кроме .well-known)
+SKIP_DIRS = {"venv", "__pycache__", "node_modules", "logs"}
+
+
+def enabled() -> bool:
+    return os.getenv("PRECOMPRESS", "1") != "0"
+
+
+def is_publishable(name: Union[str, PurePath]) -> bool:
+    """Сжимается ли файл: текстовый формат, не скрытый файл и не в скрытом каталоге (кроме .well-known)"""
+    path = PurePath(name)
+    if path.name.startswith(".") or path.suffix.lower() not in PRECOMPRESS_SUFFIXES:
+        return False
+    parent = path.parent.name
+    return not parent.startswith(".") or parent == ".well-known"
+
+
+def compressed_siblings(name: Union[str, PurePath], data: bytes) -> Dict[str, Optional[bytes]]:
+    """Копии для файла: имя копии -> сжатые данные или None (копию нужно удалить).
+    Пустой словарь — файл не публикуемый или сжатие выключено (копии не трогаются)."""
+    if not enabled() or not is_publishable(name):
+        return {}
+    name = str(name)
+    siblings: Dict[str, Optional[bytes]] = {f"{name}.gz": None, f"{name}.br": None}
+    if len(data) < MIN_SIZE:
+        return siblings
+
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        siblings[f"{name}.gz"] = compressed
+    if brotli is not None:
+        quality = BROTLI_QUALITY if len(data) <= LARGE_SIZE else BROTLI_LARGE_QUALITY
+        compressed = brotli.compress(data, quality=quality)
+        if len(compressed) < len(data):
+            siblings[f"{name}.br"] = compressed
+    return siblings
+
+
+def source_of(sibling: Path) -> Optional[Path]:
+    """Исходный файл для копии .gz/.br (None — это не копия)"""
+    if sibling.suffix not in SIBLING_SUFFIXES:
+        return None
+    if any(fnmatch.fnmatch(sibling.name, pattern) for pattern in STANDALONE_COMPRESSED):
+        return None
+    return sibling.with_name(sibling.name[:-len(sibling.suffix)])
+
+
+def _walk(root: Path):
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames
+                       if name not in SKIP_DIRS and (not name.startswith(".") or name == ".well-known")]
+        for filename in filenames:
+            yield Path(directory) / filename
+
+
+def sweep(root=".") -> Dict[str, int]:
+    """Обход сайта: сжимает файлы без свежих копий и удаляет копии без исходного файла"""
+    from site_files import write_siblings
+
+    root = Path(root)
+    stats = {"compressed": 0, "fresh": 0, "removed": 0, "saved_bytes": 0}
+    no_gain = _load_no_gain(root)
+    seen = set()
+    for path in _walk(root):
+        source = source_of(path)
+        if source is not None:
+            if not source.exists() or not is_publishable(source.relative_to(root)):
+                path.unlink(missing_ok=True)
+                stats["removed"] += 1
+            continue
+        relative = path.relative_to(root)
+        if not is_publishable(relative):
+            continue
+        seen.add(relative.as_posix())
+
+        stat = path.stat()
+        marker = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "brotli": brotli is not None}
+        siblings = [path.with_name(path.name + suffix) for suffix in SIBLING_SUFFIXES]
+        expected = siblings if brotli is not None else siblings[:1]
+        if all(_is_fresh(sibling, stat) for sibling in expected) and (brotli is not None or not siblings[1].exists()):
+            stats["fresh"] += 1
+            continue
+        if no_gain.get(relative.as_posix()) == marker:
+            stats["fresh"] += 1
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        written = write_siblings(path, data)
+        stats["compressed"] += 1
+        if written:
+            stats["saved_bytes"] += len(data) - min(written.values())
+        # Сжатие не дало выигрыша хотя бы для одной копии — запоминаем, чтобы не повторять
+        if len(written) < len(expected) and stat.st_size >= MIN_SIZE:
+            no_gain[relative.as_posix()] = marker
+        else:
+            no_gain.pop(relative.as_posix(), None)
+
+    _save_no_gain(root, {name: marker for name, marker in no_gain.items() if name in seen})
+    return stats
+
+
+def _load_no_gain(root: Path) -> Dict[str, Dict]:
+    try:
+        with open(root / NO_GAIN_FILENAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_no_gain(root: Path, no_gain: Dict[str, Dict]):
+    from site_files import atomic_write
+
+    path = root / NO_GAIN_FILENAME
+    if no_gain == _load_no_gain(root):
+        return
+    if no_gain:
+        atomic_write(path, json.dumps(no_gain, ensure_ascii=False, indent=1, sort_keys=True))
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _is_fresh(sibling: Path, source_stat) -> bool:
+    """Копия записана вместе с текущей версией файла (mtime копии = mtime файла).
+    Файлы меньше порога копий не имеют — для них свежесть определяется отсутствием копии."""
+    if source_stat.st_size < MIN_SIZE:
+        return not sibling.exists()
+    try:
+        return sibling.stat().st_mtime_ns == source_stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else "."
+    if brotli is None:
+        print("⚠️ Пакет brotli не установлен: пишутся только .gz (pip install brotli)")
+    stats = sweep(root)
+    print(f"🗜️ Сжато файлов: {stats['compressed']}, без изменений: {stats['fresh']}, "
+          f"удалено устаревших копий: {stats['removed']}")
+    if stats["saved_bytes"]:
+        print(f"   сжатые копии меньше исходных файлов на {stats['saved_bytes'] / 1024:.1f} КБ")
+
+
+if __name__ == "__main__":
+    main()
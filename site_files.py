@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Атомарная запись общих файлов сайта AI-Ассистент
+sitemap.xml, llms.txt, .well-known/ai.txt и index.html обновляются
+несколькими воркерами и процессами по схеме «прочитать — изменить —
+записать». SiteTransaction берет advisory-блокировку (flock) на каждый
+файл до чтения, а при фиксации пишет новые версии во временные файлы
+рядом с оригиналами, делает fsync и переименовывает их (os.replace).
+nginx всегда видит либо старую, либо новую версию файла целиком,
+а параллельные публикации не теряют записи друг друга. Вместе с каждым
+публикуемым файлом пишутся (или удаляются) его сжатые копии .gz/.br
+для gzip_static/brotli_static (см. precompress).
+
+    with SiteTransaction(project_root, ("llms.txt", "index.html")) as files:
+        content = files.read("llms.txt")
+        files.write("llms.txt", content + "/statya.html\\n")
+    # все изменения применены (или ни одного, если внутри было исключение)
+"""
+
+import os
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from precompress import compressed_siblings
+
+# Каталог блокировок: файлы сайта подменяются переименованием, поэтому
+# блокировка берется не на сам файл (его inode меняется), а на отдельный lock-файл
+LOCK_DIR = ".site_locks"
+
+
+def _fsync_dir(directory: Path):
+    """fsync каталога: переименование переживет сбой питания"""
+    fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path: Path, data: bytes) -> Path:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+
+def _sync_mtime(sibling: Path, source: Path):
+    """mtime копии = mtime файла: по нему precompress.sweep узнает свежие копии"""
+    stat = source.stat()
+    os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def write_siblings(path, data: bytes) -> Dict[str, int]:
+    """Пишет сжатые копии уже записанного файла и удаляет ненужные; возвращает размеры записанных копий"""
+    path = Path(path)
+    written = {}
+    for sibling_name, blob in compressed_siblings(path.name, data).items():
+        sibling = path.with_name(sibling_name)
+        if blob is None:
+            sibling.unlink(missing_ok=True)
+            continue
+        os.replace(_write_temp(sibling, blob), sibling)
+        _sync_mtime(sibling, path)
+        written[sibling_name] = len(blob)
+    return written
+
+
+def atomic_write(path, data: Union[str, bytes]):
+    """Запись одного файла: временный файл, fsync, переименование (и сжатые копии публикуемого файла)"""
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    os.replace(_write_temp(path, data), path)
+    write_siblings(path, data)
+    _fsync_dir(path.parent)
+
+
+class SiteTransaction:
+    """Группа изменений файлов сайта под блокировками; фиксация — при выходе из with без исключения"""
+
+    def __init__(self, project_root, names: Iterable[str]):
+        self.project_root = Path(project_root)
+        # Блокировки берутся в одном порядке во всех процессах — без взаимных блокировок
+        self.names = tuple(sorted(set(names)))
+        self._handles = []
+        self._pending: Dict[str, Optional[bytes]] = {}  # имя -> новое содержимое (None — удалить)
+        self._on_commit: List[Callable[[], None]] = []
+
+    def __enter__(self) -> "SiteTransaction":
+        lock_dir = self.project_root / LOCK_DIR
+        lock_dir.mkdir(exist_ok=True)
+        try:
+            for name in self.names:
+                handle = open(lock_dir / (name.replace("/", "__") + ".lock"), 'a')
+                self._handles.append(handle)
+                fcntl.flock(handle, fcntl.LOCK_EX)
+        except BaseException:
+            self._release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self._pending.clear()
+            self._on_commit = []
+            self._release()
+        return False
+
+    def _release(self):
+        for handle in reversed(self._handles):
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+        self._handles = []
+
+    def path(self, name: str) -> Path:
+        return self.project_root / name
+
+    def holds(self, names: Iterable[str]) -> bool:
+        return set(names) <= set(self.names)
+
+    # ---------- чтение и запись ----------
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        """Текущее содержимое с учетом незафиксированных изменений; None — файла нет"""
+        if name in self._pending:
+            return self._pending[name]
+        try:
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def read(self, name: str) -> Optional[str]:
+        data = self.read_bytes(name)
+        return data.decode("utf-8") if data is not None else None
+
+    def exists(self, name: str) -> bool:
+        return self.read_bytes(name) is not None
+
+    def write(self, name: str, data: Union[str, bytes]):
+        self._pending[name] = data.encode("utf-8") if isinstance(data, str) else data
+
+    def remove(self, name: str):
+        self._pending[name] = None
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Действие после фиксации, пока блокировки еще держатся (например, запись в индекс по stat файла)"""
+        self._on_commit.append(callback)
+
+    def _with_siblings(self) -> Dict[str, Optional[bytes]]:
+        """Изменения вместе со сжатыми копиями публикуемых файлов"""
+        changes: Dict[str, Optional[bytes]] = {}
+        for name, data in self._pending.items():
+            changes[name] = data
+            if data is None:
+                changes.update(dict.fromkeys(compressed_siblings(name, b"")))
+            else:
+                changes.update(compressed_siblings(name, data))
+        return changes
+
+    def commit(self):
+        """Все временные файлы пишутся и синхронизируются до первого переименования:
+        сбой во время записи не оставляет на сайте половину изменений"""
+        changes = self._with_siblings()
+        staged = []
+        try:
+            for name, data in changes.items():
+                path = self.path(name)
+                if data is None:
+                    staged.append((path, None))
+                else:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    staged.append((path, _write_temp(path, data)))
+        except BaseException:
+            for _, tmp_path in staged:
+                if tmp_path is not None:
+                    tmp_path.unlink(missing_ok=True)
+            raise
+
+        directories = set()
+        for path, tmp_path in staged:
+            if tmp_path is None:
+                path.unlink(missing_ok=True)
+            else:
+                os.replace(tmp_path, path)
+            directories.add(path.parent)
+        for name, data in changes.items():
+            # Копия .gz/.br получает mtime своего файла (файл переименован выше)
+            source = name[:name.rfind(".")]
+            if data is not None and source in changes and source != name:
+                _sync_mtime(self.path(name), self.path(source))
+        for directory in directories:
+            _fsync_dir(directory)
+        self._pending.clear()
+
+        callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            callback()
+
+
+@contextmanager
+def site_transaction(project_root, names: Iterable[str], files: Optional[SiteTransaction] = None):
+    """Новая транзакция или уже открытая вызывающей стороной (тогда фиксирует она)"""
+    names = tuple(names)
+    if files is not None:
+        if not files.holds(names):
+            raise RuntimeError(f"транзакция не держит блокировки: {', '.join(sorted(set(names) - set(files.names)))}")
+        yield files
+        return
+    with SiteTransaction(project_root, names) as own:
+        yield own
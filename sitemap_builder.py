@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Построитель sitemap для AI-Ассистент
+Sitemap собирается из индекса, ключ которого — URL: повторная генерация
+статьи обновляет запись на месте, а не дописывает дубликаты. lastmod
+меняется только тогда, когда меняется хэш содержимого страницы.
+При приближении к лимиту протокола (50 000 URL на файл) sitemap.xml
+становится индексом sitemap, а URL раскладываются по сжатым частям
+sitemap-N.xml.gz. Индекс читается и sitemap пишется внутри SiteTransaction
+(блокировки SITEMAP_FILES): параллельные публикации не теряют URL друг друга.
+
+Использование:
+    python sitemap_builder.py            # пересобрать sitemap.xml из индекса
+    python sitemap_builder.py rebuild    # пересканировать все статьи и пересобрать
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from site_files import SiteTransaction, atomic_write
+
+BASE_URL = "https://ai-agent-lia.ru"
+SITEMAP_FILENAME = "sitemap.xml"
+INDEX_FILENAME = ".sitemap_index.json"
+SHARD_PATTERN = "sitemap-{}.xml.gz"
+
+# Блокировки транзакции, под которыми меняется sitemap (части sitemap-N.xml.gz — под блокировкой sitemap.xml)
+SITEMAP_FILES = (SITEMAP_FILENAME, INDEX_FILENAME)
+
+# Протокол допускает 50 000 URL в файле; оставляем запас
+SHARD_LIMIT = 45000
+
+ARTICLE_CHANGEFREQ = "monthly"
+ARTICLE_PRIORITY = "0.7"
+
+_URL_BLOCK_RE = re.compile(r'<url>(.*?)</url>', re.DOTALL)
+_FIELD_RE = re.compile(r'<(loc|lastmod|changefreq|priority)>(.*?)</\1>', re.DOTALL)
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAPINDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+class SitemapBuilder:
+    def __init__(self, project_root=".", base_url=BASE_URL, shard_limit=SHARD_LIMIT, files=None):
+        """files — открытая SiteTransaction с блокировками SITEMAP_FILES: индекс читается
+        под блокировкой, а запись фиксируется вместе с остальными файлами транзакции"""
+        self.project_root = Path(project_root)
+        self.files = files
+        self.base_url = base_url.rstrip("/")
+        self.shard_limit = shard_limit
+        self.sitemap_path = self.project_root / SITEMAP_FILENAME
+        self.index_path = self.project_root / INDEX_FILENAME
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+
+    # ---------- индекс ----------
+
+    def _read_text(self, name: str) -> Optional[str]:
+        if self.files is not None:
+            return self.files.read(name)
+        try:
+            with open(self.project_root / name, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, data: bytes):
+        if self.files is not None:
+            self.files.write(name, data)
+        else:
+            atomic_write(self.project_root / name, data)
+
+    def _load(self):
+        try:
+            text = self._read_text(INDEX_FILENAME)
+            if text is not None:
+                self.entries = json.loads(text).get("urls", {})
+                return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Индекс sitemap поврежден, импортирую из {SITEMAP_FILENAME}: {e}")
+        self.entries = self._import_existing_sitemap()
+
+    def _import_existing_sitemap(self) -> Dict[str, Dict]:
+        """Первый запуск: переносим записи из существующего sitemap.xml (без дублей и #faq статей)"""
+        entries: Dict[str, Dict] = {}
+        content = self._read_text(SITEMAP_FILENAME)
+        if content is None:
+            return entries
+        for block in _URL_BLOCK_RE.findall(content):
+            fields = dict(_FIELD_RE.findall(block))
+            loc = fields.get("loc", "").strip()
+            # Фрагменты статей (page.html#faq) поисковики сводят к самой странице
+            if not loc or ".html#" in loc:
+                continue
+            entries[loc] = {
+                "lastmod": fields.get("lastmod", self.current_date).strip(),
+                "changefreq": fields.get("changefreq", ARTICLE_CHANGEFREQ).strip(),
+                "priority": fields.get("priority", ARTICLE_PRIORITY).strip(),
+            }
+        return entries
+
+    def save_index(self):
+        self._write(INDEX_FILENAME, json.dumps({"urls": self.entries}, ensure_ascii=False, indent=1).encode("utf-8"))
+
+    # ---------- обновление записей ----------
+
+    def url_for(self, filename: str) -> str:
+        return f"{self.base_url}/{filename}"
+
+    def upsert(self, loc: str, content_hash: Optional[str] = None, changefreq: str = ARTICLE_CHANGEFREQ,
+               priority: str = ARTICLE_PRIORITY, **extra) -> bool:
+        """Добавляет или обновляет URL. Возвращает True, если запись новая или содержимое изменилось"""
+        entry = self.entries.get(loc)
+        if entry is None:
+            self.entries[loc] = {"lastmod": self.current_date, "changefreq": changefreq,
+                                 "priority": priority, "hash": content_hash, **extra}
+            return True
+
+        changed = content_hash is not None and entry.get("hash") != content_hash
+        if changed:
+            entry["lastmod"] = self.current_date
+            entry["hash"] = content_hash
+        entry.update(extra)
+        return changed
+
+    def upsert_article(self, filename: str, content: str, stat: Optional[os.stat_result] = None) -> bool:
+        """Запись для уже записанной статьи. mtime/размер файла сохраняются вместе с хэшем,
+        чтобы rescan_articles не перечитывал статью, опубликованную через ArticleUpdater"""
+        data = content.encode("utf-8")
+        if stat is None:
+            try:
+                stat = (self.project_root / filename).stat()
+            except FileNotFoundError:
+                stat = None
+        # Размер не совпал — на диске другая версия статьи: следующий rescan ее перечитает
+        if stat is not None and stat.st_size == len(data):
+            extra = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        else:
+            extra = {"mtime_ns": None, "size": None}
+        return self.upsert(self.url_for(filename), hashlib.sha256(data).hexdigest(), **extra)
+
+    def rescan_articles(self) -> int:
+        """Пересканирует статьи на диске; хэш пересчитывается только для измененных файлов"""
+        changed = 0
+        for path in sorted(self.project_root.glob("*.html")):
+            if path.name == "index.html" or path.name.endswith(".backup.html") or path.name.startswith("AI_ARTICLE_TEMPLATE"):
+                continue
+            stat = path.stat()
+            entry = self.entries.get(self.url_for(path.name))
+            if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if self.upsert(self.url_for(path.name), content_hash, mtime_ns=stat.st_mtime_ns, size=stat.st_size):
+                changed += 1
+        return changed
+
+    # ---------- запись ----------
+
+    @staticmethod
+    def _render_url(loc: str, entry: Dict) -> str:
+        return (f"  <url>\n"
+                f"    <loc>{escape(loc)}</loc>\n"
+                f"    <lastmod>{entry['lastmod']}</lastmod>\n"
+                f"    <changefreq>{entry['changefreq']}</changefreq>\n"
+                f"    <priority>{entry['priority']}</priority>\n"
+                f"  </url>\n")
+
+    def _render_urlset(self, items: List) -> str:
+        parts = [XML_HEADER, URLSET_OPEN]
+        parts.extend(self._render_url(loc, entry) for loc, entry in items)
+        parts.append("</urlset>\n")
+        return "".join(parts)
+
+    def write(self) -> List[Path]:
+        """Пишет sitemap.xml (или индекс sitemap + сжатые части) и сохраняет индекс URL"""
+        items = list(self.entries.items())
+        written = []
+
+        if len(items) <= self.shard_limit:
+            self._write(SITEMAP_FILENAME, self._render_urlset(items).encode("utf-8"))
+            written.append(self.sitemap_path)
+            shard_count = 0
+        else:
+            shard_count = (len(items) + self.shard_limit - 1) // self.shard_limit
+            index_parts = [XML_HEADER, SITEMAPINDEX_OPEN]
+            for number in range(1, shard_count + 1):
+                shard_items = items[(number - 1) * self.shard_limit:number * self.shard_limit]
+                shard_name = SHARD_PATTERN.format(number)
+                shard_path = self.project_root / shard_name
+                data = gzip.compress(self._render_urlset(shard_items).encode("utf-8"), compresslevel=6, mtime=0)
+                self._write(shard_name, data)
+                written.append(shard_path)
+                lastmod = max(entry["lastmod"] for _, entry in shard_items)
+                index_parts.append(f"  <sitemap>\n"
+                                   f"    <loc>{escape(self.url_for(shard_name))}</loc>\n"
+                                   f"    <lastmod>{lastmod}</lastmod>\n"
+                                   f"  </sitemap>\n")
+            index_parts.append("</sitemapindex>\n")
+            self._write(SITEMAP_FILENAME, "".join(index_parts).encode("utf-8"))
+            written.insert(0, self.sitemap_path)
+
+        # Удаляем части, оставшиеся от прошлой сборки с большим числом частей
+        for stale in self.project_root.glob(SHARD_PATTERN.format("*")):
+            number = stale.name[len("sitemap-"):-len(".xml.gz")]
+            if not number.isdigit() or int(number) > shard_count:
+                if self.files is not None:
+                    self.files.remove(stale.name)
+                else:
+                    stale.unlink()
+
+        self.save_index()
+        return written
+
+
+def main():
+    with SiteTransaction(".", SITEMAP_FILES) as files:
+        builder = SitemapBuilder(files=files)
+        if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+            changed = builder.rescan_articles()
+            print(f"🔍 Пересканировано статей, изменилось: {changed}")
+        written = builder.write()
+    print(f"✅ Sitemap собран: {len(builder.entries)} URL, файлов: {len(written)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Общие настройки тестов: модули проекта лежат в корне репозитория"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    """Тесты не трогают кэш LLM, телеметрию, очередь тем и backup-хранилище пользователя"""
+    import data_paths
+
+    monkeypatch.setenv("AI_AGENT_DATA_DIR", str(tmp_path / "data"))
+    # Служебные файлы рабочей копии не переносятся в каталог данных теста
+    monkeypatch.setattr(data_paths, "PROJECT_DIR", tmp_path / "project")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "llm_cache"))
+    monkeypatch.setenv("LLM_TELEMETRY", "0")
+    monkeypatch.setenv("ARTICLE_BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setenv("PRECOMPRESS", "0")
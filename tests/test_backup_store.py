@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Тесты хранилища backup-снимков статей"""
+
+from backup_store import BackupStore
+
+
+def test_same_content_under_two_labels_restores_each_label(tmp_path):
+    store = BackupStore(tmp_path / "store")
+    site = tmp_path / "site"
+    site.mkdir()
+
+    store.save("a.html", "gpt", "v0")
+    store.save("a.html", "generated", "v1")
+    store.save("a.html", "rules", "v1")
+    store.save("a.html", "gpt", "v1")
+
+    # Одинаковое содержимое — один объект, но у каждой метки своя запись
+    assert store.stats()["objects"] == 2
+    assert store.find("a.html", "rules") is not None
+
+    (site / "a.html").write_text("current", encoding="utf-8")
+    for label in ("rules", "gpt"):
+        result = store.restore(site, "a.html", label)
+        assert result["success"]
+        assert (site / "a.html").read_text(encoding="utf-8") == "v1"
+
+    # Текущая версия перед восстановлением сохранена как 'restore'
+    assert store.read(store.find("a.html", "restore")["sha256"]) == "v1"
+    store.close()
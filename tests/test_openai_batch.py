@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Тесты офлайн-пакетов Batch API: разбор результатов и полный цикл экспорт → импорт"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from openai_batch import extract_output_text, iter_results, load_manifest, manifest_path_for
+
+FIXTURE = Path(__file__).parent / "fixtures" / "batch_results.jsonl"
+
+TOPICS = [
+    "Чат-бот для салона красоты",
+    "AI-ассистент для автосервиса",
+    "Голосовой бот для клиники",
+    "Автоматизация продаж в рознице",
+    "AI-ассистент для отеля",
+]
+
+
+def test_iter_results_covers_every_record_kind():
+    results = {custom_id: (text, error) for custom_id, text, error in iter_results(FIXTURE)}
+
+    assert results["topic-0"][0].startswith("<!DOCTYPE html") and results["topic-0"][1] is None
+    # Текст из output[].content[] склеивается из частей
+    assert "AI-ассистент для автосервиса</h1>" in results["topic-1"][0]
+    assert results["topic-2"] == (None, "Запрос не выполнен до истечения окна пакета")
+    assert results["topic-3"] == (None, "The server had an error processing your request")
+    assert results["topic-4"] == (None, "ответ не завершен: incomplete")
+    assert results["line-4"][0] is None and "некорректная строка JSONL" in results["line-4"][1]
+    assert "topic-99" in results
+
+
+def test_extract_output_text_skips_non_message_items():
+    body = {"output": [{"type": "reasoning", "content": [{"type": "output_text", "text": "мысли"}]},
+                       {"type": "message", "content": [{"type": "refusal", "refusal": "нет"}]}]}
+    assert extract_output_text(body) is None
+
+
+class FakeUpdater:
+    """ArticleUpdater без общих файлов сайта: запоминает пакет и записывает статьи"""
+    batches = []
+
+    def update_all_files_batch(self, filenames, drafts):
+        FakeUpdater.batches.append(list(filenames))
+        for name in filenames:
+            drafts[name].commit()
+        return True
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    import article_agent
+    import auto_article_updater
+    from article_pipeline import ArticlePipeline
+    from auto_article_generator import AutoArticleGenerator
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("TOPIC_QUEUE_DB", str(tmp_path / "queue.sqlite3"))
+    monkeypatch.setattr(article_agent.ArticleAgent, "_load_article_template",
+                        lambda self: "<!DOCTYPE html><html><body>{content}</body></html>")
+    # GEO-оптимизация без сети: помечает статью
+    monkeypatch.setattr(ArticlePipeline, "optimize",
+                        lambda self, draft: setattr(draft, "content", draft.content.replace("</body>", "<!-- geo --></body>")))
+    monkeypatch.setattr(auto_article_updater, "ArticleUpdater", FakeUpdater)
+    FakeUpdater.batches = []
+
+    with open(tmp_path / "ai_business_3themes.csv", "w", encoding="utf-8") as f:
+        f.write("topic\n" + "\n".join(TOPICS) + "\n")
+
+    gen = AutoArticleGenerator()
+    gen.queue_file = str(tmp_path / "queue.sqlite3")
+    gen._article_agent = article_agent.ArticleAgent()
+    gen._article_agent.project_root = tmp_path
+    yield gen
+    if gen.queue is not None:
+        gen.queue.close()
+
+
+def _states(db_path):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return dict(conn.execute("SELECT idx, state FROM topics"))
+    finally:
+        conn.close()
+
+
+def test_export_then_import_round_trip(generator, tmp_path):
+    requests_path = tmp_path / "batch.jsonl"
+    assert generator.export_batch_requests(len(TOPICS), requests_path=str(requests_path)) == requests_path
+
+    lines = [json.loads(line) for line in requests_path.read_text(encoding="utf-8").splitlines()]
+    assert [line["custom_id"] for line in lines] == [f"topic-{i}" for i in range(len(TOPICS))]
+    assert all(line["url"] == "/v1/responses" for line in lines)
+    manifest = load_manifest(manifest_path_for(requests_path))
+    assert [manifest["requests"][f"topic-{i}"]["topic"] for i in range(len(TOPICS))] == TOPICS
+    # Темы пакета арендованы до импорта
+    assert set(_states(tmp_path / "queue.sqlite3").values()) == {"leased"}
+
+    assert generator.import_batch_results(str(FIXTURE), str(requests_path))
+
+    published = [manifest["requests"][f"topic-{i}"]["filename"] for i in (0, 1)]
+    assert FakeUpdater.batches == [published]
+    for filename in published:
+        content = (tmp_path / filename).read_text(encoding="utf-8")
+        assert content.startswith("<!DOCTYPE html") and "<!-- geo -->" in content
+    for i in (2, 3, 4):
+        assert not (tmp_path / manifest["requests"][f"topic-{i}"]["filename"]).exists()
+
+    # Успешные темы завершены арендой пакета, ошибки вернулись в очередь для повтора
+    assert _states(tmp_path / "queue.sqlite3") == {0: "done", 1: "done", 2: "pending", 3: "pending", 4: "pending"}
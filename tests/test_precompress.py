@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Тесты предварительного сжатия файлов сайта"""
+
+import os
+
+import precompress
+
+
+def test_incompressible_file_is_not_recompressed_on_every_sweep(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRECOMPRESS", "1")
+    noise = tmp_path / "noise.txt"
+    noise.write_bytes(os.urandom(8 * 1024))
+    (tmp_path / "page.html").write_text("<p>статья</p>\n" * 500, encoding="utf-8")
+
+    first = precompress.sweep(tmp_path)
+    assert first["compressed"] == 2
+    assert not (tmp_path / "noise.txt.gz").exists()
+    assert (tmp_path / "page.html.gz").exists()
+
+    second = precompress.sweep(tmp_path)
+    assert second["compressed"] == 0 and second["fresh"] == 2
+
+    # Файл изменился — сжимается снова
+    noise.write_text("сжимаемый текст\n" * 500, encoding="utf-8")
+    third = precompress.sweep(tmp_path)
+    assert third["compressed"] == 1
+    assert (tmp_path / "noise.txt.gz").exists()
+    assert not (tmp_path / precompress.NO_GAIN_FILENAME).exists()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Тесты атомарной записи общих файлов сайта"""
+
+import gzip
+import multiprocessing
+import os
+
+import pytest
+
+from site_files import SiteTransaction, site_transaction
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def test_exception_inside_transaction_leaves_files_untouched(tmp_path):
+    (tmp_path / "llms.txt").write_text("old\n", encoding="utf-8")
+    (tmp_path / "index.html").write_text("<p>old</p>", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with SiteTransaction(tmp_path, ("llms.txt", "index.html", "sitemap.xml")) as files:
+            files.write("llms.txt", "new\n")
+            files.remove("index.html")
+            files.write("sitemap.xml", "<urlset/>")
+            assert files.read("llms.txt") == "new\n" and not files.exists("index.html")
+            raise RuntimeError("сбой посреди публикации")
+
+    assert (tmp_path / "llms.txt").read_text(encoding="utf-8") == "old\n"
+    assert (tmp_path / "index.html").read_text(encoding="utf-8") == "<p>old</p>"
+    assert not (tmp_path / "sitemap.xml").exists()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_commit_writes_removes_and_requires_held_locks(tmp_path):
+    (tmp_path / "old.html").write_text("x", encoding="utf-8")
+    with SiteTransaction(tmp_path, (".well-known/ai.txt", "old.html")) as files:
+        files.write(".well-known/ai.txt", "ai")
+        files.remove("old.html")
+        with site_transaction(tmp_path, ("old.html",), files) as joined:
+            assert joined is files
+        with pytest.raises(RuntimeError):
+            with site_transaction(tmp_path, ("llms.txt",), files):
+                pass
+
+    assert (tmp_path / ".well-known" / "ai.txt").read_text(encoding="utf-8") == "ai"
+    assert not (tmp_path / "old.html").exists()
+
+
+def test_compressed_siblings_follow_the_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRECOMPRESS", "1")
+    content = "/statya.html\n" * 500
+    with SiteTransaction(tmp_path, ("llms.txt",)) as files:
+        files.write("llms.txt", content)
+
+    source = tmp_path / "llms.txt"
+    siblings = [tmp_path / "llms.txt.gz"] + ([tmp_path / "llms.txt.br"] if brotli is not None else [])
+    for sibling in siblings:
+        assert sibling.stat().st_mtime_ns == source.stat().st_mtime_ns
+    assert gzip.decompress(siblings[0].read_bytes()).decode("utf-8") == content
+    if brotli is not None:
+        assert brotli.decompress(siblings[1].read_bytes()).decode("utf-8") == content
+
+    # Файл стал меньше порога сжатия — копии удаляются вместе с изменением
+    with SiteTransaction(tmp_path, ("llms.txt",)) as files:
+        files.write("llms.txt", "/statya.html\n")
+    assert not any(sibling.exists() for sibling in siblings)
+
+
+def _append_entries(project_root, worker, count):
+    for number in range(count):
+        with SiteTransaction(project_root, ("llms.txt",)) as files:
+            files.write("llms.txt", (files.read("llms.txt") or "") + f"/{worker}-{number}.html\n")
+
+
+def test_parallel_processes_do_not_lose_llms_entries(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append_entries, args=(tmp_path, worker, 25)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    lines = (tmp_path / "llms.txt").read_text(encoding="utf-8").splitlines()
+    assert sorted(lines) == sorted(f"/{worker}-{number}.html" for worker in range(4) for number in range(25))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
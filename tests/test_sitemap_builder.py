@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Тесты инкрементального индекса sitemap"""
+
+import sitemap_builder
+from sitemap_builder import SitemapBuilder
+
+
+def test_published_article_is_not_reread_by_rescan(tmp_path, monkeypatch):
+    content = "<!DOCTYPE html><html><body>статья</body></html>"
+    (tmp_path / "statya.html").write_text(content, encoding="utf-8")
+
+    builder = SitemapBuilder(tmp_path)
+    assert builder.upsert_article("statya.html", content)
+    builder.write()
+
+    reads = []
+    real_open = open
+    monkeypatch.setattr(sitemap_builder, "open", lambda path, *args, **kwargs: reads.append(path) or real_open(path, *args, **kwargs),
+                        raising=False)
+    assert SitemapBuilder(tmp_path).rescan_articles() == 0
+    assert not [path for path in reads if str(path).endswith("statya.html")]
+
+
+def test_article_missing_on_disk_is_rescanned(tmp_path):
+    builder = SitemapBuilder(tmp_path)
+    builder.upsert_article("statya.html", "в памяти")
+    builder.write()
+
+    (tmp_path / "statya.html").write_text("на диске", encoding="utf-8")
+    assert SitemapBuilder(tmp_path).rescan_articles() == 1
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Тесты очереди тем: аренды, попытки, dead letter и захват тем несколькими процессами"""
+
+import multiprocessing
+import sqlite3
+
+from topic_queue import DONE, FAILED, LEASED, PENDING, TopicQueue
+
+
+def _row(db_path, index):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute("SELECT state, attempts, lease_owner, last_error FROM topics WHERE idx = ?",
+                            (index,)).fetchone()
+    finally:
+        conn.close()
+
+
+def _queue(db_path, **kwargs):
+    queue = TopicQueue(db_path, **kwargs)
+    queue.sync_topics(["тема 1", "тема 2", "тема 3"])
+    return queue
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = _queue(tmp_path / "q.sqlite3", retry_delay=0)
+    assert queue.lease("worker-a", 1, lease_seconds=-1) == [(0, "тема 1")]
+
+    # Следующая аренда возвращает истекшую тему в очередь и выдает ее другому воркеру
+    assert queue.lease("worker-b", 1) == [(0, "тема 1")]
+    state, attempts, owner, last_error = _row(tmp_path / "q.sqlite3", 0)
+    assert (state, attempts, owner) == (LEASED, 2, "worker-b")
+    assert "аренда истекла" in last_error
+
+    # Воркер с истекшей арендой больше не может завершить тему
+    assert not queue.complete(0, "worker-a")
+    assert queue.complete(0, "worker-b")
+    assert _row(tmp_path / "q.sqlite3", 0)[0] == DONE
+    queue.close()
+
+
+def test_max_attempts_moves_topic_to_dead_letter(tmp_path):
+    queue = _queue(tmp_path / "q.sqlite3", max_attempts=2, retry_delay=0)
+
+    assert queue.lease("w", 1) == [(0, "тема 1")]
+    assert queue.fail(0, "w", "ошибка 1") == PENDING
+    assert queue.lease("w", 1) == [(0, "тема 1")]
+    assert queue.fail(0, "w", "ошибка 2") == FAILED
+
+    assert queue.dead_letters() == [(0, "тема 1", 2, "ошибка 2")]
+    assert [index for index, _ in queue.lease("w", 3)] == [1, 2]
+
+    # Истекшая аренда на последней попытке тоже уходит в dead letter
+    assert queue.fail(1, "w", "ошибка") == PENDING
+    assert queue.lease("w", 1, lease_seconds=-1) == [(1, "тема 2")]
+    queue.lease("w", 1)
+    assert _row(tmp_path / "q.sqlite3", 1)[0] == FAILED
+
+    assert queue.requeue_failed() == 2
+    assert _row(tmp_path / "q.sqlite3", 0)[:2] == (PENDING, 0)
+    queue.close()
+
+
+def test_release_does_not_consume_attempt(tmp_path):
+    queue = _queue(tmp_path / "q.sqlite3")
+    assert queue.lease("w", 1) == [(0, "тема 1")]
+    assert not queue.release(0, "other")
+    assert queue.release(0, "w")
+
+    state, attempts, owner, _ = _row(tmp_path / "q.sqlite3", 0)
+    assert (state, attempts, owner) == (PENDING, 0, None)
+    assert queue.lease("w", 1) == [(0, "тема 1")]
+    assert _row(tmp_path / "q.sqlite3", 0)[1] == 1
+    queue.close()
+
+
+def _lease_all(db_path, owner, results):
+    queue = TopicQueue(db_path)
+    leased = []
+    while True:
+        rows = queue.lease(owner, 1)
+        if not rows:
+            break
+        leased.extend(index for index, _ in rows)
+    queue.close()
+    results.put(leased)
+
+
+def test_concurrent_workers_never_lease_the_same_topic(tmp_path):
+    db_path = str(tmp_path / "q.sqlite3")
+    queue = TopicQueue(db_path)
+    queue.sync_topics([f"тема {i}" for i in range(200)])
+    queue.close()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_lease_all, args=(db_path, f"worker-{i}", results)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    leased = [index for _ in workers for index in results.get(timeout=60)]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert sorted(leased) == list(range(200))
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Очередь тем на SQLite для AI-Ассистент
+Каждая тема CSV — строка со состоянием pending / leased / done / failed.
+Воркер арендует тему на lease_seconds; если он упал, аренда истекает
+и тема возвращается в очередь. Ошибка генерации возвращает тему в pending
+с задержкой, а после max_attempts попыток тема попадает в dead letter
+(состояние failed) и больше не выдается. Захват тем идет в транзакции
+BEGIN IMMEDIATE, поэтому несколько процессов (и несколько хостов на общей
+файловой системе) не получают одну и ту же тему.
+
+Использование:
+    python topic_queue.py                  # статистика очереди
+    python topic_queue.py dead             # dead letter: темы, исчерпавшие попытки
+    python topic_queue.py requeue [номер]  # вернуть failed-темы (или одну тему) в очередь
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_paths import data_path
+
+DEFAULT_DB_FILE = "ai_topic_queue.sqlite3"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    idx INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result TEXT,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS topics_state ON topics (state, available_at, idx);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def default_db_path() -> str:
+    """База очереди: $TOPIC_QUEUE_DB или каталог данных вне корня сайта"""
+    return os.getenv("TOPIC_QUEUE_DB") or str(data_path(DEFAULT_DB_FILE))
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class TopicQueue:
+    def __init__(self, db_path=None, lease_seconds=None, max_attempts=None, retry_delay=None):
+        self.db_path = str(db_path or default_db_path())
+        self.lease_seconds = float(lease_seconds if lease_seconds is not None else os.getenv("TOPIC_LEASE_SECONDS", "1800"))
+        self.max_attempts = int(max_attempts if max_attempts is not None else os.getenv("TOPIC_MAX_ATTEMPTS", "3"))
+        self.retry_delay = float(retry_delay if retry_delay is not None else os.getenv("TOPIC_RETRY_DELAY_SECONDS", "600"))
+        # Журнал DELETE (а не WAL): WAL не работает на сетевых файловых системах
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA busy_timeout = 30000")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с блокировкой записи с самого начала (захват тем без гонок)"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+
+    # ---------- наполнение ----------
+
+    def sync_topics(self, topics: List[str]) -> int:
+        """Добавляет новые темы из CSV; у незавершенных тем обновляет текст. Возвращает число новых"""
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO topics (idx, topic, state, updated_at) VALUES (?, ?, 'pending', ?)",
+                [(index, topic, now) for index, topic in enumerate(topics)])
+            conn.executemany(
+                "UPDATE topics SET topic = ?, updated_at = ? WHERE idx = ? AND topic != ? AND state != 'done'",
+                [(topic, now, index, topic) for index, topic in enumerate(topics)])
+            after = conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+        return after - before
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def migrate_from_progress(self, current_index: int, completed_indices: Iterable[int]) -> bool:
+        """Однократный перенос старого прогресса (current_index из ai_topic_progress.json)"""
+        completed = set(completed_indices)
+        with self._transaction() as conn:
+            if conn.execute("SELECT value FROM meta WHERE key = 'migrated_progress'").fetchone():
+                return False
+            now = time.time()
+            conn.execute("UPDATE topics SET state = 'done', result = 'migrated', updated_at = ? "
+                         "WHERE idx < ? AND state = 'pending'", (now, current_index))
+            conn.executemany("UPDATE topics SET state = 'done', result = 'migrated', updated_at = ? "
+                             "WHERE idx = ? AND state = 'pending'", [(now, index) for index in completed])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_progress', ?)", (str(current_index),))
+        return True
+
+    # ---------- аренда ----------
+
+    def _reclaim_expired(self, conn, now: float):
+        """Истекшие аренды: тема возвращается в очередь или уходит в dead letter"""
+        conn.execute(
+            "UPDATE topics SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "last_error = 'аренда истекла (воркер не завершил тему)', lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now, now))
+
+    def lease(self, owner: str, limit: int = 1, lease_seconds: Optional[float] = None,
+              indices: Optional[List[int]] = None) -> List[Tuple[int, str]]:
+        """Арендует до limit доступных тем (или конкретные indices). Возвращает [(индекс, тема)]"""
+        now = time.time()
+        expires = now + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            if indices is not None:
+                placeholders = ",".join("?" * len(indices)) or "NULL"
+                rows = conn.execute(
+                    f"SELECT idx, topic FROM topics WHERE state = 'pending' AND idx IN ({placeholders}) "
+                    f"ORDER BY idx", list(indices)).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT idx, topic FROM topics WHERE state = 'pending' AND available_at <= ? "
+                    "ORDER BY idx LIMIT ?", (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE topics SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE idx = ?",
+                [(owner, expires, now, index) for index, _ in rows])
+        return rows
+
+    def renew(self, index: int, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        """Продлевает аренду (для долгих задач)"""
+        expires = time.time() + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        cursor = self._conn.execute(
+            "UPDATE topics SET lease_expires = ? WHERE idx = ? AND state = 'leased' AND lease_owner = ?",
+            (expires, index, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, index: int, owner: str, result: str = "") -> bool:
+        """Тема выполнена. False — аренда уже потеряна (истекла и тему взял другой воркер)"""
+        cursor = self._conn.execute(
+            "UPDATE topics SET state = 'done', result = ?, last_error = NULL, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE idx = ? AND state = 'leased' AND lease_owner = ?",
+            (result, time.time(), index, owner))
+        return cursor.rowcount == 1
+
+    def fail(self, index: int, owner: str, error: str) -> Optional[str]:
+        """Ошибка по теме: повтор через retry_delay * попытка или dead letter. Возвращает новое состояние"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM topics WHERE idx = ? AND state = 'leased' AND lease_owner = ?",
+                               (index, owner)).fetchone()
+            if row is None:
+                return None
+            attempts = row[0]
+            state = FAILED if attempts >= self.max_attempts else PENDING
+            conn.execute(
+                "UPDATE topics SET state = ?, last_error = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE idx = ?",
+                (state, error[:1000], now + self.retry_delay * attempts, now, index))
+        return state
+
+    def release(self, index: int, owner: str) -> bool:
+        """Возвращает тему в очередь без учета попытки (например, при остановке воркера)"""
+        cursor = self._conn.execute(
+            "UPDATE topics SET state = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE idx = ? AND state = 'leased' AND lease_owner = ?",
+            (time.time(), index, owner))
+        return cursor.rowcount == 1
+
+    def start_new_cycle(self) -> int:
+        """Все темы пройдены: выполненные снова становятся pending (генерация идет по кругу)"""
+        with self._transaction() as conn:
+            busy = conn.execute("SELECT COUNT(*) FROM topics WHERE state IN ('pending', 'leased')").fetchone()[0]
+            if busy:
+                return 0
+            cursor = conn.execute("UPDATE topics SET state = 'pending', attempts = 0, available_at = 0, "
+                                  "result = NULL, updated_at = ? WHERE state = 'done'", (time.time(),))
+            return cursor.rowcount
+
+    # ---------- обслуживание ----------
+
+    def requeue_failed(self, index: Optional[int] = None) -> int:
+        """Возвращает темы из dead letter в очередь с обнуленным счетчиком попыток"""
+        query = "UPDATE topics SET state = 'pending', attempts = 0, available_at = 0, updated_at = ? WHERE state = 'failed'"
+        params = [time.time()]
+        if index is not None:
+            query += " AND idx = ?"
+            params.append(index)
+        return self._conn.execute(query, params).rowcount
+
+    def dead_letters(self) -> List[Tuple[int, str, int, str]]:
+        return self._conn.execute(
+            "SELECT idx, topic, attempts, last_error FROM topics WHERE state = 'failed' ORDER BY idx").fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for state, count in self._conn.execute("SELECT state, COUNT(*) FROM topics GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def next_pending_index(self) -> Optional[int]:
+        row = self._conn.execute("SELECT MIN(idx) FROM topics WHERE state = 'pending'").fetchone()
+        return row[0]
+
+
+def main():
+    queue = TopicQueue()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+
+    if command == "dead":
+        rows = queue.dead_letters()
+        print(f"☠️ Dead letter: {len(rows)} тем")
+        for index, topic, attempts, error in rows:
+            print(f"   {index + 1}. {topic} (попыток: {attempts}) — {error}")
+    elif command == "requeue":
+        index = int(sys.argv[2]) - 1 if len(sys.argv) > 2 else None
+        print(f"🔁 Возвращено в очередь: {queue.requeue_failed(index)}")
+    else:
+        stats = queue.stats()
+        print("📊 Очередь тем:")
+        for state, count in stats.items():
+            print(f"   {state}: {count}")
+
+
+if __name__ == "__main__":
+    main()